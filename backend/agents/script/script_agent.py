@@ -4,6 +4,7 @@ from langchain_core.prompts import ChatPromptTemplate
 import json
 
 from agents.base.base_agent import BaseAgent
+from app.core.concurrency import run_bounded
 
 
 class BaseScriptGeneratorAgent(BaseAgent):
@@ -18,6 +19,33 @@ class BaseScriptGeneratorAgent(BaseAgent):
     @abstractmethod
     def _get_framework(self) -> str:
         pass
+    
+    @abstractmethod
+    async def _generate_script(self, tc: Dict[str, Any], project_id: str) -> Dict[str, Any]:
+        pass
+    
+    async def execute(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        test_cases = state.get("test_cases", [])
+        project_id = state.get("project_id")
+        
+        results = await run_bounded(
+            test_cases,
+            lambda tc: self._generate_script(tc, project_id)
+        )
+        
+        scripts = []
+        errors = list(state.get("errors", []))
+        for tc, (script, error) in zip(test_cases, results):
+            if error is not None:
+                errors.append(f"Script generation failed for test case {tc.get('id') or tc.get('title')}: {error}")
+            else:
+                scripts.append(script)
+        
+        return {
+            "test_scripts": scripts,
+            "errors": errors,
+            "current_stage": "scripts_generated"
+        }
 
 
 class PythonScriptAgent(BaseScriptGeneratorAgent):
@@ -56,36 +84,26 @@ class PythonScriptAgent(BaseScriptGeneratorAgent):
 请生成完整的pytest测试脚本代码。""")
         ])
     
-    async def execute(self, state: Dict[str, Any]) -> Dict[str, Any]:
-        test_cases = state.get("test_cases", [])
-        project_id = state.get("project_id")
-        scripts = []
+    async def _generate_script(self, tc: Dict[str, Any], project_id: str) -> Dict[str, Any]:
+        chain = self.prompt_template | self.llm
         
-        for tc in test_cases:
-            chain = self.prompt_template | self.llm
-            
-            result = await chain.ainvoke({
-                "test_case": json.dumps(tc, ensure_ascii=False, indent=2)
-            })
-            
-            content = result.content
-            if content.startswith("```python"):
-                content = content.split("```python")[1].split("```")[0]
-            elif content.startswith("```"):
-                content = content.split("```")[1].split("```")[0]
-            
-            scripts.append({
-                "project_id": project_id,
-                "test_case_id": tc.get("id"),
-                "name": f"test_{tc.get('title', 'case').lower().replace(' ', '_')[:30]}",
-                "language": "python",
-                "framework": "pytest",
-                "content": content.strip()
-            })
+        result = await chain.ainvoke({
+            "test_case": json.dumps(tc, ensure_ascii=False, indent=2)
+        })
+        
+        content = result.content
+        if content.startswith("```python"):
+            content = content.split("```python")[1].split("```")[0]
+        elif content.startswith("```"):
+            content = content.split("```")[1].split("```")[0]
         
         return {
-            "test_scripts": scripts,
-            "current_stage": "scripts_generated"
+            "project_id": project_id,
+            "test_case_id": tc.get("id"),
+            "name": f"test_{tc.get('title', 'case').lower().replace(' ', '_')[:30]}",
+            "language": "python",
+            "framework": "pytest",
+            "content": content.strip()
         }
 
 
@@ -125,34 +143,24 @@ class JavaScriptAgent(BaseScriptGeneratorAgent):
 请生成完整的TestNG测试脚本代码。""")
         ])
     
-    async def execute(self, state: Dict[str, Any]) -> Dict[str, Any]:
-        test_cases = state.get("test_cases", [])
-        project_id = state.get("project_id")
-        scripts = []
+    async def _generate_script(self, tc: Dict[str, Any], project_id: str) -> Dict[str, Any]:
+        chain = self.prompt_template | self.llm
         
-        for tc in test_cases:
-            chain = self.prompt_template | self.llm
-            
-            result = await chain.ainvoke({
-                "test_case": json.dumps(tc, ensure_ascii=False, indent=2)
-            })
-            
-            content = result.content
-            if content.startswith("```java"):
-                content = content.split("```java")[1].split("```")[0]
-            elif content.startswith("```"):
-                content = content.split("```")[1].split("```")[0]
-            
-            scripts.append({
-                "project_id": project_id,
-                "test_case_id": tc.get("id"),
-                "name": f"Test{tc.get('title', 'Case').replace(' ', '')[:30]}",
-                "language": "java",
-                "framework": "testng",
-                "content": content.strip()
-            })
+        result = await chain.ainvoke({
+            "test_case": json.dumps(tc, ensure_ascii=False, indent=2)
+        })
+        
+        content = result.content
+        if content.startswith("```java"):
+            content = content.split("```java")[1].split("```")[0]
+        elif content.startswith("```"):
+            content = content.split("```")[1].split("```")[0]
         
         return {
-            "test_scripts": scripts,
-            "current_stage": "scripts_generated"
+            "project_id": project_id,
+            "test_case_id": tc.get("id"),
+            "name": f"Test{tc.get('title', 'Case').replace(' ', '')[:30]}",
+            "language": "java",
+            "framework": "testng",
+            "content": content.strip()
         }
@@ -1,19 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, BackgroundTasks
-from fastapi.responses import StreamingResponse
-from sqlmodel import Session, select
-from typing import List
-from uuid import UUID
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, BackgroundTasks, Request
+from fastapi.responses import StreamingResponse, RedirectResponse, Response
+from sqlmodel import Session, select, func, delete
+from sqlalchemy.orm import defer
+from typing import List, Dict, Any, Tuple, Optional
+from email.utils import format_datetime
+from urllib.parse import quote
+from uuid import UUID, uuid4
 from datetime import datetime
+import os
 import json
 import asyncio
 import logging
+import zipfile
 
 from app.core.database import get_session
 from app.core.config import settings
 from app.models import (
-    Document, DocumentCreate, DocumentRead, DocType, DocStatus, Project
+    Document, DocumentCreate, DocumentRead, DocType, DocStatus, Project, ParseJob, ParseJobRead, JobStatus
 )
-from app.services import minio_service, document_parser, milvus_service
+from app.services import minio_service, milvus_service, parse_job_service, artifact_store, FileTooLargeError
 
 router = APIRouter(prefix="/documents", tags=["Documents"])
 logger = logging.getLogger(__name__)
@@ -61,9 +66,186 @@ def get_content_type(filename: str) -> str:
     return content_types.get(ext, "application/octet-stream")
 
 
+UNSATISFIABLE_RANGE = (-1, -1)
+
+
+def parse_range_header(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    
+    first, _, last = spec.strip().partition("-")
+    try:
+        if not first:
+            suffix = int(last)
+            if suffix <= 0 or size == 0:
+                return UNSATISFIABLE_RANGE
+            return max(0, size - suffix), size - 1
+        
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    
+    if start >= size or end < start:
+        return UNSATISFIABLE_RANGE
+    return start, min(end, size - 1)
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def zip_entry_name(info: zipfile.ZipInfo) -> str:
+    name = info.filename
+    if not info.flag_bits & 0x800:
+        try:
+            name = name.encode("cp437").decode("gbk")
+        except (UnicodeEncodeError, UnicodeDecodeError):
+            pass
+    return name
+
+
+def upload_file_size(file: UploadFile) -> int:
+    if file.size is not None:
+        return file.size
+    file.file.seek(0, 2)
+    size = file.file.tell()
+    file.file.seek(0)
+    return size
+
+
+def collect_upload_sources(
+    files: List[UploadFile],
+    archives: List[zipfile.ZipFile]
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, str]]]:
+    sources = []
+    rejected = []
+    
+    for file in files:
+        filename = file.filename or "unnamed"
+        
+        if filename.lower().endswith(".zip"):
+            try:
+                archive = zipfile.ZipFile(file.file)
+            except zipfile.BadZipFile:
+                rejected.append({"name": filename, "reason": "Invalid zip archive"})
+                continue
+            archives.append(archive)
+            
+            entries = [info for info in archive.infolist() if not info.is_dir()]
+            if sum(info.file_size for info in entries) > settings.ZIP_MAX_TOTAL_SIZE:
+                rejected.append({"name": filename, "reason": "Archive exceeds ZIP_MAX_TOTAL_SIZE when extracted"})
+                continue
+            
+            for info in entries:
+                entry_name = zip_entry_name(info)
+                base_name = os.path.basename(entry_name)
+                if not base_name or base_name.startswith(".") or entry_name.startswith("__MACOSX/"):
+                    continue
+                if info.file_size > settings.MAX_FILE_SIZE:
+                    rejected.append({"name": f"{filename}/{entry_name}", "reason": "File exceeds MAX_FILE_SIZE"})
+                    continue
+                sources.append({
+                    "name": base_name,
+                    "size": info.file_size,
+                    "open": lambda archive=archive, info=info: archive.open(info)
+                })
+            continue
+        
+        size = upload_file_size(file)
+        if size > settings.MAX_FILE_SIZE:
+            rejected.append({"name": filename, "reason": "File exceeds MAX_FILE_SIZE"})
+            continue
+        sources.append({
+            "name": filename,
+            "size": size,
+            "open": lambda file=file: file.file
+        })
+    
+    return sources, rejected
+
+
+async def deduplicate_upload(
+    session: Session,
+    project_id: UUID,
+    upload_result: Dict[str, Any]
+) -> Tuple[Optional[Document], str]:
+    uploaded_path = f"{upload_result['bucket_name']}/{upload_result['object_name']}"
+    content_hash = upload_result["sha256"]
+    
+    same_project = session.exec(
+        select(Document)
+        .where(Document.content_hash == content_hash)
+        .where(Document.project_id == project_id)
+        .limit(1)
+    ).first()
+    existing = same_project or session.exec(
+        select(Document).where(Document.content_hash == content_hash).limit(1)
+    ).first()
+    
+    if existing is None or existing.file_path == uploaded_path:
+        return same_project, uploaded_path
+    
+    await asyncio.to_thread(
+        minio_service.delete_file,
+        str(project_id),
+        upload_result["object_name"],
+        bucket_name=upload_result["bucket_name"]
+    )
+    logger.info(f"Upload {upload_result['object_name']} duplicates document {existing.id}, reusing {existing.file_path}")
+    return same_project, existing.file_path
+
+
+def release_file(session: Session, document: Document, file_path: str):
+    references = session.exec(
+        select(func.count())
+        .select_from(Document)
+        .where(Document.file_path == file_path)
+        .where(Document.id != document.id)
+    ).one()
+    if references == 0:
+        bucket_name, object_name = minio_service.split_file_path(file_path)
+        minio_service.delete_file(document.project_id, object_name, bucket_name=bucket_name)
+    else:
+        logger.info(f"Keeping {file_path}, still referenced by {references} documents")
+
+
+def start_parse_job(
+    session: Session,
+    document: Document,
+    background_tasks: BackgroundTasks
+) -> ParseJob:
+    previous_status = document.status
+    document.status = DocStatus.PROCESSING
+    session.add(document)
+    job = parse_job_service.create_job(session, document)
+    
+    try:
+        parse_job_service.enqueue(session, job, background_tasks)
+    except Exception as e:
+        logger.error(f"Failed to enqueue parse job for document {document.id}: {e}")
+        job.status = JobStatus.FAILED
+        job.error = f"Failed to enqueue: {e}"
+        document.status = previous_status
+        session.add(job)
+        session.add(document)
+        session.commit()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Parse queue unavailable, please retry later"
+        )
+    
+    return job
+
+
 @router.post("/upload/{project_id}", response_model=DocumentRead, status_code=status.HTTP_201_CREATED)
 async def upload_document(
     project_id: UUID,
+    response: Response,
     file: UploadFile = File(...),
     doc_type: DocType = None,
     session: Session = Depends(get_session)
@@ -80,23 +262,32 @@ async def upload_document(
     
     content_type = get_content_type(file.filename or "unknown")
     
-    file_content = await file.read()
-    file_size = len(file_content)
+    if file.size is not None and file.size > settings.MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File exceeds maximum size of {settings.MAX_FILE_SIZE} bytes"
+        )
     
     timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-    safe_filename = f"{timestamp}_{file.filename}"
+    safe_filename = f"{timestamp}_{uuid4().hex[:8]}_{file.filename}"
     
     try:
-        upload_result = await minio_service.upload_file(
+        upload_result = await minio_service.upload_stream(
             project_id=str(project_id),
             file_name=safe_filename,
-            file_data=__import__('io').BytesIO(file_content),
+            stream=file.file,
             content_type=content_type,
-            file_size=file_size
+            max_size=settings.MAX_FILE_SIZE
         )
         
-        minio_path = f"{upload_result['bucket_name']}/{safe_filename}"
+        file_size = upload_result["size"]
+        duplicate, minio_path = await deduplicate_upload(session, project_id, upload_result)
         
+    except FileTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Failed to upload to MinIO: {e}")
         raise HTTPException(
@@ -104,12 +295,17 @@ async def upload_document(
             detail=f"Failed to upload file: {str(e)}"
         )
     
+    if duplicate is not None:
+        response.status_code = status.HTTP_200_OK
+        return duplicate
+    
     document = Document(
         project_id=project_id,
         name=file.filename or "unnamed",
         doc_type=doc_type,
         file_path=minio_path,
         file_size=file_size,
+        content_hash=upload_result["sha256"],
         status=DocStatus.PENDING
     )
     
@@ -120,6 +316,135 @@ async def upload_document(
     return document
 
 
+@router.post("/upload-batch/{project_id}", status_code=status.HTTP_201_CREATED)
+async def upload_documents_batch(
+    project_id: UUID,
+    background_tasks: BackgroundTasks,
+    files: List[UploadFile] = File(...),
+    parse: bool = True,
+    session: Session = Depends(get_session)
+):
+    project = session.get(Project, project_id)
+    if not project:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Project {project_id} not found"
+        )
+    
+    archives: List[zipfile.ZipFile] = []
+    try:
+        sources, rejected = collect_upload_sources(files, archives)
+        
+        if len(sources) > settings.BATCH_UPLOAD_MAX_FILES:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Batch contains {len(sources)} files, limit is {settings.BATCH_UPLOAD_MAX_FILES}"
+            )
+        
+        timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+        semaphore = asyncio.Semaphore(settings.BATCH_UPLOAD_CONCURRENCY)
+        
+        async def upload_source(source: Dict[str, Any]) -> Dict[str, Any]:
+            safe_filename = f"{timestamp}_{uuid4().hex[:8]}_{source['name']}"
+            async with semaphore:
+                return await minio_service.upload_stream(
+                    project_id=str(project_id),
+                    file_name=safe_filename,
+                    stream=source["open"](),
+                    content_type=get_content_type(source["name"]),
+                    max_size=settings.MAX_FILE_SIZE
+                )
+        
+        results = await asyncio.gather(
+            *[upload_source(source) for source in sources],
+            return_exceptions=True
+        )
+    finally:
+        for archive in archives:
+            archive.close()
+    
+    documents = []
+    duplicates = []
+    batch_hashes: Dict[str, Document] = {}
+    for source, result in zip(sources, results):
+        if isinstance(result, Exception):
+            logger.error(f"Failed to upload {source['name']} to MinIO: {result}")
+            rejected.append({"name": source["name"], "reason": f"Failed to upload file: {result}"})
+            continue
+        
+        in_batch = batch_hashes.get(result["sha256"])
+        if in_batch is not None:
+            await asyncio.to_thread(
+                minio_service.delete_file,
+                str(project_id),
+                result["object_name"],
+                bucket_name=result["bucket_name"]
+            )
+            duplicates.append({"name": source["name"], "duplicate_of": in_batch.name})
+            continue
+        
+        duplicate, file_path = await deduplicate_upload(session, project_id, result)
+        if duplicate is not None:
+            duplicates.append({"name": source["name"], "document_id": str(duplicate.id)})
+            continue
+        
+        document = Document(
+            project_id=project_id,
+            name=source["name"],
+            doc_type=detect_doc_type(source["name"]),
+            file_path=file_path,
+            file_size=result["size"],
+            content_hash=result["sha256"],
+            status=DocStatus.PROCESSING if parse else DocStatus.PENDING
+        )
+        batch_hashes[result["sha256"]] = document
+        documents.append(document)
+    
+    session.add_all(documents)
+    session.commit()
+    for document in documents:
+        session.refresh(document)
+    
+    batch_id = None
+    enqueue_failed = []
+    if parse and documents:
+        batch_id = uuid4()
+        jobs = parse_job_service.create_jobs(session, documents, batch_id=batch_id)
+        enqueue_failed = parse_job_service.enqueue_many(session, jobs, background_tasks)
+        
+        if enqueue_failed:
+            failed_ids = {job.document_id for job in enqueue_failed}
+            for document in documents:
+                if document.id in failed_ids:
+                    document.status = DocStatus.PENDING
+                    session.add(document)
+            session.commit()
+    
+    logger.info(f"Batch upload to project {project_id}: {len(documents)} stored, {len(duplicates)} duplicates, {len(rejected)} rejected")
+    
+    return {
+        "batch_id": str(batch_id) if batch_id else None,
+        "documents": [DocumentRead.model_validate(document) for document in documents],
+        "rejected": rejected,
+        "duplicates": duplicates,
+        "enqueue_failed": [str(job.document_id) for job in enqueue_failed]
+    }
+
+
+@router.get("/batches/{batch_id}")
+async def get_batch_status(
+    batch_id: UUID,
+    session: Session = Depends(get_session)
+):
+    summary = parse_job_service.get_batch_summary(session, batch_id)
+    if summary is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Batch {batch_id} not found"
+        )
+    return summary
+
+
 @router.get("/", response_model=List[DocumentRead])
 async def list_documents(
     project_id: UUID = None,
@@ -127,7 +452,7 @@ async def list_documents(
     limit: int = 100,
     session: Session = Depends(get_session)
 ) -> List[Document]:
-    query = select(Document)
+    query = select(Document).options(defer(Document.parsed_content))
     if project_id:
         query = query.where(Document.project_id == project_id)
     query = query.offset(skip).limit(limit)
@@ -140,7 +465,7 @@ async def get_document(
     document_id: UUID,
     session: Session = Depends(get_session)
 ) -> Document:
-    document = session.get(Document, document_id)
+    document = session.get(Document, document_id, options=[defer(Document.parsed_content)])
     if not document:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -152,9 +477,11 @@ async def get_document(
 @router.get("/{document_id}/download")
 async def download_document(
     document_id: UUID,
+    request: Request,
+    redirect: bool = False,
     session: Session = Depends(get_session)
 ):
-    document = session.get(Document, document_id)
+    document = session.get(Document, document_id, options=[defer(Document.parsed_content)])
     if not document:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -167,26 +494,90 @@ async def download_document(
             detail="File not found in storage"
         )
     
-    parts = document.file_path.split("/")
-    object_name = "/".join(parts[1:])
+    bucket_name, object_name = minio_service.split_file_path(document.file_path)
     
-    file_data = minio_service.download_file(document.project_id, object_name)
+    if redirect:
+        url = minio_service.get_file_url(
+            document.project_id,
+            object_name,
+            expires=settings.DOWNLOAD_PRESIGNED_EXPIRES,
+            bucket_name=bucket_name
+        )
+        if not url:
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail="Failed to create download URL"
+            )
+        return RedirectResponse(url, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
     
-    if file_data is None:
+    stat = await asyncio.to_thread(
+        minio_service.stat_file,
+        document.project_id,
+        object_name,
+        bucket_name=bucket_name
+    )
+    if stat is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="File not found in MinIO"
         )
     
-    from fastapi.responses import Response
-    content_type = get_content_type(document.name)
+    size = stat["size"]
+    etag = f'"{stat["etag"]}"'
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Content-Disposition": f"attachment; filename*=UTF-8''{quote(document.name)}"
+    }
+    if stat["last_modified"]:
+        headers["Last-Modified"] = format_datetime(stat["last_modified"], usegmt=True)
     
-    return Response(
-        content=file_data,
-        media_type=content_type,
-        headers={
-            "Content-Disposition": f"attachment; filename={document.name}"
-        }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    byte_range = None
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range.strip() == etag):
+        byte_range = parse_range_header(range_header, size)
+        if byte_range == UNSATISFIABLE_RANGE:
+            raise HTTPException(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                detail="Requested range not satisfiable",
+                headers={"Content-Range": f"bytes */{size}"}
+            )
+    
+    if byte_range:
+        start, end = byte_range
+        length = end - start + 1
+        status_code = status.HTTP_206_PARTIAL_CONTENT
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    else:
+        start, length = 0, size
+        status_code = status.HTTP_200_OK
+    headers["Content-Length"] = str(length)
+    
+    try:
+        response = await asyncio.to_thread(
+            minio_service.open_file,
+            document.project_id,
+            object_name,
+            start,
+            length if byte_range else 0,
+            bucket_name=bucket_name
+        )
+    except Exception as e:
+        logger.error(f"Failed to open {object_name} from MinIO: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found in MinIO"
+        )
+    
+    return StreamingResponse(
+        minio_service.iter_response(response, settings.DOWNLOAD_CHUNK_SIZE),
+        status_code=status_code,
+        media_type=get_content_type(document.name),
+        headers=headers
     )
 
 
@@ -195,7 +586,7 @@ async def delete_document(
     document_id: UUID,
     session: Session = Depends(get_session)
 ):
-    document = session.get(Document, document_id)
+    document = session.get(Document, document_id, options=[defer(Document.parsed_content)])
     if not document:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -203,88 +594,128 @@ async def delete_document(
         )
     
     if document.file_path:
-        parts = document.file_path.split("/")
-        object_name = "/".join(parts[1:])
-        minio_service.delete_file(document.project_id, object_name)
+        release_file(session, document, document.file_path)
+    if document.content_path:
+        artifact_store.release(session, document, document.content_path)
     
     milvus_service.delete_document_vectors(str(document.project_id), str(document_id))
     
+    session.exec(delete(ParseJob).where(ParseJob.document_id == document_id))
     session.delete(document)
     session.commit()
     return None
 
 
-@router.post("/{document_id}/parse", status_code=status.HTTP_202_ACCEPTED)
-async def parse_document(
+@router.post("/{document_id}/versions", response_model=DocumentRead)
+async def upload_document_version(
     document_id: UUID,
     background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    parse: bool = True,
     session: Session = Depends(get_session)
-):
-    document = session.get(Document, document_id)
+) -> Document:
+    document = session.get(Document, document_id, options=[defer(Document.parsed_content)])
     if not document:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Document {document_id} not found"
         )
     
-    document.status = DocStatus.PROCESSING
+    if parse_job_service.get_active_job(session, document_id):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Document parsing in progress, retry once it has finished"
+        )
+    
+    if file.size is not None and file.size > settings.MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File exceeds maximum size of {settings.MAX_FILE_SIZE} bytes"
+        )
+    
+    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    safe_filename = f"{timestamp}_{uuid4().hex[:8]}_{file.filename or document.name}"
+    
+    try:
+        upload_result = await minio_service.upload_stream(
+            project_id=str(document.project_id),
+            file_name=safe_filename,
+            stream=file.file,
+            content_type=get_content_type(document.name),
+            max_size=settings.MAX_FILE_SIZE
+        )
+    except FileTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Failed to upload to MinIO: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to upload file: {str(e)}"
+        )
+    
+    if upload_result["sha256"] == document.content_hash:
+        await asyncio.to_thread(
+            minio_service.delete_file,
+            str(document.project_id),
+            upload_result["object_name"],
+            bucket_name=upload_result["bucket_name"]
+        )
+        logger.info(f"Document {document_id} version upload is identical to the current version")
+        return document
+    
+    _, file_path = await deduplicate_upload(session, document.project_id, upload_result)
+    previous_path = document.file_path
+    
+    document.file_path = file_path
+    document.file_size = upload_result["size"]
+    document.content_hash = upload_result["sha256"]
+    document.version = (document.version or 1) + 1
+    document.status = DocStatus.PENDING
+    document.updated_at = datetime.utcnow()
     session.add(document)
     session.commit()
     
-    background_tasks.add_task(
-        parse_document_task,
-        document_id=str(document_id)
-    )
+    if previous_path and previous_path != file_path:
+        release_file(session, document, previous_path)
+    
+    if parse:
+        start_parse_job(session, document, background_tasks)
     
-    return {"message": "Document parsing started", "document_id": str(document_id)}
+    session.refresh(document)
+    return document
 
 
-async def parse_document_task(document_id: str):
-    from sqlmodel import Session
-    from app.core.database import engine
+@router.post("/{document_id}/parse", status_code=status.HTTP_202_ACCEPTED)
+async def parse_document(
+    document_id: UUID,
+    background_tasks: BackgroundTasks,
+    session: Session = Depends(get_session)
+):
+    document = session.get(Document, document_id, options=[defer(Document.parsed_content)])
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Document {document_id} not found"
+        )
     
-    with Session(engine) as session:
-        document = session.get(Document, document_id)
-        if not document:
-            logger.error(f"Document {document_id} not found in background task")
-            return
-        
-        try:
-            parts = document.file_path.split("/")
-            object_name = "/".join(parts[1:])
-            
-            file_data = minio_service.download_file(document.project_id, object_name)
-            
-            if file_data is None:
-                document.status = DocStatus.FAILED
-                session.add(document)
-                session.commit()
-                return
-            
-            result = await document_parser.parse_and_store(
-                project_id=str(document.project_id),
-                document_id=str(document_id),
-                file_name=document.name,
-                file_data=file_data,
-                doc_type=document.doc_type
-            )
-            
-            if result["success"]:
-                document.parsed_content = result["content"]
-                document.status = DocStatus.PARSED
-                logger.info(f"Document {document_id} parsed successfully, {result['metadata']['chunk_count']} chunks stored to Milvus")
-            else:
-                document.status = DocStatus.FAILED
-                logger.error(f"Document {document_id} parsing failed: {result.get('error')}")
-            
-            session.add(document)
-            session.commit()
-            
-        except Exception as e:
-            logger.error(f"Error parsing document {document_id}: {e}")
-            document.status = DocStatus.FAILED
-            session.add(document)
-            session.commit()
+    active_job = parse_job_service.get_active_job(session, document_id)
+    if active_job:
+        return {
+            "message": "Document parsing already in progress",
+            "document_id": str(document_id),
+            "job_id": str(active_job.id)
+        }
+    
+    job = start_parse_job(session, document, background_tasks)
+    
+    return {
+        "message": "Document parsing started",
+        "document_id": str(document_id),
+        "job_id": str(job.id)
+    }
 
 
 @router.get("/{document_id}/parse-status")
@@ -292,7 +723,7 @@ async def get_parse_status(
     document_id: UUID,
     session: Session = Depends(get_session)
 ):
-    document = session.get(Document, document_id)
+    document = session.get(Document, document_id, options=[defer(Document.parsed_content)])
     if not document:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -300,12 +731,15 @@ async def get_parse_status(
         )
     
     vector_stats = milvus_service.get_collection_stats(str(document.project_id))
+    job = parse_job_service.get_latest_job(session, document_id)
     
     return {
         "document_id": str(document_id),
         "status": document.status,
-        "has_content": bool(document.parsed_content),
-        "content_length": len(document.parsed_content) if document.parsed_content else 0,
+        "progress": job.progress if job else (100 if document.status == DocStatus.PARSED else 0),
+        "job": ParseJobRead.model_validate(job) if job else None,
+        "has_content": bool(document.content_path or document.parsed_content),
+        "content_length": document.content_length if document.content_path else len(document.parsed_content or ""),
         "vector_collection": vector_stats
     }
 
@@ -328,7 +762,26 @@ async def get_document_content(
             detail=f"Document not parsed yet. Current status: {document.status}"
         )
     
-    return {
-        "document_id": str(document_id),
-        "content": document.parsed_content
-    }
+    texts = artifact_store.iter_document_content(document, settings.DOWNLOAD_CHUNK_SIZE)
+    try:
+        first = await asyncio.to_thread(next, texts, "")
+    except Exception as e:
+        logger.error(f"Failed to read parsed content of document {document_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to read parsed content"
+        )
+    
+    def iter_json():
+        yield '{"document_id": "%s", "content": "' % document_id
+        yield json.dumps(first)[1:-1]
+        try:
+            for text in texts:
+                yield json.dumps(text)[1:-1]
+        except Exception as e:
+            logger.error(f"Failed to stream parsed content of document {document_id}: {e}")
+            yield '", "error": "Content stream interrupted"}'
+            return
+        yield '"}'
+    
+    return StreamingResponse(iter_json(), media_type="application/json")
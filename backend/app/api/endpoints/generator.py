@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
 from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select
-from typing import List, Optional
+from typing import List, Optional, AsyncIterator
 from uuid import UUID
 from datetime import datetime
 from pydantic import BaseModel
@@ -10,11 +10,12 @@ import asyncio
 import logging
 
 from app.core.database import get_session
+from app.core.concurrency import get_generation_semaphore, run_bounded
 from app.models import (
     Document, FunctionPoint, FunctionPointCreate, FunctionPointRead,
-    TestCase, TestScript, FPStatus, DocStatus, TestType, Priority
+    TestCase, TestScript, FPStatus, DocStatus, TestType, Priority, SSEEvent
 )
-from app.services import llm_service, rag_service, milvus_service, document_parser, minio_service
+from app.services import llm_service, rag_service, milvus_service, document_parser, minio_service, llm_cache, embedding_cache, llm_scheduler
 
 router = APIRouter(prefix="/generator", tags=["Generator"])
 logger = logging.getLogger(__name__)
@@ -25,11 +26,13 @@ class GenerateFunctionPointsRequest(BaseModel):
     document_ids: Optional[List[str]] = None
     test_types: List[str] = ["functional"]
     user_requirements: Optional[str] = ""
+    bypass_cache: bool = False
 
 
 class GenerateTestCasesRequest(BaseModel):
     project_id: str
     function_point_ids: List[str]
+    bypass_cache: bool = False
 
 
 class GenerateScriptsRequest(BaseModel):
@@ -37,16 +40,19 @@ class GenerateScriptsRequest(BaseModel):
     test_case_ids: List[str]
     language: str = "python"
     framework: str = "pytest"
+    bypass_cache: bool = False
 
 
 class RefineFunctionPointRequest(BaseModel):
     function_point: dict
     user_feedback: str
     project_id: Optional[str] = None
+    bypass_cache: bool = False
 
 
 class UnderstandRequirementsRequest(BaseModel):
     user_input: str
+    bypass_cache: bool = False
 
 
 class FunctionPointSaveItem(BaseModel):
@@ -64,7 +70,10 @@ async def understand_requirements(
     request: UnderstandRequirementsRequest
 ):
     try:
-        analysis = await llm_service.understand_requirements(request.user_input)
+        analysis = await llm_service.understand_requirements(
+            request.user_input,
+            bypass_cache=request.bypass_cache
+        )
         return {
             "success": True,
             "analysis": analysis
@@ -109,7 +118,10 @@ async def generate_function_points(
     try:
         requirements_analysis = None
         if request.user_requirements:
-            requirements_analysis = await llm_service.understand_requirements(request.user_requirements)
+            requirements_analysis = await llm_service.understand_requirements(
+                request.user_requirements,
+                bypass_cache=request.bypass_cache
+            )
         
         document_context = await rag_service.retrieve_for_function_points(
             project_id=request.project_id,
@@ -129,7 +141,9 @@ async def generate_function_points(
             user_requirements=request.user_requirements or "根据文档内容生成测试功能点",
             document_context=document_context,
             test_types=request.test_types,
-            requirements_analysis=requirements_analysis
+            requirements_analysis=requirements_analysis,
+            bypass_cache=request.bypass_cache,
+            project_id=request.project_id
         )
         
         formatted_fps = []
@@ -229,7 +243,9 @@ async def refine_function_point(
         refined_fp = await llm_service.refine_function_point(
             function_point=request.function_point,
             user_feedback=request.user_feedback,
-            context=context
+            context=context,
+            bypass_cache=request.bypass_cache,
+            project_id=request.project_id
         )
         
         return {
@@ -246,28 +262,120 @@ async def refine_function_point(
         }
 
 
+def load_function_points(session: Session, function_point_ids: List[str]) -> List[FunctionPoint]:
+    function_points = []
+    for fp_id in function_point_ids or []:
+        try:
+            fp = session.get(FunctionPoint, fp_id)
+            if fp:
+                function_points.append(fp)
+                logger.info(f"Found function point: {fp.name}")
+            else:
+                logger.warning(f"Function point not found: {fp_id}")
+        except Exception as e:
+            logger.error(f"Error getting function point {fp_id}: {e}")
+    return function_points
+
+
+def function_point_payload(fp: FunctionPoint) -> dict:
+    return {
+        "id": str(fp.id),
+        "project_id": str(fp.project_id),
+        "name": fp.name,
+        "description": fp.description,
+        "test_type": fp.test_type.value if hasattr(fp.test_type, 'value') else str(fp.test_type),
+        "priority": fp.priority.value if hasattr(fp.priority, 'value') else str(fp.priority),
+        "module": fp.module,
+        "acceptance_criteria": fp.acceptance_criteria
+    }
+
+
+def fallback_test_case(fp: dict, error: Exception) -> dict:
+    return {
+        "title": f"测试_{fp['name']}",
+        "description": fp.get("description") or "",
+        "test_type": fp.get("test_type") or "functional",
+        "test_category": "functional",
+        "priority": fp.get("priority") or "p2",
+        "preconditions": "",
+        "test_steps": [],
+        "expected_results": fp.get("acceptance_criteria") or "",
+        "function_point_id": fp["id"],
+        "project_id": fp["project_id"],
+        "error": str(error)
+    }
+
+
+def test_case_payload(tc: TestCase) -> dict:
+    return {
+        "id": str(tc.id),
+        "project_id": str(tc.project_id),
+        "title": tc.title,
+        "description": tc.description,
+        "preconditions": tc.preconditions,
+        "test_steps": tc.test_steps,
+        "expected_results": tc.expected_results
+    }
+
+
+def script_payload(tc: dict, language: str, framework: str, content: str) -> dict:
+    return {
+        "project_id": tc["project_id"],
+        "test_case_id": tc["id"],
+        "name": f"test_{tc['title'].lower().replace(' ', '_')[:30]}",
+        "language": language,
+        "framework": framework,
+        "content": content
+    }
+
+
+def format_sse(event_type: str, stage: str, message: str, data: Optional[dict] = None) -> str:
+    event = SSEEvent(event_type=event_type, stage=stage, message=message, data=data)
+    return f"event: {event_type}\ndata: {event.model_dump_json()}\n\n"
+
+
+async def stream_fan_out(items: list, worker) -> AsyncIterator[str]:
+    queue: asyncio.Queue = asyncio.Queue()
+    
+    semaphore = get_generation_semaphore()
+    
+    async def run(index: int, item):
+        try:
+            async with semaphore:
+                async for event in worker(index, item):
+                    await queue.put(event)
+        finally:
+            await queue.put(None)
+    
+    tasks = [asyncio.create_task(run(i, item)) for i, item in enumerate(items)]
+    try:
+        finished = 0
+        while finished < len(tasks):
+            event = await queue.get()
+            if event is None:
+                finished += 1
+                continue
+            yield event
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no"
+}
+
+
 @router.post("/test-cases")
 async def generate_test_cases(
     request: GenerateTestCasesRequest,
     session: Session = Depends(get_session)
 ):
-    import asyncio
-    
     logger.info(f"Generating test cases for project {request.project_id}")
     logger.info(f"Function point IDs: {request.function_point_ids}")
     
-    function_points = []
-    if request.function_point_ids:
-        for fp_id in request.function_point_ids:
-            try:
-                fp = session.get(FunctionPoint, fp_id)
-                if fp:
-                    function_points.append(fp)
-                    logger.info(f"Found function point: {fp.name}")
-                else:
-                    logger.warning(f"Function point not found: {fp_id}")
-            except Exception as e:
-                logger.error(f"Error getting function point {fp_id}: {e}")
+    function_points = load_function_points(session, request.function_point_ids)
     
     if not function_points:
         logger.warning("No function points found")
@@ -277,63 +385,38 @@ async def generate_test_cases(
             "test_cases": []
         }
     
-    async def generate_single_test_case(fp):
+    payloads = [function_point_payload(fp) for fp in function_points]
+    contexts = asyncio.ensure_future(rag_service.retrieve_for_test_cases(payloads))
+    
+    async def generate_single_test_case(index: int, fp: dict):
         try:
-            logger.info(f"Generating test case for FP: {fp.name}")
+            logger.info(f"Generating test case for FP: {fp['name']}")
             
-            document_context = await rag_service.retrieve_for_test_case(
-                project_id=str(fp.project_id),
-                function_point={
-                    "name": fp.name,
-                    "description": fp.description,
-                    "acceptance_criteria": fp.acceptance_criteria
-                }
-            )
+            document_context = (await contexts)[index]
             
-            logger.info(f"Document context length for {fp.name}: {len(document_context) if document_context else 0}")
+            logger.info(f"Document context length for {fp['name']}: {len(document_context) if document_context else 0}")
             
             tc_data = await llm_service.generate_test_case(
-                function_point={
-                    "id": str(fp.id),
-                    "project_id": str(fp.project_id),
-                    "name": fp.name,
-                    "description": fp.description,
-                    "test_type": fp.test_type.value if hasattr(fp.test_type, 'value') else str(fp.test_type),
-                    "priority": fp.priority.value if hasattr(fp.priority, 'value') else str(fp.priority),
-                    "module": fp.module,
-                    "acceptance_criteria": fp.acceptance_criteria
-                },
-                document_context=document_context
+                function_point=fp,
+                document_context=document_context,
+                bypass_cache=request.bypass_cache
             )
             
             logger.info(f"Generated test case: {tc_data.get('title', 'No title')}")
             return tc_data
             
         except Exception as e:
-            logger.error(f"Failed to generate test case for FP {fp.id}: {e}", exc_info=True)
-            return {
-                "title": f"测试_{fp.name}",
-                "description": fp.description or "",
-                "test_type": fp.test_type.value if hasattr(fp, 'test_type') and hasattr(fp.test_type, 'value') else "functional",
-                "test_category": "functional",
-                "priority": fp.priority.value if hasattr(fp, 'priority') and hasattr(fp.priority, 'value') else "p2",
-                "preconditions": "",
-                "test_steps": [],
-                "expected_results": fp.acceptance_criteria or "",
-                "function_point_id": str(fp.id),
-                "project_id": str(fp.project_id),
-                "error": str(e)
-            }
+            logger.error(f"Failed to generate test case for FP {fp['id']}: {e}", exc_info=True)
+            return fallback_test_case(fp, e)
     
     logger.info(f"Starting parallel generation for {len(function_points)} function points")
     
-    tasks = [generate_single_test_case(fp) for fp in function_points]
-    test_cases = await asyncio.gather(*tasks, return_exceptions=True)
+    results = await run_bounded(enumerate(payloads), lambda item: generate_single_test_case(*item))
     
     valid_test_cases = []
-    for i, tc in enumerate(test_cases):
-        if isinstance(tc, Exception):
-            logger.error(f"Exception in task {i}: {tc}")
+    for i, (tc, error) in enumerate(results):
+        if error is not None:
+            logger.error(f"Exception in task {i}: {error}")
         elif tc:
             valid_test_cases.append(tc)
     
@@ -346,6 +429,52 @@ async def generate_test_cases(
     }
 
 
+@router.post("/test-cases/stream")
+async def stream_test_cases(
+    request: GenerateTestCasesRequest,
+    session: Session = Depends(get_session)
+):
+    function_points = [function_point_payload(fp) for fp in load_function_points(session, request.function_point_ids)]
+    
+    async def event_stream() -> AsyncIterator[str]:
+        if not function_points:
+            yield format_sse("error", "test_case", "未找到功能点")
+            return
+        
+        yield format_sse("start", "test_case", f"开始生成 {len(function_points)} 个测试用例", {"total": len(function_points)})
+        
+        contexts = asyncio.ensure_future(rag_service.retrieve_for_test_cases(function_points))
+        
+        async def generate_single_test_case(index: int, fp: dict) -> AsyncIterator[str]:
+            yield format_sse("progress", "test_case", f"开始生成: {fp['name']}", {"index": index, "function_point_id": fp["id"]})
+            
+            try:
+                document_context = (await contexts)[index]
+                
+                async for event in llm_service.stream_test_case(
+                    function_point=fp,
+                    document_context=document_context,
+                    bypass_cache=request.bypass_cache
+                ):
+                    if event["type"] == "delta":
+                        yield format_sse("delta", "test_case", "", {"index": index, "content": event["content"]})
+                    else:
+                        yield format_sse("result", "test_case", f"生成完成: {fp['name']}", {"index": index, "test_case": event["test_case"]})
+            except Exception as e:
+                logger.error(f"Failed to stream test case for FP {fp['id']}: {e}", exc_info=True)
+                yield format_sse("error", "test_case", f"生成失败: {fp['name']}", {"index": index, "test_case": fallback_test_case(fp, e)})
+        
+        try:
+            async for event in stream_fan_out(function_points, generate_single_test_case):
+                yield event
+        finally:
+            contexts.cancel()
+        
+        yield format_sse("done", "test_case", "测试用例生成完成", {"total": len(function_points)})
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
 @router.post("/test-cases/save")
 async def save_test_cases(
     test_cases: List[dict],
@@ -449,41 +578,86 @@ async def generate_scripts(
             "scripts": []
         }
     
-    scripts = []
+    async def generate_single_script(tc: dict) -> dict:
+        script_content = await llm_service.generate_test_script(
+            test_case=tc,
+            language=request.language,
+            framework=request.framework,
+            bypass_cache=request.bypass_cache
+        )
+        return script_payload(tc, request.language, request.framework, script_content)
     
-    for tc in test_cases:
-        try:
-            script_content = await llm_service.generate_test_script(
-                test_case={
-                    "title": tc.title,
-                    "description": tc.description,
-                    "preconditions": tc.preconditions,
-                    "test_steps": tc.test_steps,
-                    "expected_results": tc.expected_results
-                },
-                language=request.language,
-                framework=request.framework
-            )
-            
-            scripts.append({
-                "project_id": str(tc.project_id),
-                "test_case_id": str(tc.id),
-                "name": f"test_{tc.title.lower().replace(' ', '_')[:30]}",
-                "language": request.language,
-                "framework": request.framework,
-                "content": script_content
+    payloads = [test_case_payload(tc) for tc in test_cases]
+    results = await run_bounded(payloads, generate_single_script)
+    
+    scripts = []
+    errors = []
+    for i, (script, error) in enumerate(results):
+        if error is not None:
+            logger.error(f"Failed to generate script for TC {payloads[i]['id']}: {error}")
+            errors.append({
+                "index": i,
+                "test_case_id": payloads[i]["id"],
+                "error": str(error)
             })
-            
-        except Exception as e:
-            logger.error(f"Failed to generate script for TC {tc.id}: {e}")
+        else:
+            scripts.append(script)
     
     return {
         "success": True,
-        "message": "测试脚本生成成功",
-        "scripts": scripts
+        "message": f"成功生成 {len(scripts)} 个测试脚本" + (f"，{len(errors)} 个失败" if errors else ""),
+        "scripts": scripts,
+        "errors": errors
     }
 
 
+@router.post("/scripts/stream")
+async def stream_scripts(
+    request: GenerateScriptsRequest,
+    session: Session = Depends(get_session)
+):
+    test_cases = []
+    for tc_id in request.test_case_ids or []:
+        tc = session.get(TestCase, tc_id)
+        if tc:
+            test_cases.append(test_case_payload(tc))
+    
+    async def generate_single_script(index: int, tc: dict) -> AsyncIterator[str]:
+        yield format_sse("progress", "script", f"开始生成: {tc['title']}", {"index": index, "test_case_id": tc["id"]})
+        
+        try:
+            async for event in llm_service.stream_test_script(
+                test_case=tc,
+                language=request.language,
+                framework=request.framework,
+                bypass_cache=request.bypass_cache
+            ):
+                if event["type"] == "delta":
+                    yield format_sse("delta", "script", "", {"index": index, "content": event["content"]})
+                else:
+                    yield format_sse("result", "script", f"生成完成: {tc['title']}", {
+                        "index": index,
+                        "script": script_payload(tc, request.language, request.framework, event["content"])
+                    })
+        except Exception as e:
+            logger.error(f"Failed to stream script for TC {tc['id']}: {e}")
+            yield format_sse("error", "script", f"生成失败: {tc['title']}", {"index": index, "test_case_id": tc["id"], "error": str(e)})
+    
+    async def event_stream() -> AsyncIterator[str]:
+        if not test_cases:
+            yield format_sse("error", "script", "未找到测试用例")
+            return
+        
+        yield format_sse("start", "script", f"开始生成 {len(test_cases)} 个测试脚本", {"total": len(test_cases)})
+        
+        async for event in stream_fan_out(test_cases, generate_single_script):
+            yield event
+        
+        yield format_sse("done", "script", "测试脚本生成完成", {"total": len(test_cases)})
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
 @router.post("/scripts/save")
 async def save_scripts(
     scripts: List[dict],
@@ -514,6 +688,16 @@ async def save_scripts(
     }
 
 
+@router.get("/llm-stats")
+async def get_llm_stats():
+    return {
+        "http_pool": llm_service.get_pool_stats(),
+        "response_cache": llm_cache.get_stats(),
+        "embedding_cache": embedding_cache.get_stats(),
+        "scheduler": llm_scheduler.get_stats()
+    }
+
+
 @router.get("/vector-stats/{project_id}")
 async def get_vector_stats(project_id: str):
     stats = milvus_service.get_collection_stats(project_id)
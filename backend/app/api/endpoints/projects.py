@@ -1,25 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
 from sqlmodel import Session, select, func, delete
-from typing import List, Dict, Any
+from sqlalchemy.orm import defer
+from typing import List, Dict, Any, Optional
 from uuid import UUID
 import logging
 
 from app.core.database import get_session
 from app.models import (
     Project, ProjectCreate, ProjectUpdate, ProjectRead,
-    ProjectStatus, Document, FunctionPoint, TestCase, TestScript, MindMapNode, DocStatus
+    ProjectStatus, Document, ParseJob, FunctionPoint, TestCase, TestScript, MindMapNode, DocStatus
 )
+from app.services import milvus_service, artifact_store, index_planner, IndexProfileError
+from app.api.endpoints.documents import release_file
 
 router = APIRouter(prefix="/projects", tags=["Projects"])
 logger = logging.getLogger(__name__)
 
 
+def validate_index_profile(profile: Optional[str]) -> Optional[str]:
+    if profile is None:
+        return None
+    try:
+        return index_planner.normalize(profile)
+    except IndexProfileError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
 @router.post("/", response_model=ProjectRead, status_code=status.HTTP_201_CREATED)
 async def create_project(
     project_data: ProjectCreate,
     session: Session = Depends(get_session)
 ) -> Project:
     project = Project(**project_data.model_dump())
+    project.vector_index_profile = validate_index_profile(project.vector_index_profile)
     session.add(project)
     session.commit()
     session.refresh(project)
@@ -100,6 +116,7 @@ async def get_project_stats(
 async def update_project(
     project_id: UUID,
     project_data: ProjectUpdate,
+    background_tasks: BackgroundTasks,
     session: Session = Depends(get_session)
 ) -> Project:
     project = session.get(Project, project_id)
@@ -110,6 +127,11 @@ async def update_project(
         )
     
     update_data = project_data.model_dump(exclude_unset=True)
+    if "vector_index_profile" in update_data:
+        update_data["vector_index_profile"] = validate_index_profile(update_data["vector_index_profile"])
+        if update_data["vector_index_profile"] != project.vector_index_profile:
+            background_tasks.add_task(milvus_service.ensure_index, str(project_id), update_data["vector_index_profile"])
+    
     for key, value in update_data.items():
         setattr(project, key, value)
     
@@ -144,10 +166,28 @@ async def delete_project(
     
     session.exec(delete(FunctionPoint).where(FunctionPoint.project_id == project_id))
     
-    session.exec(delete(Document).where(Document.project_id == project_id))
+    session.exec(delete(ParseJob).where(ParseJob.project_id == project_id))
+    
+    documents = session.exec(
+        select(Document)
+        .where(Document.project_id == project_id)
+        .options(defer(Document.parsed_content))
+    ).all()
+    for document in documents:
+        if document.file_path:
+            release_file(session, document, document.file_path)
+        if document.content_path:
+            artifact_store.release(session, document, document.content_path)
+        session.delete(document)
+        session.flush()
     
     session.delete(project)
     session.commit()
     
+    try:
+        milvus_service.delete_collection(str(project_id))
+    except Exception as e:
+        logger.warning(f"Failed to drop vector collection of project {project_id}: {e}")
+    
     logger.info(f"Project {project_id} deleted successfully")
     return None
@@ -1,4 +1,9 @@
 from app.core.config import settings, get_settings
 from app.core.database import get_session, get_async_session, init_db, close_db
+from app.core.redis import get_redis, close_redis
+from app.core.concurrency import get_generation_semaphore, run_bounded
 
-__all__ = ["settings", "get_settings", "get_session", "get_async_session", "init_db", "close_db"]
+__all__ = [
+    "settings", "get_settings", "get_session", "get_async_session", "init_db", "close_db",
+    "get_redis", "close_redis", "get_generation_semaphore", "run_bounded"
+]
@@ -0,0 +1,30 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+
+_generation_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def get_generation_semaphore() -> asyncio.Semaphore:
+    global _generation_semaphore
+    if _generation_semaphore is None:
+        _generation_semaphore = asyncio.Semaphore(max(1, settings.GENERATION_CONCURRENCY))
+    return _generation_semaphore
+
+
+async def run_bounded(
+    items: Iterable[Any],
+    worker: Callable[[Any], Awaitable[Any]],
+    semaphore: Optional[asyncio.Semaphore] = None
+) -> List[Tuple[Any, Optional[Exception]]]:
+    semaphore = semaphore or get_generation_semaphore()
+    
+    async def run(item: Any) -> Tuple[Any, Optional[Exception]]:
+        async with semaphore:
+            try:
+                return await worker(item), None
+            except Exception as e:
+                return None, e
+    
+    return list(await asyncio.gather(*(run(item) for item in items)))
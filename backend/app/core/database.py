@@ -1,9 +1,13 @@
 from sqlmodel import SQLModel, create_engine, Session
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy import inspect, text
 from app.core.config import settings
 from typing import AsyncGenerator
 import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
 
 DATABASE_URL_SYNC = settings.DATABASE_URL
 DATABASE_URL_ASYNC = settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://")
@@ -31,9 +35,34 @@ async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
         yield session
 
 
+def add_missing_columns(conn):
+    inspector = inspect(conn)
+    existing_tables = set(inspector.get_table_names())
+    
+    for table in SQLModel.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns or not column.nullable:
+                continue
+            
+            column_type = column.type.compile(dialect=conn.dialect)
+            conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+            logger.info(f"Added column {table.name}.{column.name}")
+            
+            if column.index:
+                conn.execute(text(
+                    f'CREATE INDEX IF NOT EXISTS "ix_{table.name}_{column.name}" '
+                    f'ON "{table.name}" ("{column.name}")'
+                ))
+
+
 async def init_db():
     async with async_engine.begin() as conn:
         await conn.run_sync(SQLModel.metadata.create_all)
+        await conn.run_sync(add_missing_columns)
 
 
 async def close_db():
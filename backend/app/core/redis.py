@@ -0,0 +1,48 @@
+import logging
+from typing import Optional
+import redis
+import redis.asyncio as aioredis
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_redis: Optional[aioredis.Redis] = None
+_sync_redis: Optional[redis.Redis] = None
+
+
+def get_redis() -> aioredis.Redis:
+    global _redis
+    if _redis is None:
+        _redis = aioredis.from_url(
+            settings.REDIS_URL,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT
+        )
+    return _redis
+
+
+def get_sync_redis() -> redis.Redis:
+    global _sync_redis
+    if _sync_redis is None:
+        _sync_redis = redis.Redis.from_url(
+            settings.REDIS_URL,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT
+        )
+    return _sync_redis
+
+
+async def close_redis():
+    global _redis, _sync_redis
+    if _redis is not None:
+        client = _redis
+        _redis = None
+        try:
+            await client.aclose()
+        except AttributeError:
+            await client.close()
+        logger.info("Redis connection closed")
+    if _sync_redis is not None:
+        _sync_redis.close()
+        _sync_redis = None
@@ -1,11 +1,16 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from sqlmodel import Session, select
+import asyncio
 import logging
 import os
 
 from app.core.config import settings
-from app.core.database import init_db, close_db
+from app.core.database import engine, init_db, close_db
+from app.core.redis import close_redis
+from app.models import Project
+from app.services import llm_service, milvus_service, parser_pool
 from app.api import (
     projects_router,
     documents_router,
@@ -22,6 +27,18 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def preload_vector_collections(limit: int) -> int:
+    try:
+        with Session(engine) as session:
+            project_ids = session.exec(
+                select(Project.id).order_by(Project.updated_at.desc()).limit(limit)
+            ).all()
+        return milvus_service.preload_collections(str(project_id) for project_id in project_ids)
+    except Exception as e:
+        logger.warning(f"Failed to preload Milvus collections: {e}")
+        return 0
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Starting up E2E Test Generator...")
@@ -32,9 +49,27 @@ async def lifespan(app: FastAPI):
     await init_db()
     logger.info("Database initialized")
     
+    await llm_service.start()
+    parser_pool.start()
+    
+    preload_task = None
+    if settings.MILVUS_PRELOAD_PROJECTS > 0:
+        preload_task = asyncio.create_task(
+            asyncio.to_thread(preload_vector_collections, settings.MILVUS_PRELOAD_PROJECTS)
+        )
+    
     yield
     
     logger.info("Shutting down E2E Test Generator...")
+    if preload_task is not None and not preload_task.done():
+        preload_task.cancel()
+    try:
+        await milvus_service.flush()
+    except Exception as e:
+        logger.error(f"Failed to flush buffered vectors: {e}")
+    parser_pool.shutdown()
+    await llm_service.close()
+    await close_redis()
     await close_db()
     logger.info("Database connections closed")
 
@@ -1,11 +1,11 @@
 from app.models.db import (
-    Project, Document, FunctionPoint, TestCase, TestScript, MindMapNode,
-    DocType, DocStatus, TestType, Priority, FPStatus, TCStatus, 
+    Project, Document, ParseJob, FunctionPoint, TestCase, TestScript, MindMapNode,
+    DocType, DocStatus, JobStatus, TestType, Priority, FPStatus, TCStatus, 
     ProjectStatus, ScriptLanguage, ScriptStatus, NodeType
 )
 from app.models.schemas import (
     ProjectCreate, ProjectUpdate, ProjectRead,
-    DocumentCreate, DocumentRead,
+    DocumentCreate, DocumentRead, ParseJobRead,
     FunctionPointCreate, FunctionPointUpdate, FunctionPointRead,
     TestCaseCreate, TestCaseUpdate, TestCaseRead, TestStepSchema,
     TestScriptCreate, TestScriptUpdate, TestScriptRead,
@@ -16,11 +16,11 @@ from app.models.schemas import (
 )
 
 __all__ = [
-    "Project", "Document", "FunctionPoint", "TestCase", "TestScript", "MindMapNode",
-    "DocType", "DocStatus", "TestType", "Priority", "FPStatus", "TCStatus",
+    "Project", "Document", "ParseJob", "FunctionPoint", "TestCase", "TestScript", "MindMapNode",
+    "DocType", "DocStatus", "JobStatus", "TestType", "Priority", "FPStatus", "TCStatus",
     "ProjectStatus", "ScriptLanguage", "ScriptStatus", "NodeType",
     "ProjectCreate", "ProjectUpdate", "ProjectRead",
-    "DocumentCreate", "DocumentRead",
+    "DocumentCreate", "DocumentRead", "ParseJobRead",
     "FunctionPointCreate", "FunctionPointUpdate", "FunctionPointRead",
     "TestCaseCreate", "TestCaseUpdate", "TestCaseRead", "TestStepSchema",
     "TestScriptCreate", "TestScriptUpdate", "TestScriptRead",
@@ -22,6 +22,14 @@ class DocStatus(str, Enum):
     FAILED = "failed"
 
 
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    RETRYING = "retrying"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
 class TestType(str, Enum):
     FUNCTIONAL = "functional"
     PERFORMANCE = "performance"
@@ -80,6 +88,7 @@ class Project(SQLModel, table=True):
     name: str = Field(max_length=255, index=True)
     description: Optional[str] = Field(default=None)
     status: ProjectStatus = Field(default=ProjectStatus.ACTIVE)
+    vector_index_profile: Optional[str] = Field(default=None, max_length=32)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     
@@ -99,14 +108,20 @@ class Document(SQLModel, table=True):
     doc_type: DocType = Field(default=DocType.REQUIREMENT)
     file_path: str = Field(max_length=500)
     file_size: int = Field(default=0)
+    content_hash: Optional[str] = Field(default=None, max_length=64, index=True)
+    version: Optional[int] = Field(default=1)
     status: DocStatus = Field(default=DocStatus.PENDING)
     parsed_content: Optional[str] = Field(default=None)
+    content_path: Optional[str] = Field(default=None, max_length=500, index=True)
+    content_length: Optional[int] = Field(default=None)
+    content_sha256: Optional[str] = Field(default=None, max_length=64)
     vector_ids: Optional[str] = Field(default=None)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     
     project: Optional[Project] = Relationship(back_populates="documents")
     function_points: List["FunctionPoint"] = Relationship(back_populates="document")
+    parse_jobs: List["ParseJob"] = Relationship(back_populates="document")
     
     def get_vector_ids(self) -> List[str]:
         if self.vector_ids:
@@ -117,6 +132,27 @@ class Document(SQLModel, table=True):
         self.vector_ids = json.dumps(ids)
 
 
+class ParseJob(SQLModel, table=True):
+    __tablename__ = "parse_jobs"
+    
+    id: UUID = Field(default_factory=uuid4, primary_key=True)
+    document_id: UUID = Field(foreign_key="documents.id", index=True)
+    project_id: UUID = Field(foreign_key="projects.id", index=True)
+    batch_id: Optional[UUID] = Field(default=None, index=True)
+    status: JobStatus = Field(default=JobStatus.QUEUED)
+    progress: int = Field(default=0)
+    stage: Optional[str] = Field(default=None, max_length=50)
+    attempts: int = Field(default=0)
+    error: Optional[str] = Field(default=None)
+    task_id: Optional[str] = Field(default=None, max_length=255)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = Field(default=None)
+    finished_at: Optional[datetime] = Field(default=None)
+    
+    document: Optional[Document] = Relationship(back_populates="parse_jobs")
+
+
 class FunctionPoint(SQLModel, table=True):
     __tablename__ = "function_points"
     
@@ -40,12 +40,14 @@ class TestStepSchema(BaseModel):
 class ProjectCreate(BaseModel):
     name: str = Field(..., max_length=255)
     description: Optional[str] = None
+    vector_index_profile: Optional[str] = Field(None, max_length=32)
 
 
 class ProjectUpdate(BaseModel):
     name: Optional[str] = Field(None, max_length=255)
     description: Optional[str] = None
     status: Optional[str] = None
+    vector_index_profile: Optional[str] = Field(None, max_length=32)
 
 
 class ProjectRead(BaseModel):
@@ -53,6 +55,7 @@ class ProjectRead(BaseModel):
     name: str
     description: Optional[str]
     status: str
+    vector_index_profile: Optional[str] = None
     created_at: datetime
     updated_at: datetime
 
@@ -73,6 +76,9 @@ class DocumentRead(BaseModel):
     doc_type: DocType
     file_path: str
     file_size: int
+    content_hash: Optional[str] = None
+    version: Optional[int] = None
+    content_length: Optional[int] = None
     status: str
     created_at: datetime
     updated_at: datetime
@@ -81,6 +87,26 @@ class DocumentRead(BaseModel):
         from_attributes = True
 
 
+class ParseJobRead(BaseModel):
+    id: UUID
+    document_id: UUID
+    project_id: UUID
+    batch_id: Optional[UUID]
+    status: str
+    progress: int
+    stage: Optional[str]
+    attempts: int
+    error: Optional[str]
+    task_id: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
+
+
 class FunctionPointCreate(BaseModel):
     project_id: UUID
     document_id: Optional[UUID] = None
@@ -1,18 +1,48 @@
-from app.services.storage import MinIOService, minio_service
+from app.services.storage import MinIOService, FileTooLargeError, HashingReader, minio_service
+from app.services.cache import MemoryLRUCache, LLMResponseCache, EmbeddingCache, llm_cache, embedding_cache
+from app.services.artifact_store import ArtifactStore, artifact_store
+from app.services.chunker import TextChunker, chunker
+from app.services.parser_pool import ParserPool, ParseTimeoutError, parser_pool
 from app.services.document_parser import DocumentParserService, document_parser
+from app.services.llm_scheduler import LLMScheduler, TokenBucket, llm_scheduler
 from app.services.llm_service import LLMService, llm_service
+from app.services.vector_index import IndexPlanner, IndexProfileError, index_planner
 from app.services.milvus_service import MilvusService, milvus_service
 from app.services.rag_service import RAGService, rag_service
+from app.services.parse_jobs import ParseJobService, ParseJobError, parse_job_service
 
 __all__ = [
     "MinIOService",
+    "FileTooLargeError",
+    "HashingReader",
     "minio_service",
+    "ArtifactStore",
+    "artifact_store",
     "DocumentParserService",
     "document_parser",
     "LLMService",
     "llm_service",
+    "IndexPlanner",
+    "IndexProfileError",
+    "index_planner",
     "MilvusService",
     "milvus_service",
     "RAGService",
-    "rag_service"
+    "rag_service",
+    "MemoryLRUCache",
+    "LLMResponseCache",
+    "EmbeddingCache",
+    "llm_cache",
+    "embedding_cache",
+    "LLMScheduler",
+    "TokenBucket",
+    "llm_scheduler",
+    "TextChunker",
+    "chunker",
+    "ParserPool",
+    "ParseTimeoutError",
+    "parser_pool",
+    "ParseJobService",
+    "ParseJobError",
+    "parse_job_service"
 ]
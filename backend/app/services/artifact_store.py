@@ -0,0 +1,207 @@
+import io
+import os
+import gzip
+import zlib
+import codecs
+import asyncio
+import hashlib
+import logging
+import tempfile
+from uuid import uuid4
+from typing import Optional, Dict, Any, Iterator, Callable
+
+from minio.error import S3Error
+from sqlmodel import Session, select, func
+
+from app.core.config import settings
+from app.models import Document
+from app.services.storage import minio_service
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_PREFIX = "artifacts/"
+
+
+class ArtifactWriter:
+    def __init__(self, store: "ArtifactStore"):
+        self.store = store
+        self.length = 0
+        self.size = 0
+        self._sha256 = hashlib.sha256()
+        self._compressor = zlib.compressobj(store.compression_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        self._file = tempfile.NamedTemporaryFile(dir=settings.PARSE_TEMP_DIR, suffix=".txt.gz", delete=False)
+    
+    def write(self, text: str):
+        data = text.encode("utf-8")
+        self.length += len(text)
+        self.size += len(data)
+        self._sha256.update(data)
+        self._file.write(self._compressor.compress(data))
+    
+    def commit(self, project_id: str) -> Dict[str, Any]:
+        self._file.write(self._compressor.flush())
+        self._file.close()
+        
+        def upload(bucket_name: str, object_name: str) -> int:
+            minio_service.client.fput_object(
+                bucket_name,
+                object_name,
+                self._file.name,
+                content_type="application/gzip"
+            )
+            return os.path.getsize(self._file.name)
+        
+        try:
+            return self.store._put(project_id, self._sha256.hexdigest(), self.length, self.size, upload)
+        finally:
+            self.close()
+    
+    def close(self):
+        self._file.close()
+        if os.path.exists(self._file.name):
+            os.remove(self._file.name)
+
+
+class ArtifactStore:
+    def __init__(self):
+        self.compression_level = settings.ARTIFACT_COMPRESSION_LEVEL
+        self.cache_dir = settings.ARTIFACT_CACHE_DIR
+    
+    def save_text(self, project_id: str, text: str) -> Dict[str, Any]:
+        data = text.encode("utf-8")
+        
+        def upload(bucket_name: str, object_name: str) -> int:
+            compressed = gzip.compress(data, compresslevel=self.compression_level, mtime=0)
+            minio_service.client.put_object(
+                bucket_name,
+                object_name,
+                io.BytesIO(compressed),
+                len(compressed),
+                content_type="application/gzip"
+            )
+            return len(compressed)
+        
+        return self._put(project_id, hashlib.sha256(data).hexdigest(), len(text), len(data), upload)
+    
+    def open_writer(self) -> ArtifactWriter:
+        return ArtifactWriter(self)
+    
+    def _put(
+        self,
+        project_id: str,
+        sha256: str,
+        length: int,
+        size: int,
+        upload: Callable[[str, str], int]
+    ) -> Dict[str, Any]:
+        bucket_name = minio_service.ensure_bucket_exists(project_id)
+        object_name = f"{ARTIFACT_PREFIX}{sha256}.txt.gz"
+        
+        try:
+            minio_service.client.stat_object(bucket_name, object_name)
+            logger.info(f"Artifact {object_name} already stored in bucket {bucket_name}")
+        except S3Error:
+            compressed_size = upload(bucket_name, object_name)
+            logger.info(f"Stored artifact {object_name} ({size} -> {compressed_size} bytes) in bucket {bucket_name}")
+        
+        return {
+            "path": f"{bucket_name}/{object_name}",
+            "length": length,
+            "sha256": sha256
+        }
+    
+    def load_text(self, content_path: str) -> str:
+        return "".join(self.iter_text(content_path))
+    
+    def iter_text(self, content_path: str, chunk_size: int = 65536) -> Iterator[str]:
+        decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        
+        for data in self._iter_compressed(content_path, chunk_size):
+            text = decoder.decode(decompressor.decompress(data))
+            if text:
+                yield text
+        
+        text = decoder.decode(decompressor.flush(), final=True)
+        if text:
+            yield text
+    
+    def _iter_compressed(self, content_path: str, chunk_size: int) -> Iterator[bytes]:
+        cache_path = self._cache_path(content_path)
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path, "rb") as f:
+                while True:
+                    data = f.read(chunk_size)
+                    if not data:
+                        return
+                    yield data
+        
+        bucket_name, object_name = minio_service.split_file_path(content_path)
+        response = minio_service.client.get_object(bucket_name, object_name)
+        if not cache_path:
+            yield from minio_service.iter_response(response, chunk_size)
+            return
+        
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        partial_path = f"{cache_path}.{uuid4().hex}.part"
+        try:
+            with open(partial_path, "wb") as f:
+                for data in minio_service.iter_response(response, chunk_size):
+                    f.write(data)
+                    yield data
+            os.replace(partial_path, cache_path)
+        finally:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+    
+    def _cache_path(self, content_path: str) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        return os.path.join(self.cache_dir, *content_path.split("/"))
+    
+    def delete(self, content_path: str) -> bool:
+        cache_path = self._cache_path(content_path)
+        if cache_path and os.path.exists(cache_path):
+            os.remove(cache_path)
+        
+        bucket_name, object_name = minio_service.split_file_path(content_path)
+        return minio_service.delete_file(None, object_name, bucket_name=bucket_name)
+    
+    def release(self, session: Session, document: Document, content_path: str):
+        references = session.exec(
+            select(func.count())
+            .select_from(Document)
+            .where(Document.content_path == content_path)
+            .where(Document.id != document.id)
+        ).one()
+        if references == 0:
+            self.delete(content_path)
+        else:
+            logger.info(f"Keeping artifact {content_path}, still referenced by {references} documents")
+    
+    async def store_document_content(self, session: Session, document: Document, content: str):
+        artifact = await asyncio.to_thread(self.save_text, str(document.project_id), content)
+        await self.store_document_artifact(session, document, artifact)
+    
+    async def store_document_artifact(self, session: Session, document: Document, artifact: Dict[str, Any]):
+        previous_path = document.content_path
+        document.content_path = artifact["path"]
+        document.content_length = artifact["length"]
+        document.content_sha256 = artifact["sha256"]
+        document.parsed_content = None
+        
+        if previous_path and previous_path != document.content_path:
+            await asyncio.to_thread(self.release, session, document, previous_path)
+    
+    async def load_document_content(self, document: Document) -> str:
+        if document.content_path:
+            return await asyncio.to_thread(self.load_text, document.content_path)
+        return document.parsed_content or ""
+    
+    def iter_document_content(self, document: Document, chunk_size: int = 65536) -> Iterator[str]:
+        if document.content_path:
+            return self.iter_text(document.content_path, chunk_size)
+        return iter([document.parsed_content or ""])
+
+
+artifact_store = ArtifactStore()
@@ -0,0 +1,246 @@
+import hashlib
+import json
+import logging
+import re
+import struct
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any
+
+from app.core.config import settings
+from app.core.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+REDIS_RETRY_INTERVAL = 30.0
+
+
+class MemoryLRUCache:
+    def __init__(self, max_entries: int, ttl: int = 0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+    
+    def get(self, key: str) -> Optional[Any]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        
+        value, expires_at = item
+        if expires_at and expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        
+        self._data.move_to_end(key)
+        return value
+    
+    def set(self, key: str, value: Any):
+        if self.max_entries <= 0:
+            return
+        
+        expires_at = time.monotonic() + self.ttl if self.ttl > 0 else 0
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+    
+    def delete(self, key: str):
+        self._data.pop(key, None)
+    
+    def clear(self):
+        self._data.clear()
+    
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class LLMResponseCache:
+    def __init__(self):
+        self.enabled = settings.LLM_CACHE_ENABLED
+        self.ttl = settings.LLM_CACHE_TTL
+        self.max_entry_bytes = settings.LLM_CACHE_MAX_ENTRY_BYTES
+        self.key_prefix = settings.LLM_CACHE_KEY_PREFIX
+        self.memory = MemoryLRUCache(settings.LLM_CACHE_MEMORY_MAX_ENTRIES, settings.LLM_CACHE_TTL)
+        self._redis_retry_at = 0.0
+        self._stats = {
+            "memory_hits": 0,
+            "redis_hits": 0,
+            "misses": 0,
+            "bypassed": 0,
+            "stores": 0,
+            "oversized": 0,
+            "redis_errors": 0
+        }
+    
+    def make_key(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        temperature: float
+    ) -> str:
+        payload = json.dumps(
+            {"model": model, "messages": messages, "temperature": temperature},
+            ensure_ascii=False,
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def _redis_available(self) -> bool:
+        return time.monotonic() >= self._redis_retry_at
+    
+    def _redis_failed(self, e: Exception):
+        self._stats["redis_errors"] += 1
+        self._redis_retry_at = time.monotonic() + REDIS_RETRY_INTERVAL
+        logger.warning(f"LLM cache Redis unavailable, using memory tier only for {REDIS_RETRY_INTERVAL:.0f}s: {e}")
+    
+    def record_bypass(self):
+        self._stats["bypassed"] += 1
+    
+    async def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        
+        value = self.memory.get(key)
+        if value is not None:
+            self._stats["memory_hits"] += 1
+            return value
+        
+        if self._redis_available():
+            try:
+                raw = await get_redis().get(self.key_prefix + key)
+                if raw is not None:
+                    value = raw.decode("utf-8")
+                    self.memory.set(key, value)
+                    self._stats["redis_hits"] += 1
+                    return value
+            except Exception as e:
+                self._redis_failed(e)
+        
+        self._stats["misses"] += 1
+        return None
+    
+    async def set(self, key: str, value: str):
+        if not self.enabled or not value:
+            return
+        
+        data = value.encode("utf-8")
+        if len(data) > self.max_entry_bytes:
+            self._stats["oversized"] += 1
+            return
+        
+        self.memory.set(key, value)
+        self._stats["stores"] += 1
+        
+        if self._redis_available():
+            try:
+                await get_redis().set(self.key_prefix + key, data, ex=self.ttl if self.ttl > 0 else None)
+            except Exception as e:
+                self._redis_failed(e)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        hits = self._stats["memory_hits"] + self._stats["redis_hits"]
+        lookups = hits + self._stats["misses"]
+        return {
+            "enabled": self.enabled,
+            "memory_entries": len(self.memory),
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            **self._stats
+        }
+
+
+class EmbeddingCache:
+    def __init__(self):
+        self.enabled = settings.EMBEDDING_CACHE_ENABLED
+        self.ttl = settings.EMBEDDING_CACHE_TTL
+        self.key_prefix = settings.EMBEDDING_CACHE_KEY_PREFIX
+        self.memory = MemoryLRUCache(settings.EMBEDDING_CACHE_MEMORY_MAX_ENTRIES)
+        self._redis_retry_at = 0.0
+        self._stats = {
+            "memory_hits": 0,
+            "redis_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "redis_errors": 0
+        }
+    
+    @staticmethod
+    def normalize(text: str) -> str:
+        text = unicodedata.normalize("NFC", text)
+        return re.sub(r"\s+", " ", text).strip()
+    
+    def make_key(self, model: str, text: str) -> str:
+        payload = f"{model}\n{self.normalize(text)}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    @staticmethod
+    def pack(vector: List[float]) -> bytes:
+        return struct.pack(f"<{len(vector)}f", *vector)
+    
+    @staticmethod
+    def unpack(data: bytes) -> List[float]:
+        return list(struct.unpack(f"<{len(data) // 4}f", data))
+    
+    def _redis_available(self) -> bool:
+        return time.monotonic() >= self._redis_retry_at
+    
+    def _redis_failed(self, e: Exception):
+        self._stats["redis_errors"] += 1
+        self._redis_retry_at = time.monotonic() + REDIS_RETRY_INTERVAL
+        logger.warning(f"Embedding cache Redis unavailable, using memory tier only for {REDIS_RETRY_INTERVAL:.0f}s: {e}")
+    
+    async def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        if not self.enabled or not texts:
+            return [None] * len(texts)
+        
+        keys = [self.make_key(model, text) for text in texts]
+        vectors: List[Optional[List[float]]] = [self.memory.get(key) for key in keys]
+        self._stats["memory_hits"] += sum(1 for v in vectors if v is not None)
+        
+        pending = [i for i, v in enumerate(vectors) if v is None]
+        if pending and self._redis_available():
+            try:
+                raws = await get_redis().mget([self.key_prefix + keys[i] for i in pending])
+                for i, raw in zip(pending, raws):
+                    if raw:
+                        vectors[i] = self.unpack(raw)
+                        self.memory.set(keys[i], vectors[i])
+                        self._stats["redis_hits"] += 1
+            except Exception as e:
+                self._redis_failed(e)
+        
+        self._stats["misses"] += sum(1 for v in vectors if v is None)
+        return vectors
+    
+    async def set_many(self, model: str, texts: List[str], vectors: List[List[float]]):
+        if not self.enabled or not texts:
+            return
+        
+        keys = [self.make_key(model, text) for text in texts]
+        for key, vector in zip(keys, vectors):
+            self.memory.set(key, vector)
+        self._stats["stores"] += len(keys)
+        
+        if self._redis_available():
+            try:
+                pipe = get_redis().pipeline(transaction=False)
+                for key, vector in zip(keys, vectors):
+                    pipe.set(self.key_prefix + key, self.pack(vector), ex=self.ttl if self.ttl > 0 else None)
+                await pipe.execute()
+            except Exception as e:
+                self._redis_failed(e)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        hits = self._stats["memory_hits"] + self._stats["redis_hits"]
+        lookups = hits + self._stats["misses"]
+        return {
+            "enabled": self.enabled,
+            "memory_entries": len(self.memory),
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            **self._stats
+        }
+
+
+llm_cache = LLMResponseCache()
+embedding_cache = EmbeddingCache()
@@ -0,0 +1,172 @@
+import re
+from typing import List, Dict, Any, Optional, Tuple
+
+from app.core.config import settings
+from app.services.tokens import estimate_tokens, CJK_RE
+
+BLOCK_SPLIT_RE = re.compile(r"\n[ \t]*\n")
+HEADING_RE = re.compile(r"^#{1,6}\s+\S")
+SENTENCE_RE = re.compile(r".*?(?:[\u3002\uff01\uff1f\uff1b!?;]+|\.(?=\s)|\n|$)\s*", re.S)
+
+TEXT = "text"
+TABLE = "table"
+HEADING = "heading"
+
+
+class TextChunker:
+    def __init__(self, max_tokens: int, overlap_tokens: int):
+        self.max_tokens = max(1, max_tokens)
+        self.overlap_tokens = max(0, min(overlap_tokens, self.max_tokens // 2))
+    
+    def split(self, content: str, source: str = "document") -> List[Dict[str, Any]]:
+        if not content:
+            return []
+        
+        stream = self.stream(source)
+        return stream.feed(content) + stream.finish()
+    
+    def stream(self, source: str = "document") -> "ChunkStream":
+        return ChunkStream(self, source)
+    
+    def _blocks(self, content: str):
+        for block in BLOCK_SPLIT_RE.split(content):
+            block = block.strip("\n")
+            if not block.strip():
+                continue
+            
+            first_line, _, rest = block.partition("\n")
+            if HEADING_RE.match(first_line.strip()):
+                yield HEADING, first_line.strip()
+                if not rest.strip():
+                    continue
+                block = rest
+            
+            lines = block.splitlines()
+            if len(lines) > 1 and sum(1 for line in lines if " | " in line) * 2 > len(lines):
+                yield TABLE, block
+            else:
+                yield TEXT, block
+    
+    def _units(self, kind: str, block: str):
+        tokens = estimate_tokens(block)
+        if tokens <= self.max_tokens:
+            yield block, tokens, ""
+            return
+        
+        if kind == TABLE:
+            pieces, sep = block.splitlines(), "\n"
+        else:
+            pieces, sep = self._sentences(block), ""
+        
+        for piece in pieces:
+            piece_tokens = estimate_tokens(piece)
+            if piece_tokens <= self.max_tokens:
+                yield piece, piece_tokens, sep
+            else:
+                for i, (fragment, fragment_tokens) in enumerate(self._hard_split(piece)):
+                    yield fragment, fragment_tokens, sep if i == 0 else ""
+    
+    @staticmethod
+    def _sentences(text: str) -> List[str]:
+        return [match.group(0) for match in SENTENCE_RE.finditer(text) if match.group(0)]
+    
+    def _hard_split(self, text: str):
+        start = 0
+        weight = 0.0
+        for i, char in enumerate(text):
+            char_weight = 1.0 if CJK_RE.match(char) else 0.25
+            if weight + char_weight > self.max_tokens and i > start:
+                piece = text[start:i]
+                yield piece, estimate_tokens(piece)
+                start, weight = i, 0.0
+            weight += char_weight
+        
+        if start < len(text):
+            piece = text[start:]
+            yield piece, estimate_tokens(piece)
+    
+    def _overlap_tail(self, parts: List[Tuple[str, int, str]]) -> List[Tuple[str, int, str]]:
+        if not self.overlap_tokens or not parts:
+            return []
+        
+        tail: List[Tuple[str, int, str]] = []
+        budget = self.overlap_tokens
+        for piece, tokens, sep in reversed(parts):
+            if tokens <= budget:
+                tail.append((piece, tokens, sep))
+                budget -= tokens
+                continue
+            
+            for sentence in reversed(self._sentences(piece)):
+                sentence_tokens = estimate_tokens(sentence)
+                if sentence_tokens > budget:
+                    break
+                tail.append((sentence, sentence_tokens, ""))
+                budget -= sentence_tokens
+            break
+        
+        tail.reverse()
+        return tail
+
+
+class ChunkStream:
+    def __init__(self, chunker: TextChunker, source: str):
+        self.chunker = chunker
+        self.source = source
+        self.chunk_count = 0
+        self._parts: List[Tuple[str, int, str]] = []
+        self._total = 0
+        self._fresh = False
+        self._heading: Optional[str] = None
+        self._ready: List[Dict[str, Any]] = []
+    
+    def feed(self, content: str) -> List[Dict[str, Any]]:
+        max_tokens = self.chunker.max_tokens
+        
+        for kind, block in self.chunker._blocks(content):
+            if kind == HEADING:
+                if self._fresh:
+                    self._emit()
+                self._parts, self._total = [], 0
+                self._heading = block.lstrip("#").strip()
+            
+            for i, (piece, tokens, sep) in enumerate(self.chunker._units(kind, block)):
+                if self._fresh and self._total + tokens > max_tokens:
+                    self._emit()
+                if self._total + tokens > max_tokens:
+                    self._parts, self._total = [], 0
+                
+                self._parts.append((piece, tokens, "\n\n" if i == 0 else sep))
+                self._total += tokens
+                self._fresh = True
+        
+        return self._drain()
+    
+    def finish(self) -> List[Dict[str, Any]]:
+        if self._fresh:
+            self._emit()
+        return self._drain()
+    
+    def _drain(self) -> List[Dict[str, Any]]:
+        ready, self._ready = self._ready, []
+        return ready
+    
+    def _emit(self):
+        parts = self._parts
+        text = "".join((sep if i else "") + piece for i, (piece, _, sep) in enumerate(parts)).strip()
+        if text:
+            self._ready.append({
+                "chunk_num": self.chunk_count,
+                "content": text,
+                "char_count": len(text),
+                "token_count": self._total,
+                "heading": self._heading,
+                "source": self.source
+            })
+            self.chunk_count += 1
+        self._parts = self.chunker._overlap_tail(parts)
+        self._total = sum(tokens for _, tokens, _ in self._parts)
+        self._fresh = False
+
+
+chunker = TextChunker(settings.CHUNK_MAX_TOKENS, settings.CHUNK_OVERLAP_TOKENS)
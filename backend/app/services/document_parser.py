@@ -1,13 +1,20 @@
 import io
+import os
 import logging
 import asyncio
-from typing import Optional, List, Dict, Any
+import tempfile
+from collections import deque
+from typing import Optional, List, Dict, Any, Callable, Union
 from datetime import datetime
 import json
 
 from app.core.config import settings
 from app.services.storage import minio_service
+from app.services.artifact_store import artifact_store
 from app.services.milvus_service import milvus_service
+from app.services.parser_pool import parser_pool
+from app.services.chunker import TextChunker, chunker
+from app.workers import parsers
 
 logger = logging.getLogger(__name__)
 
@@ -22,28 +29,67 @@ class DocumentParserService:
         document_id: str,
         file_name: str,
         file_data: bytes,
-        doc_type: str
+        doc_type: str,
+        progress_callback: Optional[Callable[[str, int], None]] = None
     ) -> Dict[str, Any]:
         logger.info(f"Starting to parse and store document: {file_name}")
         
         try:
+            if progress_callback:
+                progress_callback("parsing", 10)
             parsed_content = await self.parse_document(
                 file_data=file_data,
                 file_name=file_name
             )
-            
+        except Exception as e:
+            logger.error(f"Error parsing document {file_name}: {e}")
+            return {
+                "success": False,
+                "error": str(e),
+                "content": "",
+                "chunks": []
+            }
+        
+        return await self._store_content(
+            project_id=project_id,
+            document_id=document_id,
+            file_name=file_name,
+            parsed_content=parsed_content,
+            doc_type=doc_type,
+            progress_callback=progress_callback
+        )
+    
+    async def _store_content(
+        self,
+        project_id: str,
+        document_id: str,
+        file_name: str,
+        parsed_content: str,
+        doc_type: str,
+        progress_callback: Optional[Callable[[str, int], None]] = None
+    ) -> Dict[str, Any]:
+        def report(stage: str, progress: int):
+            if progress_callback:
+                progress_callback(stage, progress)
+        
+        def report_embedding(done: int, total: int):
+            report("embedding", 40 + int(55 * done / total) if total else 95)
+        
+        try:
+            report("chunking", 35)
             chunks = self._split_content(parsed_content)
             
-            if chunks:
-                vector_count = await milvus_service.insert_vectors(
-                    project_id=project_id,
-                    document_id=document_id,
-                    document_name=file_name,
-                    chunks=chunks,
-                    content_type=doc_type
-                )
-                
-                logger.info(f"Stored {vector_count} vectors for document {file_name}")
+            report("embedding", 40)
+            vector_sync = await milvus_service.sync_document_vectors(
+                project_id=project_id,
+                document_id=document_id,
+                document_name=file_name,
+                chunks=chunks,
+                content_type=doc_type,
+                progress_callback=report_embedding
+            )
+            
+            logger.info(f"Stored vectors for document {file_name}: {vector_sync}")
             
             return {
                 "success": True,
@@ -53,7 +99,8 @@ class DocumentParserService:
                     "file_name": file_name,
                     "doc_type": doc_type,
                     "parsed_at": datetime.utcnow().isoformat(),
-                    "chunk_count": len(chunks)
+                    "chunk_count": len(chunks),
+                    "vector_sync": vector_sync
                 }
             }
             
@@ -66,6 +113,153 @@ class DocumentParserService:
                 "chunks": []
             }
     
+    async def parse_file_and_store(
+        self,
+        project_id: str,
+        document_id: str,
+        file_name: str,
+        file_path: str,
+        doc_type: str,
+        progress_callback: Optional[Callable[[str, int], None]] = None
+    ) -> Dict[str, Any]:
+        ext = file_name.lower().split(".")[-1] if "." in file_name else ""
+        
+        if ext == "xlsx":
+            if progress_callback:
+                progress_callback("parsing", 10)
+            return await self._store_content(
+                project_id=project_id,
+                document_id=document_id,
+                file_name=file_name,
+                parsed_content=await self._parse_excel(file_path),
+                doc_type=doc_type,
+                progress_callback=progress_callback
+            )
+        
+        if ext != "pdf":
+            file_data = await asyncio.to_thread(self._read_file, file_path)
+            return await self.parse_and_store(
+                project_id=project_id,
+                document_id=document_id,
+                file_name=file_name,
+                file_data=file_data,
+                doc_type=doc_type,
+                progress_callback=progress_callback
+            )
+        
+        logger.info(f"Starting to stream parse and store document: {file_name}")
+        
+        def report(stage: str, progress: int):
+            if progress_callback:
+                progress_callback(stage, progress)
+        
+        try:
+            report("parsing", 5)
+            page_count = await parser_pool.run(parsers.pdf_page_count, file_path)
+            
+            stream = chunker.stream()
+            sync = milvus_service.open_sync(project_id, document_id, file_name, doc_type)
+            await sync.start()
+        except Exception as e:
+            logger.error(f"Error stream parsing document {file_name}: {e}")
+            return {
+                "success": False,
+                "error": str(e),
+                "content": "",
+                "chunks": []
+            }
+        
+        writer = artifact_store.open_writer()
+        try:
+            chunk_count = 0
+            pages_done = 0
+            
+            async for pages in self._iter_pdf_windows(file_path, page_count):
+                texts = [text for text in pages if text.strip()]
+                pages_done += len(pages)
+                
+                if texts:
+                    text = "\n\n".join(texts)
+                    await asyncio.to_thread(writer.write, "\n\n" + text if writer.length else text)
+                    
+                    chunks = stream.feed(text)
+                    chunk_count += len(chunks)
+                    await sync.add(chunks)
+                
+                report("embedding", 10 + int(85 * pages_done / page_count))
+            
+            chunks = stream.finish()
+            chunk_count += len(chunks)
+            await sync.add(chunks)
+            vector_sync = await sync.finish()
+            
+            artifact = await asyncio.to_thread(writer.commit, project_id)
+            
+            logger.info(f"Stored vectors for document {file_name} ({page_count} pages): {vector_sync}")
+            
+            return {
+                "success": True,
+                "artifact": artifact,
+                "metadata": {
+                    "file_name": file_name,
+                    "doc_type": doc_type,
+                    "parsed_at": datetime.utcnow().isoformat(),
+                    "page_count": page_count,
+                    "chunk_count": chunk_count,
+                    "vector_sync": vector_sync
+                }
+            }
+            
+        except Exception as e:
+            logger.error(f"Error stream parsing document {file_name}: {e}")
+            try:
+                await sync.abort()
+            except Exception as abort_error:
+                logger.warning(f"Failed to roll back vectors of document {file_name}: {abort_error}")
+            return {
+                "success": False,
+                "error": str(e),
+                "content": "",
+                "chunks": []
+            }
+        finally:
+            writer.close()
+    
+    async def _iter_pdf_windows(self, file_path: str, page_count: int):
+        window = max(1, settings.PDF_PAGE_WINDOW)
+        parallelism = max(2, settings.PDF_PARALLEL_WINDOWS or parser_pool.max_workers)
+        starts = iter(range(0, page_count, window))
+        pending = deque()
+        
+        def schedule():
+            while len(pending) < parallelism:
+                start = next(starts, None)
+                if start is None:
+                    return
+                pending.append(asyncio.ensure_future(
+                    parser_pool.run(parsers.parse_pdf_pages, file_path, start, start + window)
+                ))
+        
+        try:
+            schedule()
+            while pending:
+                current = pending.popleft()
+                schedule()
+                yield await current
+        finally:
+            for future in pending:
+                future.cancel()
+    
+    @staticmethod
+    def _read_file(file_path: str) -> bytes:
+        with open(file_path, "rb") as f:
+            return f.read()
+    
+    @staticmethod
+    def _write_file(file_path: str, file_data: bytes):
+        with open(file_path, "wb") as f:
+            f.write(file_data)
+    
     async def parse_document(
         self,
         file_data: bytes,
@@ -97,80 +291,42 @@ class DocumentParserService:
     
     async def _parse_pdf(self, file_data: bytes) -> str:
         try:
-            from pypdf import PdfReader
-            
-            reader = PdfReader(io.BytesIO(file_data))
-            text_parts = []
-            
-            for page in reader.pages:
-                text = page.extract_text()
-                if text:
-                    text_parts.append(text)
-            
-            return "\n\n".join(text_parts)
+            with tempfile.TemporaryDirectory(dir=settings.PARSE_TEMP_DIR) as temp_dir:
+                file_path = os.path.join(temp_dir, "source.pdf")
+                await asyncio.to_thread(self._write_file, file_path, file_data)
+                
+                page_count = await parser_pool.run(parsers.pdf_page_count, file_path)
+                text_parts = []
+                async for pages in self._iter_pdf_windows(file_path, page_count):
+                    text_parts.extend(text for text in pages if text)
+                return "\n\n".join(text_parts)
         except Exception as e:
             logger.error(f"PDF parse error: {e}")
             return ""
     
     async def _parse_docx(self, file_data: bytes) -> str:
         try:
-            from docx import Document
-            
-            doc = Document(io.BytesIO(file_data))
-            text_parts = []
-            
-            for para in doc.paragraphs:
-                if para.text.strip():
-                    text_parts.append(para.text)
-            
-            for table in doc.tables:
-                table_text = []
-                for row in table.rows:
-                    row_text = [cell.text for cell in row.cells]
-                    table_text.append(" | ".join(row_text))
-                text_parts.append("\n".join(table_text))
-            
-            return "\n\n".join(text_parts)
+            return await parser_pool.run(parsers.parse_docx, file_data)
         except Exception as e:
             logger.error(f"DOCX parse error: {e}")
             return ""
     
-    async def _parse_excel(self, file_data: bytes) -> str:
+    async def _parse_excel(self, source: Union[bytes, str]) -> str:
         try:
-            from openpyxl import load_workbook
-            
-            wb = load_workbook(io.BytesIO(file_data))
-            text_parts = []
-            
-            for sheet_name in wb.sheetnames:
-                sheet = wb[sheet_name]
-                text_parts.append(f"## Sheet: {sheet_name}\n")
-                
-                for row in sheet.iter_rows(values_only=True):
-                    row_text = [str(cell) if cell else "" for cell in row]
-                    if any(row_text):
-                        text_parts.append(" | ".join(row_text))
-            
-            return "\n\n".join(text_parts)
+            return await parser_pool.run(
+                parsers.parse_excel,
+                source,
+                settings.EXCEL_MAX_ROWS_PER_SHEET,
+                settings.EXCEL_ROWS_PER_BLOCK,
+                settings.EXCEL_MAX_CELL_CHARS
+            )
         except Exception as e:
             logger.error(f"Excel parse error: {e}")
             return ""
     
     async def _parse_pptx(self, file_data: bytes) -> str:
         try:
-            from pptx import Presentation
-            
-            prs = Presentation(io.BytesIO(file_data))
-            text_parts = []
-            
-            for i, slide in enumerate(prs.slides):
-                text_parts.append(f"## Slide {i+1}\n")
-                
-                for shape in slide.shapes:
-                    if hasattr(shape, "text") and shape.text.strip():
-                        text_parts.append(shape.text)
-            
-            return "\n\n".join(text_parts)
+            return await parser_pool.run(parsers.parse_pptx, file_data)
         except Exception as e:
             logger.error(f"PPTX parse error: {e}")
             return ""
@@ -178,48 +334,16 @@ class DocumentParserService:
     def _split_content(
         self,
         content: str,
-        chunk_size: int = 500,
-        overlap: int = 50
+        chunk_size: Optional[int] = None,
+        overlap: Optional[int] = None
     ) -> List[Dict[str, Any]]:
-        if not content:
-            return []
-        
-        chunks = []
-        chunk_num = 0
-        
-        paragraphs = content.split('\n\n')
-        current_chunk = ""
-        
-        for para in paragraphs:
-            para = para.strip()
-            if not para:
-                continue
-                
-            if len(current_chunk) + len(para) > chunk_size:
-                if current_chunk:
-                    chunks.append({
-                        "chunk_num": chunk_num,
-                        "content": current_chunk.strip(),
-                        "char_count": len(current_chunk.strip()),
-                        "source": "document"
-                    })
-                    chunk_num += 1
-                current_chunk = para
-            else:
-                if current_chunk:
-                    current_chunk += "\n\n" + para
-                else:
-                    current_chunk = para
-        
-        if current_chunk:
-            chunks.append({
-                "chunk_num": chunk_num,
-                "content": current_chunk.strip(),
-                "char_count": len(current_chunk.strip()),
-                "source": "document"
-            })
+        if chunk_size is None and overlap is None:
+            return chunker.split(content)
         
-        return chunks
+        return TextChunker(
+            chunk_size or settings.CHUNK_MAX_TOKENS,
+            settings.CHUNK_OVERLAP_TOKENS if overlap is None else overlap
+        ).split(content)
     
     def get_supported_formats(self) -> List[str]:
         return [
@@ -0,0 +1,192 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, Deque
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_KEY = "default"
+
+
+class TokenBucket:
+    def __init__(self, per_minute: int, capacity: Optional[int] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = float(capacity or per_minute)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+    
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def wait_time(self, amount: float) -> float:
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+    
+    def consume(self, amount: float):
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+    
+    def adjust(self, delta: float):
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+
+class _Waiter:
+    __slots__ = ("future", "tokens", "enqueued_at")
+    
+    def __init__(self, future: asyncio.Future, tokens: int):
+        self.future = future
+        self.tokens = tokens
+        self.enqueued_at = time.monotonic()
+
+
+def retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class LLMScheduler:
+    def __init__(self):
+        self.rpm_bucket = TokenBucket(settings.LLM_RATE_LIMIT_RPM) if settings.LLM_RATE_LIMIT_RPM > 0 else None
+        self.tpm_bucket = TokenBucket(settings.LLM_RATE_LIMIT_TPM) if settings.LLM_RATE_LIMIT_TPM > 0 else None
+        self._queues: "OrderedDict[str, Deque[_Waiter]]" = OrderedDict()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._paused_until = 0.0
+        self._stats = {
+            "admitted": 0,
+            "rate_limited": 0,
+            "total_wait_seconds": 0.0,
+            "max_wait_seconds": 0.0,
+            "last_wait_seconds": 0.0
+        }
+    
+    @property
+    def enabled(self) -> bool:
+        return self.rpm_bucket is not None or self.tpm_bucket is not None
+    
+    async def acquire(self, project_id: Optional[str], tokens: int):
+        if not self.enabled:
+            return
+        
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(loop.create_future(), tokens)
+        self._queues.setdefault(project_id or DEFAULT_QUEUE_KEY, deque()).append(waiter)
+        self._ensure_dispatcher(loop)
+        self._wakeup.set()
+        
+        await waiter.future
+        
+        waited = time.monotonic() - waiter.enqueued_at
+        self._stats["admitted"] += 1
+        self._stats["total_wait_seconds"] += waited
+        self._stats["last_wait_seconds"] = waited
+        self._stats["max_wait_seconds"] = max(self._stats["max_wait_seconds"], waited)
+    
+    def settle(self, estimated_tokens: int, actual_tokens: Optional[int]):
+        if self.tpm_bucket is not None and actual_tokens:
+            self.tpm_bucket.adjust(actual_tokens - estimated_tokens)
+    
+    def pause(self, seconds: float):
+        self._stats["rate_limited"] += 1
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        logger.warning(f"LLM provider rate limited, pausing dispatch for {seconds:.1f}s")
+    
+    def _ensure_dispatcher(self, loop: asyncio.AbstractEventLoop):
+        if self._dispatcher is None or self._dispatcher.done() or self._loop is not loop:
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            self._dispatcher = loop.create_task(self._dispatch())
+    
+    def _next_queue(self) -> Optional[str]:
+        while self._queues:
+            key, queue = next(iter(self._queues.items()))
+            while queue and queue[0].future.done():
+                queue.popleft()
+            if queue:
+                return key
+            del self._queues[key]
+        return None
+    
+    def _delay_for(self, tokens: int) -> float:
+        delay = self._paused_until - time.monotonic()
+        if self.rpm_bucket is not None:
+            delay = max(delay, self.rpm_bucket.wait_time(1))
+        if self.tpm_bucket is not None:
+            delay = max(delay, self.tpm_bucket.wait_time(tokens))
+        return delay
+    
+    async def _dispatch(self):
+        while True:
+            key = self._next_queue()
+            if key is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            
+            queue = self._queues[key]
+            waiter = queue[0]
+            
+            delay = self._delay_for(waiter.tokens)
+            if delay > 0:
+                await asyncio.sleep(min(delay, 1.0))
+                continue
+            
+            queue.popleft()
+            if self.rpm_bucket is not None:
+                self.rpm_bucket.consume(1)
+            if self.tpm_bucket is not None:
+                self.tpm_bucket.consume(waiter.tokens)
+            waiter.future.set_result(None)
+            
+            if queue:
+                self._queues.move_to_end(key)
+            else:
+                del self._queues[key]
+    
+    def get_stats(self) -> Dict[str, Any]:
+        queue_depths = {
+            key: sum(1 for waiter in queue if not waiter.future.done())
+            for key, queue in self._queues.items()
+        }
+        admitted = self._stats["admitted"]
+        return {
+            "enabled": self.enabled,
+            "rpm_limit": settings.LLM_RATE_LIMIT_RPM,
+            "tpm_limit": settings.LLM_RATE_LIMIT_TPM,
+            "rpm_available": round(self.rpm_bucket.tokens, 2) if self.rpm_bucket else None,
+            "tpm_available": round(self.tpm_bucket.tokens, 2) if self.tpm_bucket else None,
+            "queue_depth": sum(queue_depths.values()),
+            "queue_depth_by_project": queue_depths,
+            "paused_for_seconds": round(max(0.0, self._paused_until - time.monotonic()), 2),
+            "avg_wait_seconds": round(self._stats["total_wait_seconds"] / admitted, 4) if admitted else 0.0,
+            **self._stats
+        }
+
+
+llm_scheduler = LLMScheduler()
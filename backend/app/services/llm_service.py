@@ -1,11 +1,17 @@
+import asyncio
 import logging
+import time
 import httpx
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator, Tuple, Callable
 from datetime import datetime
 import json
 import re
 
 from app.core.config import settings
+from app.services.cache import llm_cache, embedding_cache
+from app.services.tokens import estimate_tokens
+from app.services.llm_scheduler import llm_scheduler, retry_after_seconds
+from app.services.resilience import RetryPolicy, CircuitBreaker, CircuitOpenError, call_with_retry
 
 logger = logging.getLogger(__name__)
 
@@ -19,44 +25,304 @@ class LLMService:
         self.embedding_api_key = settings.EMBEDDING_API_KEY or settings.LLM_API_KEY
         self.embedding_base_url = settings.EMBEDDING_BASE_URL or settings.LLM_BASE_URL
         self.embedding_model = settings.EMBEDDING_MODEL
+        
+        self.chat_retry_policy = RetryPolicy(
+            max_attempts=settings.LLM_RETRY_MAX_ATTEMPTS,
+            backoff_base=settings.LLM_RETRY_BACKOFF_BASE,
+            backoff_max=settings.LLM_RETRY_BACKOFF_MAX,
+            retryable_status_codes=settings.LLM_RETRY_STATUS_CODES,
+            attempt_timeout=settings.LLM_ATTEMPT_TIMEOUT,
+            total_deadline=settings.LLM_TIMEOUT
+        )
+        self.embedding_retry_policy = RetryPolicy(
+            max_attempts=settings.LLM_RETRY_MAX_ATTEMPTS,
+            backoff_base=settings.LLM_RETRY_BACKOFF_BASE,
+            backoff_max=settings.LLM_RETRY_BACKOFF_MAX,
+            retryable_status_codes=settings.LLM_RETRY_STATUS_CODES,
+            attempt_timeout=settings.EMBEDDING_TIMEOUT,
+            total_deadline=settings.EMBEDDING_DEADLINE
+        )
+        self.chat_breaker = CircuitBreaker(
+            "llm_chat",
+            settings.LLM_CIRCUIT_FAILURE_THRESHOLD,
+            settings.LLM_CIRCUIT_RESET_TIMEOUT,
+            settings.LLM_TIMEOUT
+        )
+        self.embedding_breaker = CircuitBreaker(
+            "embedding",
+            settings.LLM_CIRCUIT_FAILURE_THRESHOLD,
+            settings.LLM_CIRCUIT_RESET_TIMEOUT,
+            settings.LLM_TIMEOUT
+        )
+        
+        self._client: Optional[httpx.AsyncClient] = None
+        self._in_flight = 0
+        self._request_count = 0
+        self._error_count = 0
     
-    async def chat(
+    async def start(self):
+        self._get_client()
+    
+    async def close(self):
+        if self._client is not None:
+            client = self._client
+            self._client = None
+            await client.aclose()
+            logger.info("LLM HTTP client closed")
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            limits = httpx.Limits(
+                max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_EXPIRY
+            )
+            try:
+                self._client = httpx.AsyncClient(
+                    limits=limits,
+                    timeout=settings.LLM_TIMEOUT,
+                    http2=settings.LLM_HTTP2
+                )
+            except ImportError:
+                logger.warning("HTTP/2 requested but the 'h2' package is not installed, falling back to HTTP/1.1")
+                self._client = httpx.AsyncClient(limits=limits, timeout=settings.LLM_TIMEOUT)
+            logger.info(
+                f"LLM HTTP client started (max_connections={settings.LLM_HTTP_MAX_CONNECTIONS}, "
+                f"keepalive={settings.LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS}, http2={settings.LLM_HTTP2})"
+            )
+        return self._client
+    
+    def _headers(self, api_key: str) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        }
+    
+    async def _post(
+        self,
+        url: str,
+        api_key: str,
+        payload: Dict[str, Any],
+        timeout: float
+    ) -> Dict[str, Any]:
+        client = self._get_client()
+        self._in_flight += 1
+        self._request_count += 1
+        try:
+            response = await client.post(
+                url,
+                headers=self._headers(api_key),
+                json=payload,
+                timeout=timeout
+            )
+            response.raise_for_status()
+            return response.json()
+        except Exception:
+            self._error_count += 1
+            raise
+        finally:
+            self._in_flight -= 1
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        stats = {
+            "started": self._client is not None and not self._client.is_closed,
+            "http2": settings.LLM_HTTP2,
+            "max_connections": settings.LLM_HTTP_MAX_CONNECTIONS,
+            "max_keepalive_connections": settings.LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            "keepalive_expiry": settings.LLM_HTTP_KEEPALIVE_EXPIRY,
+            "in_flight": self._in_flight,
+            "total_requests": self._request_count,
+            "total_errors": self._error_count,
+            "chat_circuit": self.chat_breaker.get_stats(),
+            "embedding_circuit": self.embedding_breaker.get_stats(),
+            "connections": 0,
+            "idle_connections": 0,
+            "queued_requests": 0
+        }
+        
+        pool = getattr(getattr(self._client, "_transport", None), "_pool", None)
+        if pool is not None:
+            connections = list(getattr(pool, "connections", []))
+            stats["connections"] = len(connections)
+            stats["idle_connections"] = sum(1 for conn in connections if conn.is_idle())
+            stats["queued_requests"] = len(getattr(pool, "_requests", []))
+        
+        return stats
+    
+    def _build_chat_messages(
         self,
         messages: List[Dict[str, str]],
         system_prompt: Optional[str] = None
+    ) -> List[Dict[str, str]]:
+        chat_messages = []
+        
+        if system_prompt:
+            chat_messages.append({"role": "system", "content": system_prompt})
+        
+        chat_messages.extend(messages)
+        return chat_messages
+    
+    def _estimate_request_tokens(self, chat_messages: List[Dict[str, str]]) -> int:
+        prompt_tokens = sum(estimate_tokens(m.get("content", "")) for m in chat_messages)
+        return prompt_tokens + settings.LLM_RATE_LIMIT_COMPLETION_TOKENS
+    
+    def _handle_rate_limit(self, e: Exception):
+        if isinstance(e, httpx.HTTPStatusError) and e.response.status_code == 429:
+            llm_scheduler.pause(retry_after_seconds(e.response) or settings.LLM_RATE_LIMIT_DEFAULT_BACKOFF)
+    
+    async def chat(
+        self,
+        messages: List[Dict[str, str]],
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        bypass_cache: bool = False,
+        project_id: Optional[str] = None
     ) -> str:
         try:
-            chat_messages = []
+            chat_messages = self._build_chat_messages(messages, system_prompt)
             
-            if system_prompt:
-                chat_messages.append({"role": "system", "content": system_prompt})
+            cache_key = llm_cache.make_key(self.llm_model, chat_messages, temperature)
+            if bypass_cache:
+                llm_cache.record_bypass()
+            else:
+                cached = await llm_cache.get(cache_key)
+                if cached is not None:
+                    return cached
             
-            chat_messages.extend(messages)
+            estimated_tokens = self._estimate_request_tokens(chat_messages)
             
-            async with httpx.AsyncClient(timeout=300.0) as client:
-                response = await client.post(
-                    f"{self.llm_base_url}/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {self.llm_api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": self.llm_model,
-                        "messages": chat_messages,
-                        "temperature": 0.7
-                    }
-                )
-                
-                response.raise_for_status()
-                result = response.json()
-                
-                return result["choices"][0]["message"]["content"]
+            async def attempt(timeout: float) -> Dict[str, Any]:
+                try:
+                    return await self._post(
+                        f"{self.llm_base_url}/chat/completions",
+                        self.llm_api_key,
+                        {
+                            "model": self.llm_model,
+                            "messages": chat_messages,
+                            "temperature": temperature
+                        },
+                        timeout=timeout
+                    )
+                except Exception as e:
+                    self._handle_rate_limit(e)
+                    raise
+            
+            result = await call_with_retry(
+                attempt,
+                self.chat_retry_policy,
+                self.chat_breaker,
+                before_attempt=lambda: llm_scheduler.acquire(project_id, estimated_tokens)
+            )
             
+            llm_scheduler.settle(estimated_tokens, (result.get("usage") or {}).get("total_tokens"))
+            
+            content = result["choices"][0]["message"]["content"]
+            await llm_cache.set(cache_key, content)
+            
+            return content
+        
         except Exception as e:
             logger.error(f"LLM chat error: {e}")
             raise
     
-    async def understand_requirements(self, user_input: str) -> Dict[str, Any]:
+    async def chat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        bypass_cache: bool = False,
+        project_id: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        chat_messages = self._build_chat_messages(messages, system_prompt)
+        
+        cache_key = llm_cache.make_key(self.llm_model, chat_messages, temperature)
+        if bypass_cache:
+            llm_cache.record_bypass()
+        else:
+            cached = await llm_cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+        
+        estimated_tokens = self._estimate_request_tokens(chat_messages)
+        policy = self.chat_retry_policy
+        deadline = time.monotonic() + policy.total_deadline
+        parts = []
+        usage_tokens = None
+        attempt = 0
+        
+        try:
+            while True:
+                attempt += 1
+                await llm_scheduler.acquire(project_id, estimated_tokens)
+                probe = self.chat_breaker.before_call()
+                
+                client = self._get_client()
+                self._in_flight += 1
+                self._request_count += 1
+                try:
+                    async with client.stream(
+                        "POST",
+                        f"{self.llm_base_url}/chat/completions",
+                        headers=self._headers(self.llm_api_key),
+                        json={
+                            "model": self.llm_model,
+                            "messages": chat_messages,
+                            "temperature": temperature,
+                            "stream": True,
+                            "stream_options": {"include_usage": True}
+                        },
+                        timeout=policy.attempt_timeout_for(deadline)
+                    ) as response:
+                        if response.status_code >= 400:
+                            await response.aread()
+                        response.raise_for_status()
+                        
+                        async for line in response.aiter_lines():
+                            if not line.startswith("data:"):
+                                continue
+                            
+                            data = line[5:].strip()
+                            if data == "[DONE]":
+                                break
+                            
+                            chunk = json.loads(data)
+                            usage = chunk.get("usage") or {}
+                            if usage.get("total_tokens"):
+                                usage_tokens = usage["total_tokens"]
+                            
+                            choices = chunk.get("choices") or []
+                            if not choices:
+                                continue
+                            
+                            delta = (choices[0].get("delta") or {}).get("content")
+                            if delta:
+                                parts.append(delta)
+                                yield delta
+                    
+                    self.chat_breaker.record_success()
+                    break
+                except Exception as e:
+                    self._error_count += 1
+                    self._handle_rate_limit(e)
+                    self.chat_breaker.record(e, policy)
+                    
+                    delay = None if parts else policy.next_delay(e, attempt, deadline)
+                    if delay is None:
+                        logger.error(f"LLM chat stream error: {e}")
+                        raise
+                    
+                    logger.warning(f"LLM chat stream attempt {attempt} failed ({e!r}), retrying in {delay:.2f}s")
+                    await asyncio.sleep(delay)
+                finally:
+                    self._in_flight -= 1
+                    self.chat_breaker.release_probe(probe)
+        finally:
+            llm_scheduler.settle(estimated_tokens, usage_tokens)
+        
+        await llm_cache.set(cache_key, "".join(parts))
+    
+    async def understand_requirements(self, user_input: str, bypass_cache: bool = False) -> Dict[str, Any]:
         system_prompt = """你是一个专业的测试需求分析专家。请分析用户输入的测试需求，提取关键信息。
 
 分析要点：
@@ -75,9 +341,9 @@ class LLMService:
     "technical_points": ["关注点1", "关注点2"],
     "summary": "需求摘要"
 }"""
-        
+
         messages = [{"role": "user", "content": user_input}]
-        response = await self.chat(messages, system_prompt)
+        response = await self.chat(messages, system_prompt, bypass_cache=bypass_cache)
         
         json_match = re.search(r'\{.*\}', response, re.DOTALL)
         if json_match:
@@ -100,7 +366,9 @@ class LLMService:
         user_requirements: str,
         document_context: str,
         test_types: List[str],
-        requirements_analysis: Optional[Dict[str, Any]] = None
+        requirements_analysis: Optional[Dict[str, Any]] = None,
+        bypass_cache: bool = False,
+        project_id: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         system_prompt = """你是一个专业的测试设计专家。根据用户需求、文档内容和需求分析结果，生成详细的测试功能点清单。
 
@@ -133,7 +401,7 @@ class LLMService:
 }
 
 只输出JSON数组，不要其他文字说明。"""
-        
+
         analysis_info = ""
         if requirements_analysis:
             analysis_info = f"""
@@ -143,7 +411,7 @@ class LLMService:
 - 优先级建议: {requirements_analysis.get('priority_suggestion', 'p2')}
 - 关键场景: {', '.join(requirements_analysis.get('key_scenarios', []))}
 """
-        
+
         user_prompt = f"""用户需求：
 {user_requirements}
 
@@ -155,9 +423,9 @@ class LLMService:
 需要生成的测试类型：{', '.join(test_types)}
 
 请根据以上信息生成完整的测试功能点清单。确保功能点覆盖所有关键场景和边界条件。"""
-        
+
         messages = [{"role": "user", "content": user_prompt}]
-        response = await self.chat(messages, system_prompt)
+        response = await self.chat(messages, system_prompt, bypass_cache=bypass_cache, project_id=project_id)
         
         function_points = self._parse_function_points(response)
         
@@ -169,7 +437,9 @@ class LLMService:
         self,
         function_point: Dict[str, Any],
         user_feedback: str,
-        context: Optional[str] = None
+        context: Optional[str] = None,
+        bypass_cache: bool = False,
+        project_id: Optional[str] = None
     ) -> Dict[str, Any]:
         system_prompt = """你是一个测试设计专家。根据用户反馈优化功能点。
 
@@ -182,7 +452,7 @@ class LLMService:
 6. 验收标准：补充或优化验收标准，使其可执行、可验证
 
 以JSON格式输出优化后的功能点，包含所有字段。"""
-        
+
         context_info = f"\n\n上下文信息：\n{context[:1000]}" if context else ""
         
         messages = [{
@@ -190,7 +460,7 @@ class LLMService:
             "content": f"原功能点：\n{json.dumps(function_point, ensure_ascii=False)}\n\n用户反馈：{user_feedback}{context_info}"
         }]
         
-        response = await self.chat(messages, system_prompt)
+        response = await self.chat(messages, system_prompt, bypass_cache=bypass_cache, project_id=project_id)
         
         refined_point = self._parse_function_point(response)
         
@@ -199,8 +469,35 @@ class LLMService:
     async def generate_test_case(
         self,
         function_point: Dict[str, Any],
-        document_context: Optional[str] = None
+        document_context: Optional[str] = None,
+        bypass_cache: bool = False
     ) -> Dict[str, Any]:
+        system_prompt, messages = self._build_test_case_prompt(function_point, document_context)
+        
+        response = await self.chat(messages, system_prompt, bypass_cache=bypass_cache, project_id=function_point.get("project_id"))
+        
+        return self._parse_test_case(response, function_point)
+    
+    async def stream_test_case(
+        self,
+        function_point: Dict[str, Any],
+        document_context: Optional[str] = None,
+        bypass_cache: bool = False
+    ) -> AsyncIterator[Dict[str, Any]]:
+        system_prompt, messages = self._build_test_case_prompt(function_point, document_context)
+        
+        parts = []
+        async for delta in self.chat_stream(messages, system_prompt, bypass_cache=bypass_cache, project_id=function_point.get("project_id")):
+            parts.append(delta)
+            yield {"type": "delta", "content": delta}
+        
+        yield {"type": "result", "test_case": self._parse_test_case("".join(parts), function_point)}
+    
+    def _build_test_case_prompt(
+        self,
+        function_point: Dict[str, Any],
+        document_context: Optional[str] = None
+    ) -> Tuple[str, List[Dict[str, str]]]:
         system_prompt = """你是一个测试用例设计专家。根据功能点生成详细的测试用例。
 
 测试用例设计原则：
@@ -232,7 +529,7 @@ class LLMService:
     "expected_results": "整体预期结果",
     "test_data": {}
 }"""
-        
+
         context_info = f"\n\n相关文档内容：\n{document_context[:2000]}" if document_context else ""
         
         messages = [{
@@ -249,8 +546,9 @@ class LLMService:
 请生成详细的测试用例，确保覆盖正常流程、异常流程和边界条件。"""
         }]
         
-        response = await self.chat(messages, system_prompt)
-        
+        return system_prompt, messages
+    
+    def _parse_test_case(self, response: str, function_point: Dict[str, Any]) -> Dict[str, Any]:
         json_match = re.search(r'\{.*\}', response, re.DOTALL)
         
         if json_match:
@@ -279,8 +577,37 @@ class LLMService:
         self,
         test_case: Dict[str, Any],
         language: str = "python",
-        framework: str = "pytest"
+        framework: str = "pytest",
+        bypass_cache: bool = False
     ) -> str:
+        system_prompt, messages = self._build_test_script_prompt(test_case, language, framework)
+        
+        response = await self.chat(messages, system_prompt, bypass_cache=bypass_cache, project_id=test_case.get("project_id"))
+        
+        return self._clean_script(response)
+    
+    async def stream_test_script(
+        self,
+        test_case: Dict[str, Any],
+        language: str = "python",
+        framework: str = "pytest",
+        bypass_cache: bool = False
+    ) -> AsyncIterator[Dict[str, Any]]:
+        system_prompt, messages = self._build_test_script_prompt(test_case, language, framework)
+        
+        parts = []
+        async for delta in self.chat_stream(messages, system_prompt, bypass_cache=bypass_cache, project_id=test_case.get("project_id")):
+            parts.append(delta)
+            yield {"type": "delta", "content": delta}
+        
+        yield {"type": "result", "content": self._clean_script("".join(parts))}
+    
+    def _build_test_script_prompt(
+        self,
+        test_case: Dict[str, Any],
+        language: str,
+        framework: str
+    ) -> Tuple[str, List[Dict[str, str]]]:
         system_prompt = f"""你是一个{'Python' if language == 'python' else 'Java'}测试脚本生成专家。
 
 使用{framework}框架生成测试脚本。
@@ -294,7 +621,7 @@ class LLMService:
 6. 包含测试数据管理
 
 只输出代码，不要其他文字说明。"""
-        
+
         messages = [{
             "role": "user",
             "content": f"""测试用例信息：
@@ -307,8 +634,9 @@ class LLMService:
 请生成完整的测试脚本代码。"""
         }]
         
-        response = await self.chat(messages, system_prompt)
-        
+        return system_prompt, messages
+    
+    def _clean_script(self, response: str) -> str:
         content = response
         if content.startswith("```"):
             lines = content.split("\n")
@@ -316,52 +644,175 @@ class LLMService:
         
         return content.strip()
     
-    async def embed_texts(self, texts: List[str]) -> List[List[float]]:
+    async def embed_texts(
+        self,
+        texts: List[str],
+        progress_callback: Optional[Callable[[int, int], None]] = None
+    ) -> List[List[float]]:
         try:
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(
-                    f"{self.embedding_base_url}/embeddings",
-                    headers={
-                        "Authorization": f"Bearer {self.embedding_api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": self.embedding_model,
-                        "input": texts
-                    }
-                )
+            vectors = await embedding_cache.get_many(self.embedding_model, texts)
+            
+            missing: Dict[str, List[int]] = {}
+            for i, (text, vector) in enumerate(zip(texts, vectors)):
+                if vector is None:
+                    missing.setdefault(text, []).append(i)
+            
+            done = len(texts) - sum(len(indexes) for indexes in missing.values())
+            if progress_callback:
+                progress_callback(done, len(texts))
+            
+            if missing:
+                pending_texts = list(missing.keys())
+                
+                def on_batch(batch_texts: List[str]):
+                    nonlocal done
+                    done += sum(len(missing[text]) for text in batch_texts)
+                    if progress_callback:
+                        progress_callback(done, len(texts))
                 
-                response.raise_for_status()
-                result = response.json()
+                fresh = await self._embed_in_batches(pending_texts, on_batch)
                 
-                return [item["embedding"] for item in result["data"]]
+                for text, vector in zip(pending_texts, fresh):
+                    for i in missing[text]:
+                        vectors[i] = vector
+            
+            logger.debug(f"Embedded {len(texts)} texts, {len(missing)} unique texts sent to provider")
+            
+            return vectors
         except Exception as e:
             logger.error(f"Embedding error: {e}")
             raise
     
     async def embed_query(self, text: str) -> List[float]:
         try:
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(
+            cached = await embedding_cache.get_many(self.embedding_model, [text])
+            if cached[0] is not None:
+                return cached[0]
+            
+            result = await call_with_retry(
+                lambda timeout: self._post(
                     f"{self.embedding_base_url}/embeddings",
-                    headers={
-                        "Authorization": f"Bearer {self.embedding_api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
+                    self.embedding_api_key,
+                    {
                         "model": self.embedding_model,
                         "input": text
-                    }
-                )
-                
-                response.raise_for_status()
-                result = response.json()
-                
-                return result["data"][0]["embedding"]
+                    },
+                    timeout=timeout
+                ),
+                self.embedding_retry_policy,
+                self.embedding_breaker
+            )
+            
+            vector = result["data"][0]["embedding"]
+            await embedding_cache.set_many(self.embedding_model, [text], [vector])
+            
+            return vector
+        except Exception as e:
+            logger.error(f"Query embedding error: {e}")
+            raise
+    
+    async def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        try:
+            vectors = await embedding_cache.get_many(self.embedding_model, texts)
+            pending_texts = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+            
+            if pending_texts:
+                fresh = dict(zip(pending_texts, await self._request_embeddings(pending_texts)))
+                await embedding_cache.set_many(self.embedding_model, pending_texts, [fresh[text] for text in pending_texts])
+                vectors = [vector if vector is not None else fresh[text] for text, vector in zip(texts, vectors)]
+            
+            return vectors
         except Exception as e:
             logger.error(f"Query embedding error: {e}")
             raise
     
+    async def _request_embeddings(self, texts: List[str]) -> List[List[float]]:
+        result = await call_with_retry(
+            lambda timeout: self._post(
+                f"{self.embedding_base_url}/embeddings",
+                self.embedding_api_key,
+                {
+                    "model": self.embedding_model,
+                    "input": texts
+                },
+                timeout=timeout
+            ),
+            self.embedding_retry_policy,
+            self.embedding_breaker
+        )
+        
+        data = sorted(result["data"], key=lambda item: item.get("index", 0))
+        return [item["embedding"] for item in data]
+    
+    def _make_embedding_batches(self, texts: List[str]) -> List[List[int]]:
+        batches = []
+        current: List[int] = []
+        current_tokens = 0
+        
+        for i, text in enumerate(texts):
+            tokens = estimate_tokens(text)
+            
+            if current and (
+                len(current) >= settings.EMBEDDING_BATCH_SIZE
+                or current_tokens + tokens > settings.EMBEDDING_BATCH_MAX_TOKENS
+            ):
+                batches.append(current)
+                current = []
+                current_tokens = 0
+            
+            current.append(i)
+            current_tokens += tokens
+        
+        if current:
+            batches.append(current)
+        
+        return batches
+    
+    async def _embed_in_batches(
+        self,
+        texts: List[str],
+        on_batch: Optional[Callable[[List[str]], None]] = None
+    ) -> List[List[float]]:
+        batches = self._make_embedding_batches(texts)
+        semaphore = asyncio.Semaphore(settings.EMBEDDING_CONCURRENCY)
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+        
+        async def run_batch(batch: List[int]):
+            batch_texts = [texts[i] for i in batch]
+            
+            async with semaphore:
+                try:
+                    batch_vectors = await self._request_embeddings(batch_texts)
+                except Exception as e:
+                    if len(batch) == 1 or isinstance(e, CircuitOpenError):
+                        raise
+                    
+                    logger.warning(f"Embedding batch of {len(batch)} failed ({e}), retrying items individually")
+                    batch_vectors = []
+                    for text in batch_texts:
+                        batch_vectors.extend(await self._request_embeddings([text]))
+            
+            await embedding_cache.set_many(self.embedding_model, batch_texts, batch_vectors)
+            
+            for i, vector in zip(batch, batch_vectors):
+                vectors[i] = vector
+            
+            if on_batch:
+                on_batch(batch_texts)
+        
+        if len(batches) > 1:
+            logger.info(f"Embedding {len(texts)} texts in {len(batches)} batches (concurrency={settings.EMBEDDING_CONCURRENCY})")
+        
+        tasks = [asyncio.create_task(run_batch(batch)) for batch in batches]
+        try:
+            await asyncio.gather(*tasks)
+        except Exception:
+            for task in tasks:
+                task.cancel()
+            raise
+        
+        return vectors
+    
     def _parse_function_points(self, response: str) -> List[Dict[str, Any]]:
         json_match = re.search(r'\[.*\]', response, re.DOTALL)
         
@@ -1,5 +1,11 @@
+import asyncio
+import hashlib
+import json
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+import time
+from uuid import uuid4
+from typing import List, Dict, Any, Optional, Callable, Iterable, Tuple
 from pymilvus import (
     connections,
     Collection,
@@ -9,19 +15,55 @@ from pymilvus import (
     utility
 )
 from datetime import datetime
+from redis.exceptions import RedisError, LockError
 
 from app.core.config import settings
+from app.core.redis import get_sync_redis
 from app.services.llm_service import llm_service
+from app.services.vector_index import index_planner
 
 logger = logging.getLogger(__name__)
 
+COPY_QUERY_LIMIT = 16384
+REBUILD_BATCH_SIZE = 1000
+
+LAYOUT_COLLECTION = "collection"
+LAYOUT_PARTITION_KEY = "partition_key"
+SHARED_COLLECTION_SUFFIX = "shared"
+
+VECTOR_FIELDS = [
+    "id",
+    "document_id",
+    "document_name",
+    "chunk_index",
+    "content",
+    "content_type",
+    "embedding",
+    "created_at",
+    "metadata"
+]
+
 
 class MilvusService:
-    def __init__(self):
+    def __init__(self, layout: Optional[str] = None):
         self.host = settings.MILVUS_HOST
         self.port = settings.MILVUS_PORT
         self.collection_prefix = settings.MILVUS_COLLECTION_NAME
+        self.layout = layout or settings.MILVUS_LAYOUT
+        self.num_partitions = settings.MILVUS_NUM_PARTITIONS
         self._connected = False
+        self._collections: Dict[str, Collection] = {}
+        self._loaded: set = set()
+        self._index_params: Dict[str, Dict[str, Any]] = {}
+        self._physical: Dict[str, Tuple[str, float]] = {}
+        self._profiles: Dict[str, Optional[str]] = {}
+        self.index_refresh_interval = settings.MILVUS_INDEX_REFRESH_INTERVAL
+        self._lock = threading.Lock()
+        self.write_buffer = VectorWriteBuffer(
+            self,
+            settings.MILVUS_WRITE_BATCH_ROWS,
+            settings.MILVUS_WRITE_MAX_DELAY
+        )
     
     def connect(self):
         if not self._connected:
@@ -42,23 +84,353 @@ class MilvusService:
             try:
                 connections.disconnect("default")
                 self._connected = False
+                with self._lock:
+                    self._collections.clear()
+                    self._loaded.clear()
+                    self._index_params.clear()
+                    self._physical.clear()
                 logger.info("Disconnected from Milvus")
             except Exception as e:
                 logger.error(f"Failed to disconnect from Milvus: {e}")
     
+    @property
+    def shared_layout(self) -> bool:
+        return self.layout == LAYOUT_PARTITION_KEY
+    
     def get_collection_name(self, project_id: str) -> str:
+        if self.shared_layout:
+            return f"{self.collection_prefix}_{SHARED_COLLECTION_SUFFIX}"
         safe_id = str(project_id).replace("-", "_").lower()[:20]
         return f"{self.collection_prefix}_{safe_id}"
     
-    def create_collection(self, project_id: str, embedding_dim: int = 1024) -> Collection:
+    def scope_expr(self, project_id: str, expr: Optional[str] = None) -> Optional[str]:
+        if not self.shared_layout:
+            return expr
+        project_expr = f'project_id == "{project_id}"'
+        return f"{project_expr} and ({expr})" if expr else project_expr
+    
+    def get_collection(self, project_id: str, load: bool = False) -> Optional[Collection]:
         self.connect()
         
         collection_name = self.get_collection_name(project_id)
         
-        if utility.has_collection(collection_name):
-            logger.info(f"Collection {collection_name} already exists")
-            return Collection(collection_name)
+        collection = self._collections.get(collection_name)
+        if collection is None:
+            if not utility.has_collection(collection_name):
+                return None
+            collection = self._register_collection(collection_name, Collection(collection_name))
+        
+        if load and collection_name not in self._loaded:
+            with self._lock:
+                if collection_name not in self._loaded:
+                    collection.load()
+                    self._loaded.add(collection_name)
+                    logger.info(f"Loaded collection {collection_name}")
+        
+        return collection
+    
+    def _register_collection(self, collection_name: str, collection: Collection) -> Collection:
+        with self._lock:
+            return self._collections.setdefault(collection_name, collection)
+    
+    def invalidate_collection(self, project_id: str):
+        collection_name = self.get_collection_name(project_id)
+        with self._lock:
+            self._collections.pop(collection_name, None)
+            self._loaded.discard(collection_name)
+            self._index_params.pop(collection_name, None)
+            self._physical.pop(collection_name, None)
+    
+    def preload_collections(self, project_ids: Iterable[str]) -> int:
+        loaded = 0
+        for project_id in project_ids:
+            try:
+                if self.get_collection(project_id, load=True) is not None:
+                    loaded += 1
+            except Exception as e:
+                logger.warning(f"Failed to preload collection for project {project_id}: {e}")
+        
+        logger.info(f"Preloaded {loaded} Milvus collections")
+        return loaded
+    
+    def set_index_profile(self, project_id: str, profile: Optional[str]):
+        with self._lock:
+            self._profiles[project_id] = profile
+    
+    @staticmethod
+    def physical_name(collection: Collection) -> str:
+        return collection.describe()["collection_name"]
+    
+    def get_index_params(self, project_id: str) -> Optional[Dict[str, Any]]:
+        collection_name = self.get_collection_name(project_id)
+        cached = self._index_params.get(collection_name)
+        physical = self._physical.get(collection_name)
+        now = time.monotonic()
+        if cached is not None and physical is not None and now - physical[1] < self.index_refresh_interval:
+            return cached
+        
+        collection = self.get_collection(project_id)
+        if collection is None:
+            return None
+        
+        physical_name = self.physical_name(collection)
+        if cached is not None and physical is not None and physical[0] == physical_name:
+            with self._lock:
+                self._physical[collection_name] = (physical_name, now)
+            return cached
+        
+        if not collection.indexes:
+            return None
+        
+        index_params = dict(collection.indexes[0].params)
+        if isinstance(index_params.get("params"), str):
+            index_params["params"] = json.loads(index_params["params"])
+        
+        with self._lock:
+            self._index_params[collection_name] = index_params
+            self._physical[collection_name] = (physical_name, now)
+        return index_params
+    
+    @staticmethod
+    def _collection_lock(collection_name: str):
+        return get_sync_redis().lock(
+            f"milvus:collection:{collection_name}",
+            timeout=settings.MILVUS_REBUILD_LOCK_TIMEOUT,
+            blocking_timeout=settings.MILVUS_REBUILD_LOCK_TIMEOUT
+        )
+    
+    @staticmethod
+    def _release_lock(lock):
+        try:
+            lock.release()
+        except LockError as e:
+            logger.warning(f"Collection lock {lock.name} expired before release: {e}")
+    
+    def ensure_index(self, project_id: str, profile: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        if self.shared_layout:
+            profile = None
+        else:
+            self.set_index_profile(project_id, profile)
+        
+        collection_name = self.get_collection_name(project_id)
+        lock = self._collection_lock(collection_name)
+        try:
+            acquired = lock.acquire(blocking=False)
+        except RedisError as e:
+            logger.warning(f"Skipping index check of {collection_name}: collection lock unavailable ({e})")
+            return self.get_index_params(project_id)
+        if not acquired:
+            logger.info(f"Skipping index check of {collection_name}: locked by another process")
+            return self.get_index_params(project_id)
+        
+        try:
+            collection = self.get_collection(project_id, load=True)
+            if collection is None:
+                return None
+            
+            current = self.get_index_params(project_id)
+            row_count = self.count_rows(collection)
+            index_type = index_planner.resolve(profile, row_count)
+            if current and current.get("index_type") == index_type:
+                return current
+            
+            embedding_field = next(field for field in collection.schema.fields if field.name == "embedding")
+            index_params = index_planner.build_params(index_type, row_count, embedding_field.params["dim"])
+            
+            logger.info(
+                f"Rebuilding index of {collection.name} ({row_count} rows): "
+                f"{(current or {}).get('index_type')} -> {index_type}"
+            )
+            target_name = self._rebuild_collection(collection, index_params, lock)
+            
+            with self._lock:
+                self._index_params[collection.name] = index_params
+                self._physical[collection.name] = (target_name, time.monotonic())
+            return index_params
+        finally:
+            self._release_lock(lock)
+    
+    def _rebuild_collection(self, collection: Collection, index_params: Dict[str, Any], lock) -> str:
+        collection_name = collection.name
+        source_name = self.physical_name(collection)
+        target_name = f"{collection_name}_{uuid4().hex[:8]}"
+        fields = [field.name for field in collection.schema.fields]
+        
+        collection.flush()
+        source = Collection(source_name)
+        target = self._new_collection(target_name, collection.schema)
+        swapped = False
+        try:
+            copied = self._copy_rows(source, target, fields)
+            target.flush()
+            target.create_index(field_name="embedding", index_params=index_params)
+            utility.wait_for_index_building_complete(target_name)
+            target.load()
+            fence = int(datetime.utcnow().timestamp()) - 1
+            self._sync_rows(source, target, fields)
+            
+            lock.reacquire()
+            if self.physical_name(Collection(collection_name)) != source_name:
+                raise RuntimeError(f"Collection {collection_name} was rebuilt concurrently")
+            
+            if source_name == collection_name:
+                source.flush()
+                self._catch_up_rows(source, target, fields, fence, int(datetime.utcnow().timestamp()))
+                swapped = True
+                utility.drop_collection(source_name)
+                try:
+                    utility.create_alias(target_name, collection_name)
+                except Exception:
+                    logger.error(f"Dropped {source_name} but failed to alias {target_name} as {collection_name}; its rows are kept in {target_name}")
+                    raise
+            else:
+                swapped = True
+                utility.alter_alias(target_name, collection_name)
+                switched = int(datetime.utcnow().timestamp())
+                source.flush()
+                self._catch_up_rows(source, target, fields, fence, switched)
+                utility.drop_collection(source_name)
+        except Exception:
+            if not swapped:
+                utility.drop_collection(target_name)
+            raise
+        
+        logger.info(f"Switched {collection_name} from {source_name} to {target_name} ({copied} rows copied)")
+        return target_name
+    
+    @staticmethod
+    def _copy_rows(source: Collection, target: Collection, fields: List[str]) -> int:
+        copied = 0
+        iterator = source.query_iterator(
+            batch_size=REBUILD_BATCH_SIZE,
+            expr="",
+            output_fields=fields,
+            consistency_level="Strong"
+        )
+        try:
+            while True:
+                rows = iterator.next()
+                if not rows:
+                    break
+                target.insert(rows)
+                copied += len(rows)
+        finally:
+            iterator.close()
+        return copied
+    
+    @staticmethod
+    def _iter_ids(collection: Collection, expr: str = "") -> Iterable[str]:
+        iterator = collection.query_iterator(
+            batch_size=REBUILD_BATCH_SIZE,
+            expr=expr,
+            output_fields=["id"],
+            consistency_level="Strong"
+        )
+        try:
+            while True:
+                rows = iterator.next()
+                if not rows:
+                    return
+                for row in rows:
+                    yield row["id"]
+        finally:
+            iterator.close()
+    
+    @staticmethod
+    def _insert_rows(source: Collection, target: Collection, fields: List[str], ids: List[str]):
+        for start in range(0, len(ids), REBUILD_BATCH_SIZE):
+            ids_str = ", ".join([f'"{vector_id}"' for vector_id in ids[start:start + REBUILD_BATCH_SIZE]])
+            rows = source.query(expr=f"id in [{ids_str}]", output_fields=fields, consistency_level="Strong")
+            if rows:
+                target.insert(rows)
+    
+    def _sync_rows(self, source: Collection, target: Collection, fields: List[str]):
+        missing = set(self._iter_ids(source))
+        extra = []
+        for vector_id in self._iter_ids(target):
+            if vector_id in missing:
+                missing.discard(vector_id)
+            else:
+                extra.append(vector_id)
+        
+        missing = list(missing)
+        self._insert_rows(source, target, fields, missing)
+        
+        for start in range(0, len(extra), REBUILD_BATCH_SIZE):
+            ids_str = ", ".join([f'"{vector_id}"' for vector_id in extra[start:start + REBUILD_BATCH_SIZE]])
+            target.delete(f"id in [{ids_str}]")
+        
+        if missing or extra:
+            logger.info(f"Caught up {target.name}: {len(missing)} rows added, {len(extra)} rows removed")
+    
+    def _catch_up_rows(self, source: Collection, target: Collection, fields: List[str], since: int, until: int):
+        expr = f"created_at >= {since} and created_at <= {until}"
+        present = set(self._iter_ids(target, expr))
+        missing = [vector_id for vector_id in self._iter_ids(source, expr) if vector_id not in present]
+        self._insert_rows(source, target, fields, missing)
+        
+        if missing:
+            logger.info(f"Caught up {target.name}: {len(missing)} rows written to {source.name} before the switch")
+    
+    def _new_collection(self, name: str, schema: CollectionSchema) -> Collection:
+        if self.shared_layout:
+            return Collection(
+                name=name,
+                schema=schema,
+                consistency_level=settings.MILVUS_CONSISTENCY_LEVEL,
+                num_partitions=self.num_partitions
+            )
+        return Collection(
+            name=name,
+            schema=schema,
+            consistency_level=settings.MILVUS_CONSISTENCY_LEVEL
+        )
+    
+    @staticmethod
+    def count_rows(collection: Collection, expr: Optional[str] = None, consistency_level: Optional[str] = None) -> int:
+        if consistency_level:
+            rows = collection.query(expr=expr or "", output_fields=["count(*)"], consistency_level=consistency_level)
+        else:
+            rows = collection.query(expr=expr or "", output_fields=["count(*)"])
+        return rows[0]["count(*)"] if rows else 0
+    
+    def create_collection(
+        self,
+        project_id: str,
+        embedding_dim: int = 1024,
+        profile: Optional[str] = None
+    ) -> Collection:
+        collection = self.get_collection(project_id)
+        if collection is not None:
+            return collection
+        
+        collection_name = self.get_collection_name(project_id)
+        lock = self._collection_lock(collection_name)
+        try:
+            acquired = lock.acquire()
+        except RedisError as e:
+            logger.warning(f"Creating {collection_name} without the collection lock ({e})")
+            acquired = False
+        else:
+            if not acquired:
+                logger.warning(f"Creating {collection_name} without the collection lock (timed out)")
         
+        try:
+            collection = self.get_collection(project_id)
+            if collection is not None:
+                return collection
+            return self._create_collection(project_id, collection_name, embedding_dim, profile)
+        finally:
+            if acquired:
+                self._release_lock(lock)
+    
+    def _create_collection(
+        self,
+        project_id: str,
+        collection_name: str,
+        embedding_dim: int,
+        profile: Optional[str]
+    ) -> Collection:
         fields = [
             FieldSchema(name="id", dtype=DataType.VARCHAR, is_primary=True, max_length=64),
             FieldSchema(name="document_id", dtype=DataType.VARCHAR, max_length=64),
@@ -71,45 +443,101 @@ class MilvusService:
             FieldSchema(name="metadata", dtype=DataType.JSON)
         ]
         
-        schema = CollectionSchema(
-            fields=fields,
-            description=f"Document vectors for project {project_id}",
-            enable_dynamic_field=True
-        )
+        if self.shared_layout:
+            fields.append(FieldSchema(name="project_id", dtype=DataType.VARCHAR, max_length=64, is_partition_key=True))
+            schema = CollectionSchema(
+                fields=fields,
+                description="Document vectors for all projects, partitioned by project_id",
+                enable_dynamic_field=True
+            )
+            profile = None
+        else:
+            schema = CollectionSchema(
+                fields=fields,
+                description=f"Document vectors for project {project_id}",
+                enable_dynamic_field=True
+            )
+            if profile is None:
+                profile = self._profiles.get(project_id)
         
-        collection = Collection(
-            name=collection_name,
-            schema=schema
-        )
+        physical_name = f"{collection_name}_{uuid4().hex[:8]}"
+        collection = self._new_collection(physical_name, schema)
         
-        index_params = {
-            "metric_type": "COSINE",
-            "index_type": "IVF_FLAT",
-            "params": {"nlist": 128}
-        }
+        index_params = index_planner.build_params(index_planner.resolve(profile, 0), 0, embedding_dim)
         
         collection.create_index(
             field_name="embedding",
             index_params=index_params
         )
         
-        logger.info(f"Created collection {collection_name} with embedding dimension {embedding_dim}")
+        try:
+            utility.create_alias(physical_name, collection_name)
+        except Exception as e:
+            utility.drop_collection(physical_name)
+            existing = self.get_collection(project_id)
+            if existing is None:
+                raise
+            logger.info(f"Collection {collection_name} was created concurrently ({e})")
+            return existing
+        
+        logger.info(f"Created collection {physical_name} as {collection_name} with embedding dimension {embedding_dim} and {index_params['index_type']} index")
         
-        return collection
+        with self._lock:
+            self._index_params[collection_name] = index_params
+            self._physical[collection_name] = (physical_name, time.monotonic())
+        return self._register_collection(collection_name, Collection(collection_name))
     
     def delete_collection(self, project_id: str) -> bool:
+        self.write_buffer.discard(project_id, lambda row: True)
+        
+        if self.shared_layout:
+            return self.delete_project_vectors(project_id)
+        
         self.connect()
         
         collection_name = self.get_collection_name(project_id)
         
         try:
             if utility.has_collection(collection_name):
-                utility.drop_collection(collection_name)
-                logger.info(f"Deleted collection {collection_name}")
+                physical_name = self.physical_name(Collection(collection_name))
+                if physical_name != collection_name:
+                    utility.drop_alias(collection_name)
+                utility.drop_collection(physical_name)
+                logger.info(f"Deleted collection {physical_name} ({collection_name})")
             return True
         except Exception as e:
             logger.error(f"Failed to delete collection {collection_name}: {e}")
             return False
+        finally:
+            self.invalidate_collection(project_id)
+    
+    def delete_project_vectors(self, project_id: str) -> bool:
+        collection = self.get_collection(project_id, load=True)
+        if collection is None:
+            return True
+        
+        try:
+            collection.delete(self.scope_expr(project_id))
+            logger.info(f"Deleted vectors of project {project_id} from {collection.name}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to delete vectors of project {project_id}: {e}")
+            return False
+    
+    @staticmethod
+    def make_chunk_ids(
+        document_id: str,
+        contents: List[str],
+        occurrences: Optional[Dict[str, int]] = None
+    ) -> List[str]:
+        occurrences = {} if occurrences is None else occurrences
+        ids = []
+        for content in contents:
+            content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+            occurrence = occurrences.get(content_hash, 0)
+            occurrences[content_hash] = occurrence + 1
+            ids.append(hashlib.sha256(f"{document_id}:{content_hash}:{occurrence}".encode("utf-8")).hexdigest())
+        return ids
     
     async def insert_vectors(
         self,
@@ -117,7 +545,8 @@ class MilvusService:
         document_id: str,
         document_name: str,
         chunks: List[Dict[str, Any]],
-        content_type: str = "text"
+        content_type: str = "text",
+        progress_callback: Optional[Callable[[int, int], None]] = None
     ) -> int:
         self.connect()
         
@@ -126,7 +555,7 @@ class MilvusService:
         
         texts = [chunk["content"] for chunk in chunks]
         
-        embeddings = await llm_service.embed_texts(texts)
+        embeddings = await llm_service.embed_texts(texts, progress_callback=progress_callback)
         
         if not embeddings or len(embeddings) == 0:
             logger.error("Failed to generate embeddings")
@@ -134,35 +563,114 @@ class MilvusService:
         
         embedding_dim = len(embeddings[0])
         
-        collection = self.create_collection(project_id, embedding_dim)
+        self.create_collection(project_id, embedding_dim)
         
-        import uuid
-        from datetime import datetime
+        chunk_ids = self.make_chunk_ids(document_id, texts)
+        created_at = int(datetime.utcnow().timestamp())
         
         data = []
         for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
             data.append({
-                "id": str(uuid.uuid4()),
+                "id": chunk.get("id", chunk_ids[i]),
+                "project_id": project_id,
                 "document_id": document_id,
                 "document_name": document_name,
-                "chunk_index": i,
+                "chunk_index": chunk.get("chunk_index", i),
                 "content": chunk["content"][:65500],
                 "content_type": content_type,
                 "embedding": embedding,
-                "created_at": int(datetime.utcnow().timestamp()),
+                "created_at": created_at,
                 "metadata": {
                     "char_count": chunk.get("char_count", len(chunk["content"])),
+                    "token_count": chunk.get("token_count"),
+                    "heading": chunk.get("heading"),
                     "source": chunk.get("source", "document")
                 }
             })
         
-        collection.insert(data)
-        collection.flush()
+        await self.write_buffer.add(project_id, data)
         
-        logger.info(f"Inserted {len(data)} vectors into collection for project {project_id}")
+        logger.info(f"Buffered {len(data)} vectors for collection of project {project_id}")
         
         return len(data)
     
+    def get_document_chunk_indexes(self, project_id: str, document_id: str) -> Dict[str, int]:
+        collection = self.get_collection(project_id, load=True)
+        if collection is None:
+            return {}
+        
+        rows = collection.query(
+            expr=self.scope_expr(project_id, f'document_id == "{document_id}"'),
+            output_fields=["id", "chunk_index"],
+            limit=COPY_QUERY_LIMIT,
+            consistency_level="Strong"
+        )
+        return {row["id"]: row["chunk_index"] for row in rows}
+    
+    def delete_vectors_by_ids(self, project_id: str, ids: List[str]) -> int:
+        if not ids:
+            return 0
+        
+        id_set = set(ids)
+        self.write_buffer.discard(project_id, lambda row: row["id"] in id_set)
+        
+        collection = self.get_collection(project_id, load=True)
+        if collection is None:
+            return 0
+        
+        ids_str = ", ".join([f'"{vector_id}"' for vector_id in ids])
+        collection.delete(self.scope_expr(project_id, f"id in [{ids_str}]"))
+        return len(ids)
+    
+    def update_chunk_indexes(self, project_id: str, moves: Dict[str, int]) -> int:
+        if not moves:
+            return 0
+        
+        collection = self.get_collection(project_id, load=True)
+        if collection is None:
+            return 0
+        
+        ids_str = ", ".join([f'"{vector_id}"' for vector_id in moves])
+        rows = collection.query(
+            expr=self.scope_expr(project_id, f"id in [{ids_str}]"),
+            output_fields=["*"],
+            limit=COPY_QUERY_LIMIT,
+            consistency_level="Strong"
+        )
+        for row in rows:
+            row["chunk_index"] = moves[row["id"]]
+        
+        if rows:
+            collection.upsert(rows)
+        return len(rows)
+    
+    def open_sync(
+        self,
+        project_id: str,
+        document_id: str,
+        document_name: str,
+        content_type: str = "text"
+    ) -> "DocumentVectorSync":
+        return DocumentVectorSync(self, project_id, document_id, document_name, content_type)
+    
+    async def sync_document_vectors(
+        self,
+        project_id: str,
+        document_id: str,
+        document_name: str,
+        chunks: List[Dict[str, Any]],
+        content_type: str = "text",
+        progress_callback: Optional[Callable[[int, int], None]] = None
+    ) -> Dict[str, int]:
+        sync = self.open_sync(project_id, document_id, document_name, content_type)
+        await sync.start()
+        try:
+            await sync.add(chunks, progress_callback=progress_callback)
+        except Exception:
+            await sync.abort()
+            raise
+        return await sync.finish()
+    
     async def search_similar(
         self,
         project_id: str,
@@ -170,42 +678,58 @@ class MilvusService:
         top_k: int = 5,
         document_ids: Optional[List[str]] = None
     ) -> List[Dict[str, Any]]:
-        self.connect()
-        
-        collection_name = self.get_collection_name(project_id)
-        
-        if not utility.has_collection(collection_name):
-            logger.warning(f"Collection {collection_name} does not exist")
+        results = await self.search_similar_batch(
+            project_id=project_id,
+            queries=[query],
+            top_k=top_k,
+            document_ids=document_ids
+        )
+        return results[0]
+    
+    async def search_similar_batch(
+        self,
+        project_id: str,
+        queries: List[str],
+        top_k: int = 5,
+        document_ids: Optional[List[str]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        if not queries:
             return []
         
-        collection = Collection(collection_name)
-        collection.load()
-        
-        query_embedding = await llm_service.embed_query(query)
-        
-        search_params = {
-            "metric_type": "COSINE",
-            "params": {"nprobe": 16}
-        }
+        query_embeddings = await llm_service.embed_queries(queries)
         
         filter_expr = None
         if document_ids:
             doc_ids_str = ", ".join([f'"{doc_id}"' for doc_id in document_ids])
             filter_expr = f'document_id in [{doc_ids_str}]'
         
-        results = collection.search(
-            data=[query_embedding],
-            anns_field="embedding",
-            param=search_params,
-            limit=top_k,
-            expr=filter_expr,
-            output_fields=["document_id", "document_name", "chunk_index", "content", "content_type", "metadata"]
-        )
+        def search():
+            collection = self.get_collection(project_id, load=True)
+            if collection is None:
+                logger.warning(f"Collection {self.get_collection_name(project_id)} does not exist")
+                return [[] for _ in queries]
+            
+            return collection.search(
+                data=query_embeddings,
+                anns_field="embedding",
+                param=index_planner.search_params(self.get_index_params(project_id), top_k),
+                limit=top_k,
+                expr=self.scope_expr(project_id, filter_expr),
+                consistency_level=settings.MILVUS_CONSISTENCY_LEVEL,
+                output_fields=["document_id", "document_name", "chunk_index", "content", "content_type", "metadata"]
+            )
+        
+        try:
+            results = await asyncio.to_thread(search)
+        except Exception:
+            self.invalidate_collection(project_id)
+            raise
+        
+        logger.debug(f"Searched {len(queries)} queries in one request for project {project_id}")
         
-        similar_docs = []
-        for hits in results:
-            for hit in hits:
-                similar_docs.append({
+        return [
+            [
+                {
                     "id": hit.id,
                     "distance": hit.distance,
                     "document_id": hit.entity.get("document_id"),
@@ -214,22 +738,81 @@ class MilvusService:
                     "content": hit.entity.get("content"),
                     "content_type": hit.entity.get("content_type"),
                     "metadata": hit.entity.get("metadata")
-                })
+                }
+                for hit in hits
+            ]
+            for hits in results
+        ]
+    
+    def copy_document_vectors(
+        self,
+        source_project_id: str,
+        source_document_id: str,
+        project_id: str,
+        document_id: str,
+        document_name: str
+    ) -> int:
+        source = self.get_collection(source_project_id, load=True)
+        if source is None:
+            return 0
+        
+        source_expr = self.scope_expr(source_project_id, f'document_id == "{source_document_id}"')
+        rows = source.query(
+            expr=source_expr,
+            output_fields=["chunk_index", "content", "content_type", "embedding", "metadata"],
+            limit=COPY_QUERY_LIMIT,
+            consistency_level="Strong"
+        )
+        
+        if not rows or len(rows) >= COPY_QUERY_LIMIT:
+            return 0
+        
+        rows.sort(key=lambda row: row["chunk_index"])
+        source_count = self.count_rows(source, source_expr, consistency_level="Strong")
+        if len(rows) != source_count or [row["chunk_index"] for row in rows] != list(range(len(rows))):
+            logger.warning(
+                f"Vectors of document {source_document_id} are incomplete "
+                f"({len(rows)} rows read, {source_count} stored); not reusing them"
+            )
+            return 0
+        chunk_ids = self.make_chunk_ids(document_id, [row["content"] for row in rows])
+        
+        collection = self.create_collection(project_id, len(rows[0]["embedding"]))
+        created_at = int(datetime.utcnow().timestamp())
+        
+        data = [
+            {
+                "id": chunk_id,
+                "project_id": project_id,
+                "document_id": document_id,
+                "document_name": document_name,
+                "chunk_index": row["chunk_index"],
+                "content": row["content"],
+                "content_type": row["content_type"],
+                "embedding": row["embedding"],
+                "created_at": created_at,
+                "metadata": row["metadata"]
+            }
+            for row, chunk_id in zip(rows, chunk_ids)
+        ]
+        
+        result = collection.insert(data)
+        if result.insert_count != len(data):
+            raise RuntimeError(f"Inserted {result.insert_count} of {len(data)} vectors copied from document {source_document_id}")
+        
+        logger.info(f"Copied {len(data)} vectors from document {source_document_id} to {document_id}")
         
-        return similar_docs
+        return len(data)
     
     def delete_document_vectors(self, project_id: str, document_id: str) -> bool:
-        self.connect()
-        
-        collection_name = self.get_collection_name(project_id)
+        self.write_buffer.discard(project_id, lambda row: row["document_id"] == document_id)
         
-        if not utility.has_collection(collection_name):
+        collection = self.get_collection(project_id, load=True)
+        if collection is None:
             return True
         
         try:
-            collection = Collection(collection_name)
-            collection.delete(f'document_id == "{document_id}"')
-            collection.flush()
+            collection.delete(self.scope_expr(project_id, f'document_id == "{document_id}"'))
             logger.info(f"Deleted vectors for document {document_id}")
             return True
         except Exception as e:
@@ -237,21 +820,321 @@ class MilvusService:
             return False
     
     def get_collection_stats(self, project_id: str) -> Dict[str, Any]:
-        self.connect()
+        collection = self.get_collection(project_id, load=True)
+        if collection is None:
+            return {"exists": False, "count": 0}
         
-        collection_name = self.get_collection_name(project_id)
+        return {
+            "exists": True,
+            "count": self.count_rows(collection, self.scope_expr(project_id)),
+            "collection_name": collection.name,
+            "layout": self.layout,
+            "index": self.get_index_params(project_id),
+            "pending_writes": self.write_buffer.pending_count(project_id)
+        }
+    
+    async def flush(self, project_id: Optional[str] = None, seal: bool = True) -> int:
+        written = await self.write_buffer.drain(project_id)
+        if seal:
+            for dirty_project_id in self.write_buffer.take_dirty(project_id):
+                collection = self.get_collection(dirty_project_id)
+                if collection is not None:
+                    await asyncio.to_thread(collection.flush)
+        return written
+
+
+class VectorWriteBuffer:
+    def __init__(self, service: MilvusService, max_rows: int, max_delay: float):
+        self.service = service
+        self.max_rows = max(1, max_rows)
+        self.max_delay = max_delay
+        self._pending: Dict[str, List[Dict[str, Any]]] = {}
+        self._outstanding: Dict[Tuple[str, str], int] = {}
+        self._waiters: Dict[Tuple[str, str], List[asyncio.Future]] = {}
+        self._failed: Dict[Tuple[str, str], Exception] = {}
+        self._dirty: set = set()
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            "rows": 0,
+            "batches": 0,
+            "dropped": 0
+        }
+    
+    async def add(self, project_id: str, rows: List[Dict[str, Any]]):
+        with self._lock:
+            pending = self._pending.setdefault(project_id, [])
+            ids = {row["id"] for row in rows}
+            stale = [row for row in pending if row["id"] in ids]
+            if stale:
+                pending[:] = [row for row in pending if row["id"] not in ids]
+            pending.extend(rows)
+            full = len(pending) >= self.max_rows
+            waiters = self._track(project_id, stale, -1) + self._track(project_id, rows, 1)
+        self._resolve(waiters)
         
-        if not utility.has_collection(collection_name):
-            return {"exists": False, "count": 0}
+        if full:
+            await self.drain(project_id)
+        elif self.max_delay > 0 and project_id not in self._timers:
+            self._timers[project_id] = asyncio.get_running_loop().call_later(
+                self.max_delay,
+                lambda: asyncio.ensure_future(self._drain_later(project_id))
+            )
+    
+    async def _drain_later(self, project_id: str):
+        self._timers.pop(project_id, None)
+        try:
+            await self.drain(project_id)
+        except Exception as e:
+            logger.warning(f"Deferred vector write for project {project_id} failed: {e}")
+    
+    async def drain(self, project_id: Optional[str] = None) -> int:
+        project_ids = [project_id] if project_id is not None else list(self._pending)
+        
+        written = 0
+        for pending_project_id in project_ids:
+            timer = self._timers.pop(pending_project_id, None)
+            if timer is not None:
+                timer.cancel()
+            written += await asyncio.to_thread(self._write, pending_project_id)
+        return written
+    
+    async def wait(self, project_id: str, document_id: str):
+        key = (project_id, document_id)
+        with self._lock:
+            error = self._failed.pop(key, None)
+            future = None
+            if error is None and key in self._outstanding:
+                future = asyncio.get_running_loop().create_future()
+                self._waiters.setdefault(key, []).append(future)
+        
+        if error is not None:
+            raise error
+        if future is None:
+            return
+        
+        if self.max_delay <= 0 or project_id not in self._timers:
+            try:
+                await self.drain(project_id)
+            except Exception:
+                pass
+        await future
+    
+    def reset(self, project_id: str, document_id: str):
+        with self._lock:
+            self._failed.pop((project_id, document_id), None)
+    
+    def _write(self, project_id: str) -> int:
+        with self._lock:
+            rows = self._pending.pop(project_id, [])
+        if not rows:
+            return 0
         
-        collection = Collection(collection_name)
-        stats = collection.num_entities
+        written = 0
+        try:
+            collection = self.service.create_collection(project_id, len(rows[0]["embedding"]))
+            for start in range(0, len(rows), self.max_rows):
+                batch = rows[start:start + self.max_rows]
+                collection.insert(batch)
+                written += len(batch)
+                self._stats["batches"] += 1
+                with self._lock:
+                    waiters = self._track(project_id, batch, -1)
+                self._resolve(waiters)
+        except Exception as e:
+            self._fail(project_id, rows[written:], e)
+            raise
+        finally:
+            self._stats["rows"] += written
+        
+        with self._lock:
+            self._dirty.add(project_id)
+        logger.info(f"Wrote {written} buffered vectors to collection of project {project_id}")
+        return written
+    
+    def _fail(self, project_id: str, rows: List[Dict[str, Any]], error: Exception):
+        document_ids = {row["document_id"] for row in rows}
+        with self._lock:
+            pending = self._pending.get(project_id, [])
+            dropped = [row for row in pending if row["document_id"] in document_ids]
+            self._pending[project_id] = [row for row in pending if row["document_id"] not in document_ids]
+            self._stats["dropped"] += len(rows) + len(dropped)
+            waiters = self._track(project_id, rows + dropped, -1)
+            for document_id in document_ids:
+                key = (project_id, document_id)
+                self._failed[key] = error
+                waiters.extend(self._waiters.pop(key, []))
+        
+        logger.error(
+            f"Dropped {len(rows) + len(dropped)} buffered vectors of {len(document_ids)} documents "
+            f"in project {project_id} after a failed write: {error}"
+        )
+        self._resolve(waiters, error)
+    
+    def _track(self, project_id: str, rows: Iterable[Dict[str, Any]], delta: int) -> List[asyncio.Future]:
+        waiters = []
+        for row in rows:
+            key = (project_id, row["document_id"])
+            count = self._outstanding.get(key, 0) + delta
+            if count > 0:
+                self._outstanding[key] = count
+                continue
+            self._outstanding.pop(key, None)
+            waiters.extend(self._waiters.pop(key, []))
+        return waiters
+    
+    @staticmethod
+    def _resolve(waiters: List[asyncio.Future], error: Optional[Exception] = None):
+        def settle(future: asyncio.Future):
+            if future.done():
+                return
+            if error is None:
+                future.set_result(None)
+            else:
+                future.set_exception(error)
         
+        for future in waiters:
+            loop = future.get_loop()
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(settle, future)
+    
+    def discard(self, project_id: str, predicate: Callable[[Dict[str, Any]], bool]) -> int:
+        with self._lock:
+            pending = self._pending.get(project_id)
+            if not pending:
+                return 0
+            kept = [row for row in pending if not predicate(row)]
+            discarded = [row for row in pending if predicate(row)]
+            self._pending[project_id] = kept
+            waiters = self._track(project_id, discarded, -1)
+        self._resolve(waiters)
+        return len(discarded)
+    
+    def take_dirty(self, project_id: Optional[str] = None) -> List[str]:
+        with self._lock:
+            if project_id is None:
+                dirty, self._dirty = list(self._dirty), set()
+                return dirty
+            if project_id in self._dirty:
+                self._dirty.discard(project_id)
+                return [project_id]
+            return []
+    
+    def pending_count(self, project_id: Optional[str] = None) -> int:
+        with self._lock:
+            if project_id is not None:
+                return len(self._pending.get(project_id, []))
+            return sum(len(rows) for rows in self._pending.values())
+    
+    def get_stats(self) -> Dict[str, Any]:
         return {
-            "exists": True,
-            "count": stats,
-            "collection_name": collection_name
+            "pending": self.pending_count(),
+            "max_rows": self.max_rows,
+            "max_delay": self.max_delay,
+            **self._stats
         }
 
 
+class DocumentVectorSync:
+    def __init__(
+        self,
+        service: MilvusService,
+        project_id: str,
+        document_id: str,
+        document_name: str,
+        content_type: str
+    ):
+        self.service = service
+        self.project_id = project_id
+        self.document_id = document_id
+        self.document_name = document_name
+        self.content_type = content_type
+        self._existing: Dict[str, int] = {}
+        self._seen: set = set()
+        self._occurrences: Dict[str, int] = {}
+        self._moves: Dict[str, int] = {}
+        self._added_ids: List[str] = []
+        self._count = 0
+        self._added = 0
+    
+    async def start(self):
+        self.service.write_buffer.reset(self.project_id, self.document_id)
+        existing = await asyncio.to_thread(self.service.get_document_chunk_indexes, self.project_id, self.document_id)
+        if len(existing) >= COPY_QUERY_LIMIT:
+            await asyncio.to_thread(self.service.delete_document_vectors, self.project_id, self.document_id)
+            existing = {}
+        self._existing = existing
+    
+    async def add(
+        self,
+        chunks: List[Dict[str, Any]],
+        progress_callback: Optional[Callable[[int, int], None]] = None
+    ) -> int:
+        chunk_ids = self.service.make_chunk_ids(
+            self.document_id,
+            [chunk["content"] for chunk in chunks],
+            self._occurrences
+        )
+        
+        new_chunks = []
+        for chunk, chunk_id in zip(chunks, chunk_ids):
+            index = self._count
+            self._count += 1
+            self._seen.add(chunk_id)
+            if chunk_id not in self._existing:
+                new_chunks.append({**chunk, "id": chunk_id, "chunk_index": index})
+            elif self._existing[chunk_id] != index:
+                self._moves[chunk_id] = index
+        
+        if not new_chunks:
+            if progress_callback:
+                progress_callback(len(chunks), len(chunks))
+            return 0
+        
+        self._added_ids.extend(chunk["id"] for chunk in new_chunks)
+        added = await self.service.insert_vectors(
+            project_id=self.project_id,
+            document_id=self.document_id,
+            document_name=self.document_name,
+            chunks=new_chunks,
+            content_type=self.content_type,
+            progress_callback=progress_callback
+        )
+        if added == 0:
+            raise RuntimeError("Failed to generate embeddings")
+        
+        self._added += added
+        return added
+    
+    async def finish(self) -> Dict[str, int]:
+        removed = [vector_id for vector_id in self._existing if vector_id not in self._seen]
+        
+        await self.service.write_buffer.wait(self.project_id, self.document_id)
+        await asyncio.to_thread(self.service.delete_vectors_by_ids, self.project_id, removed)
+        await asyncio.to_thread(self.service.update_chunk_indexes, self.project_id, self._moves)
+        
+        stats = {
+            "added": self._added,
+            "removed": len(removed),
+            "moved": len(self._moves),
+            "unchanged": self._count - self._added
+        }
+        logger.info(f"Synced vectors for document {self.document_id}: {stats}")
+        return stats
+    
+    async def abort(self):
+        self.service.write_buffer.discard(self.project_id, lambda row: row["document_id"] == self.document_id)
+        try:
+            await self.service.write_buffer.wait(self.project_id, self.document_id)
+        except Exception as e:
+            logger.warning(f"Buffered vectors of document {self.document_id} failed to write: {e}")
+        
+        if not self._added_ids:
+            return
+        
+        await asyncio.to_thread(self.service.delete_vectors_by_ids, self.project_id, self._added_ids)
+        logger.info(f"Rolled back {len(self._added_ids)} new vectors of document {self.document_id}")
+        self._added_ids = []
+
+
 milvus_service = MilvusService()
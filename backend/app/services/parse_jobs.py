@@ -0,0 +1,314 @@
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime
+from typing import Optional, List, Dict, Any
+from uuid import UUID
+
+from fastapi import BackgroundTasks
+from sqlmodel import Session, select, or_
+
+from app.core.config import settings
+from app.core.database import engine
+from app.models import Document, DocStatus, ParseJob, JobStatus, Project
+from app.services.storage import minio_service
+from app.services.artifact_store import artifact_store
+from app.services.milvus_service import milvus_service
+from app.services.document_parser import document_parser
+from app.workers.celery_app import celery_app
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_JOB_STATUSES = (JobStatus.QUEUED, JobStatus.RUNNING, JobStatus.RETRYING)
+
+
+class ParseJobError(Exception):
+    pass
+
+
+class ParseJobService:
+    def create_job(self, session: Session, document: Document) -> ParseJob:
+        return self.create_jobs(session, [document])[0]
+    
+    def create_jobs(
+        self,
+        session: Session,
+        documents: List[Document],
+        batch_id: Optional[UUID] = None
+    ) -> List[ParseJob]:
+        jobs = [
+            ParseJob(
+                document_id=document.id,
+                project_id=document.project_id,
+                batch_id=batch_id,
+                status=JobStatus.QUEUED,
+                stage="queued"
+            )
+            for document in documents
+        ]
+        session.add_all(jobs)
+        session.commit()
+        for job in jobs:
+            session.refresh(job)
+        return jobs
+    
+    def get_latest_job(self, session: Session, document_id: UUID) -> Optional[ParseJob]:
+        query = (
+            select(ParseJob)
+            .where(ParseJob.document_id == document_id)
+            .order_by(ParseJob.created_at.desc())
+            .limit(1)
+        )
+        return session.exec(query).first()
+    
+    def get_active_job(self, session: Session, document_id: UUID) -> Optional[ParseJob]:
+        job = self.get_latest_job(session, document_id)
+        if job and job.status in ACTIVE_JOB_STATUSES:
+            return job
+        return None
+    
+    def get_batch_summary(self, session: Session, batch_id: UUID) -> Optional[Dict[str, Any]]:
+        jobs = session.exec(select(ParseJob).where(ParseJob.batch_id == batch_id)).all()
+        if not jobs:
+            return None
+        
+        counts = {job_status.value: 0 for job_status in JobStatus}
+        for job in jobs:
+            counts[job.status.value] += 1
+        
+        finished = counts[JobStatus.SUCCEEDED.value] + counts[JobStatus.FAILED.value]
+        return {
+            "batch_id": str(batch_id),
+            "total": len(jobs),
+            "progress": round(sum(job.progress for job in jobs) / len(jobs)),
+            "completed": finished == len(jobs),
+            "counts": counts,
+            "failed_documents": [
+                {"document_id": str(job.document_id), "error": job.error}
+                for job in jobs if job.status == JobStatus.FAILED
+            ]
+        }
+    
+    def enqueue(
+        self,
+        session: Session,
+        job: ParseJob,
+        background_tasks: Optional[BackgroundTasks] = None
+    ):
+        self._send(job, background_tasks)
+        session.add(job)
+        session.commit()
+    
+    def enqueue_many(
+        self,
+        session: Session,
+        jobs: List[ParseJob],
+        background_tasks: Optional[BackgroundTasks] = None
+    ) -> List[ParseJob]:
+        failed = []
+        for job in jobs:
+            try:
+                self._send(job, background_tasks)
+            except Exception as e:
+                logger.error(f"Failed to enqueue parse job {job.id}: {e}")
+                job.status = JobStatus.FAILED
+                job.stage = "failed"
+                job.error = f"Failed to enqueue: {e}"
+                job.finished_at = datetime.utcnow()
+                failed.append(job)
+            session.add(job)
+        session.commit()
+        return failed
+    
+    def _send(self, job: ParseJob, background_tasks: Optional[BackgroundTasks]):
+        if settings.PARSE_QUEUE_BACKEND == "local" and background_tasks is not None:
+            background_tasks.add_task(self.run_local, str(job.id))
+            return
+        
+        result = celery_app.send_task(
+            "documents.parse",
+            args=[str(job.id)],
+            queue=settings.PARSE_QUEUE_NAME
+        )
+        job.task_id = result.id
+        job.updated_at = datetime.utcnow()
+    
+    async def run_local(self, job_id: str):
+        try:
+            await self.run(job_id, final_attempt=True)
+        except Exception as e:
+            logger.error(f"Parse job {job_id} failed: {e}")
+    
+    async def run(self, job_id: str, final_attempt: bool = True):
+        with Session(engine) as session:
+            job = session.get(ParseJob, UUID(job_id))
+            if not job:
+                logger.error(f"Parse job {job_id} not found")
+                return
+            
+            if job.status == JobStatus.SUCCEEDED:
+                logger.info(f"Parse job {job_id} already succeeded, skipping redelivery")
+                return
+            
+            document = session.get(Document, job.document_id)
+            if not document:
+                self._finish(session, job, None, JobStatus.FAILED, error="Document not found")
+                return
+            
+            job.attempts += 1
+            job.status = JobStatus.RUNNING
+            job.started_at = job.started_at or datetime.utcnow()
+            job.error = None
+            document.status = DocStatus.PROCESSING
+            self._update(session, job, "downloading", 0)
+            
+            try:
+                await self._execute(session, job, document)
+            except Exception as e:
+                logger.error(f"Parse job {job_id} attempt {job.attempts} failed: {e}")
+                if final_attempt:
+                    self._finish(session, job, document, JobStatus.FAILED, error=str(e))
+                else:
+                    job.status = JobStatus.RETRYING
+                    job.error = str(e)
+                    self._update(session, job, "waiting_retry", job.progress)
+                raise
+            
+            if job.status == JobStatus.SUCCEEDED:
+                await self._maintain_index(session, document)
+    
+    async def _maintain_index(self, session: Session, document: Document):
+        project = session.get(Project, document.project_id)
+        try:
+            await asyncio.to_thread(
+                milvus_service.ensure_index,
+                str(document.project_id),
+                project.vector_index_profile if project else None
+            )
+        except Exception as e:
+            logger.warning(f"Failed to maintain vector index for project {document.project_id}: {e}")
+    
+    async def _execute(self, session: Session, job: ParseJob, document: Document):
+        project = session.get(Project, document.project_id)
+        milvus_service.set_index_profile(str(document.project_id), project.vector_index_profile if project else None)
+        
+        if document.content_hash and await self._reuse_duplicate(session, job, document):
+            return
+        
+        last_flush = 0.0
+        
+        def report(stage: str, progress: int):
+            nonlocal last_flush
+            job.stage = stage
+            job.progress = max(job.progress, min(progress, 99))
+            now = time.monotonic()
+            if now - last_flush >= settings.PARSE_JOB_PROGRESS_INTERVAL:
+                last_flush = now
+                self._update(session, job, stage, job.progress)
+        
+        bucket_name, object_name = minio_service.split_file_path(document.file_path)
+        
+        with tempfile.TemporaryDirectory(dir=settings.PARSE_TEMP_DIR) as temp_dir:
+            file_path = os.path.join(temp_dir, "source" + os.path.splitext(document.name)[1])
+            downloaded = await asyncio.to_thread(
+                minio_service.download_to_file,
+                document.project_id,
+                object_name,
+                file_path,
+                bucket_name=bucket_name
+            )
+            
+            if not downloaded:
+                self._finish(session, job, document, JobStatus.FAILED, error="File not found in storage")
+                return
+            
+            result = await document_parser.parse_file_and_store(
+                project_id=str(document.project_id),
+                document_id=str(document.id),
+                file_name=document.name,
+                file_path=file_path,
+                doc_type=document.doc_type,
+                progress_callback=report
+            )
+        
+        if not result["success"]:
+            raise ParseJobError(result.get("error") or "Document parsing failed")
+        
+        self._update(session, job, "storing", 99)
+        if result.get("artifact"):
+            await artifact_store.store_document_artifact(session, document, result["artifact"])
+        else:
+            await artifact_store.store_document_content(session, document, result["content"])
+        self._finish(session, job, document, JobStatus.SUCCEEDED)
+        logger.info(f"Document {document.id} parsed successfully, {result['metadata']['chunk_count']} chunks stored to Milvus")
+    
+    async def _reuse_duplicate(self, session: Session, job: ParseJob, document: Document) -> bool:
+        query = (
+            select(Document)
+            .where(Document.content_hash == document.content_hash)
+            .where(Document.id != document.id)
+            .where(Document.status == DocStatus.PARSED)
+            .where(or_(Document.content_path.is_not(None), Document.parsed_content.is_not(None)))
+            .order_by(Document.updated_at.desc())
+            .limit(1)
+        )
+        source = session.exec(query).first()
+        if source is None:
+            return False
+        
+        self._update(session, job, "reusing", 10)
+        try:
+            if not await asyncio.to_thread(milvus_service.delete_document_vectors, str(document.project_id), str(document.id)):
+                return False
+            copied = await asyncio.to_thread(
+                milvus_service.copy_document_vectors,
+                str(source.project_id),
+                str(source.id),
+                str(document.project_id),
+                str(document.id),
+                document.name
+            )
+        except Exception as e:
+            logger.warning(f"Failed to reuse vectors of document {source.id} for {document.id}: {e}")
+            return False
+        
+        if copied == 0:
+            return False
+        
+        content = await artifact_store.load_document_content(source)
+        await artifact_store.store_document_content(session, document, content)
+        self._finish(session, job, document, JobStatus.SUCCEEDED)
+        logger.info(f"Document {document.id} reused parse results of identical document {source.id} ({copied} vectors)")
+        return True
+    
+    def _update(self, session: Session, job: ParseJob, stage: str, progress: int):
+        job.stage = stage
+        job.progress = progress
+        job.updated_at = datetime.utcnow()
+        session.add(job)
+        session.commit()
+    
+    def _finish(
+        self,
+        session: Session,
+        job: ParseJob,
+        document: Optional[Document],
+        status: JobStatus,
+        error: Optional[str] = None
+    ):
+        job.status = status
+        job.error = error
+        job.finished_at = datetime.utcnow()
+        if document is not None:
+            document.status = DocStatus.PARSED if status == JobStatus.SUCCEEDED else DocStatus.FAILED
+            session.add(document)
+        
+        if status == JobStatus.SUCCEEDED:
+            self._update(session, job, "completed", 100)
+        else:
+            self._update(session, job, "failed", job.progress)
+
+
+parse_job_service = ParseJobService()
@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+from app.core.config import settings
+from app.workers.parsers import init_worker, ping
+
+logger = logging.getLogger(__name__)
+
+
+class ParseTimeoutError(Exception):
+    pass
+
+
+class ParserPool:
+    def __init__(self):
+        self.max_workers = settings.PARSER_POOL_WORKERS
+        self.timeout = settings.PARSER_JOB_TIMEOUT
+        self.memory_limit_mb = settings.PARSER_WORKER_MEMORY_MB
+        self.start_method = settings.PARSER_POOL_START_METHOD
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._stats = {
+            "jobs": 0,
+            "timeouts": 0,
+            "crashes": 0,
+            "restarts": 0
+        }
+    
+    @property
+    def enabled(self) -> bool:
+        return self.max_workers > 0 and not multiprocessing.current_process().daemon
+    
+    def start(self):
+        if not self.enabled or self._executor is not None:
+            return
+        
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context(self.start_method),
+            initializer=init_worker,
+            initargs=(self.memory_limit_mb,)
+        )
+        for _ in range(self.max_workers):
+            self._executor.submit(ping)
+        
+        logger.info(f"Parser process pool started with {self.max_workers} workers ({self.start_method})")
+    
+    def shutdown(self, wait: bool = True):
+        executor = self._executor
+        self._executor = None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+            logger.info("Parser process pool stopped")
+    
+    def _restart(self, executor: ProcessPoolExecutor):
+        if self._executor is not executor:
+            return
+        
+        processes = list((getattr(executor, "_processes", None) or {}).values())
+        self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            if process.is_alive():
+                process.kill()
+        
+        self._stats["restarts"] += 1
+        self.start()
+    
+    async def run(self, func: Callable[..., Any], *args: Any, timeout: Optional[float] = None) -> Any:
+        if not self.enabled:
+            return await asyncio.to_thread(func, *args)
+        
+        loop = asyncio.get_running_loop()
+        self._stats["jobs"] += 1
+        
+        for attempt in range(2):
+            if self._executor is None:
+                self.start()
+            executor = self._executor
+            
+            try:
+                return await asyncio.wait_for(
+                    loop.run_in_executor(executor, func, *args),
+                    timeout or self.timeout
+                )
+            except asyncio.TimeoutError:
+                self._stats["timeouts"] += 1
+                logger.error(f"Parser job {func.__name__} exceeded {timeout or self.timeout}s, restarting worker pool")
+                self._restart(executor)
+                raise ParseTimeoutError(f"Parsing timed out after {timeout or self.timeout}s")
+            except BrokenProcessPool:
+                if self._executor is not executor:
+                    continue
+                self._stats["crashes"] += 1
+                logger.error(f"Parser worker crashed while running {func.__name__}, restarting worker pool")
+                self._restart(executor)
+                raise
+        
+        raise BrokenProcessPool(f"Parser pool restarted while running {func.__name__}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "workers": self.max_workers,
+            "timeout": self.timeout,
+            "memory_limit_mb": self.memory_limit_mb,
+            **self._stats
+        }
+
+
+parser_pool = ParserPool()
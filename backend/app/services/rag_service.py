@@ -6,6 +6,7 @@ from app.core.config import settings
 from app.models import Document
 from app.services.milvus_service import milvus_service
 from app.services.llm_service import llm_service
+from app.services.artifact_store import artifact_store
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +29,25 @@ class RAGService:
             document_ids=document_ids
         )
         
+        return self.format_context(similar_docs)
+    
+    async def retrieve_batch(
+        self,
+        project_id: str,
+        queries: List[str],
+        top_k: int = 5,
+        document_ids: Optional[List[str]] = None
+    ) -> List[str]:
+        results = await milvus_service.search_similar_batch(
+            project_id=project_id,
+            queries=queries,
+            top_k=top_k,
+            document_ids=document_ids
+        )
+        return [self.format_context(similar_docs) for similar_docs in results]
+    
+    @staticmethod
+    def format_context(similar_docs: List[Dict[str, Any]]) -> str:
         if not similar_docs:
             return ""
         
@@ -60,17 +80,41 @@ class RAGService:
         function_point: Dict[str, Any],
         document_ids: Optional[List[str]] = None
     ) -> str:
-        query = f"{function_point.get('name', '')} {function_point.get('description', '')} {function_point.get('acceptance_criteria', '')}"
-        
         context = await self.retrieve_relevant_context(
             project_id=project_id,
-            query=query,
+            query=self.test_case_query(function_point),
             top_k=5,
             document_ids=document_ids
         )
         
         return context
     
+    async def retrieve_for_test_cases(
+        self,
+        function_points: List[Dict[str, Any]],
+        document_ids: Optional[List[str]] = None
+    ) -> List[str]:
+        by_project: Dict[str, List[int]] = {}
+        for i, function_point in enumerate(function_points):
+            by_project.setdefault(str(function_point["project_id"]), []).append(i)
+        
+        contexts = [""] * len(function_points)
+        for project_id, indexes in by_project.items():
+            project_contexts = await self.retrieve_batch(
+                project_id=project_id,
+                queries=[self.test_case_query(function_points[i]) for i in indexes],
+                top_k=5,
+                document_ids=document_ids
+            )
+            for i, context in zip(indexes, project_contexts):
+                contexts[i] = context
+        
+        return contexts
+    
+    @staticmethod
+    def test_case_query(function_point: Dict[str, Any]) -> str:
+        return f"{function_point.get('name', '')} {function_point.get('description', '')} {function_point.get('acceptance_criteria', '')}"
+    
     async def get_document_content(
         self,
         session: Session,
@@ -89,8 +133,9 @@ class RAGService:
         
         all_content = []
         for doc in documents:
-            if doc.parsed_content:
-                all_content.append(f"=== 文档: {doc.name} ===\n{doc.parsed_content}")
+            content = await artifact_store.load_document_content(doc)
+            if content:
+                all_content.append(f"=== 文档: {doc.name} ===\n{content}")
         
         return "\n\n".join(all_content)
     
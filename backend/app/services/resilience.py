@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+import httpx
+
+from app.services.llm_scheduler import retry_after_seconds
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class RetryPolicy:
+    def __init__(
+        self,
+        max_attempts: int,
+        backoff_base: float,
+        backoff_max: float,
+        retryable_status_codes: Iterable[int],
+        attempt_timeout: float,
+        total_deadline: float
+    ):
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retryable_status_codes = set(retryable_status_codes)
+        self.attempt_timeout = attempt_timeout
+        self.total_deadline = total_deadline
+    
+    def is_retryable(self, e: Exception) -> bool:
+        if isinstance(e, CircuitOpenError):
+            return False
+        if isinstance(e, httpx.HTTPStatusError):
+            return e.response.status_code in self.retryable_status_codes
+        return isinstance(e, (httpx.TimeoutException, httpx.TransportError, asyncio.TimeoutError))
+    
+    def is_provider_failure(self, e: Exception) -> bool:
+        if isinstance(e, httpx.HTTPStatusError):
+            return e.response.status_code >= 500
+        return isinstance(e, (httpx.TimeoutException, httpx.TransportError, asyncio.TimeoutError))
+    
+    def backoff(self, attempt: int) -> float:
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+    
+    def next_delay(self, e: Exception, attempt: int, deadline: float) -> Optional[float]:
+        if attempt >= self.max_attempts or not self.is_retryable(e):
+            return None
+        
+        delay = self.backoff(attempt)
+        if isinstance(e, httpx.HTTPStatusError):
+            delay = max(delay, retry_after_seconds(e.response) or 0.0)
+        
+        if time.monotonic() + delay >= deadline:
+            return None
+        return delay
+    
+    def attempt_timeout_for(self, deadline: float) -> float:
+        return max(0.1, min(self.attempt_timeout, deadline - time.monotonic()))
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float, probe_timeout: float):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.probe_timeout = probe_timeout
+        self.state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe: Optional[int] = None
+        self._probe_started_at = 0.0
+        self._probe_count = 0
+        self._stats = {
+            "opened": 0,
+            "rejected": 0
+        }
+    
+    def before_call(self) -> Optional[int]:
+        now = time.monotonic()
+        if self.state == self.OPEN:
+            if now - self._opened_at < self.reset_timeout:
+                self._stats["rejected"] += 1
+                raise CircuitOpenError(f"Circuit '{self.name}' is open, provider considered unavailable")
+            self.state = self.HALF_OPEN
+            self._probe = None
+        
+        if self.state != self.HALF_OPEN:
+            return None
+        
+        if self._probe is not None and now - self._probe_started_at < self.probe_timeout:
+            self._stats["rejected"] += 1
+            raise CircuitOpenError(f"Circuit '{self.name}' is half-open, waiting for probe request")
+        
+        self._probe_count += 1
+        self._probe = self._probe_count
+        self._probe_started_at = now
+        return self._probe
+    
+    def release_probe(self, probe: Optional[int]):
+        if probe is not None and self._probe == probe:
+            self._probe = None
+    
+    def record_success(self):
+        self._consecutive_failures = 0
+        self._probe = None
+        if self.state != self.CLOSED:
+            logger.info(f"Circuit '{self.name}' closed")
+        self.state = self.CLOSED
+    
+    def record_failure(self):
+        self._consecutive_failures += 1
+        self._probe = None
+        if self.state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self._stats["opened"] += 1
+                logger.warning(f"Circuit '{self.name}' opened after {self._consecutive_failures} consecutive failures")
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+    
+    def record(self, e: Exception, policy: RetryPolicy):
+        if policy.is_provider_failure(e):
+            self.record_failure()
+        else:
+            self.record_success()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._consecutive_failures,
+            **self._stats
+        }
+
+
+async def call_with_retry(
+    operation: Callable[[float], Awaitable[Any]],
+    policy: RetryPolicy,
+    breaker: CircuitBreaker,
+    before_attempt: Optional[Callable[[], Awaitable[None]]] = None
+) -> Any:
+    deadline = time.monotonic() + policy.total_deadline
+    attempt = 0
+    
+    while True:
+        attempt += 1
+        if before_attempt is not None:
+            await before_attempt()
+        
+        probe = breaker.before_call()
+        timeout = policy.attempt_timeout_for(deadline)
+        try:
+            result = await asyncio.wait_for(operation(timeout), timeout)
+        except Exception as e:
+            breaker.record(e, policy)
+            delay = policy.next_delay(e, attempt, deadline)
+            if delay is None:
+                raise
+            logger.warning(f"{breaker.name} attempt {attempt}/{policy.max_attempts} failed ({e!r}), retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+            continue
+        finally:
+            breaker.release_probe(probe)
+        
+        breaker.record_success()
+        return result
@@ -1,6 +1,7 @@
-import io
+import asyncio
+import hashlib
 import logging
-from typing import Optional, BinaryIO
+from typing import Optional, BinaryIO, Iterator, Tuple
 from minio import Minio
 from minio.error import S3Error
 from datetime import timedelta
@@ -10,6 +11,35 @@ from app.core.config import settings
 logger = logging.getLogger(__name__)
 
 
+class FileTooLargeError(Exception):
+    pass
+
+
+class HashingReader:
+    def __init__(self, stream: BinaryIO, max_size: Optional[int] = None, chunk_size: int = 1048576):
+        self.stream = stream
+        self.max_size = max_size
+        self.chunk_size = chunk_size
+        self.size = 0
+        self._hasher = hashlib.sha256()
+    
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0 or size > self.chunk_size:
+            size = self.chunk_size
+        
+        data = self.stream.read(size)
+        self.size += len(data)
+        if self.max_size is not None and self.size > self.max_size:
+            raise FileTooLargeError(f"File exceeds maximum size of {self.max_size} bytes")
+        
+        self._hasher.update(data)
+        return data
+    
+    @property
+    def sha256(self) -> str:
+        return self._hasher.hexdigest()
+
+
 class MinIOService:
     def __init__(self):
         self.client = Minio(
@@ -24,6 +54,11 @@ class MinIOService:
         safe_id = str(project_id).replace("-", "").lower()[:20]
         return f"{self.bucket_prefix}{safe_id}"
     
+    @staticmethod
+    def split_file_path(file_path: str) -> Tuple[str, str]:
+        bucket_name, _, object_name = file_path.partition("/")
+        return bucket_name, object_name
+    
     def ensure_bucket_exists(self, project_id: str) -> str:
         bucket_name = self._get_bucket_name(project_id)
         try:
@@ -35,46 +70,47 @@ class MinIOService:
             raise
         return bucket_name
     
-    async def upload_file(
+    async def upload_stream(
         self,
         project_id: str,
         file_name: str,
-        file_data: BinaryIO,
+        stream: BinaryIO,
         content_type: str = "application/octet-stream",
-        file_size: int = None
+        max_size: Optional[int] = None
     ) -> dict:
-        bucket_name = self.ensure_bucket_exists(project_id)
-        
-        if file_size is None:
-            file_data.seek(0, 2)
-            file_size = file_data.tell()
-            file_data.seek(0)
+        bucket_name = await asyncio.to_thread(self.ensure_bucket_exists, project_id)
+        reader = HashingReader(stream, max_size=max_size, chunk_size=settings.UPLOAD_CHUNK_SIZE)
         
         try:
-            self.client.put_object(
+            result = await asyncio.to_thread(
+                self.client.put_object,
                 bucket_name,
                 file_name,
-                file_data,
-                file_size,
-                content_type=content_type
+                reader,
+                -1,
+                content_type=content_type,
+                part_size=settings.MINIO_PART_SIZE,
+                num_parallel_uploads=1
             )
-            
-            object_url = self.get_file_url(project_id, file_name)
-            
-            logger.info(f"Uploaded file {file_name} to bucket {bucket_name}")
-            
-            return {
-                "bucket_name": bucket_name,
-                "object_name": file_name,
-                "size": file_size,
-                "url": object_url
-            }
+        except FileTooLargeError:
+            logger.warning(f"Rejected upload {file_name}: exceeds {max_size} bytes")
+            raise
         except S3Error as e:
             logger.error(f"Error uploading file {file_name}: {e}")
             raise
+        
+        logger.info(f"Streamed file {file_name} ({reader.size} bytes) to bucket {bucket_name}")
+        
+        return {
+            "bucket_name": bucket_name,
+            "object_name": file_name,
+            "size": reader.size,
+            "sha256": reader.sha256,
+            "etag": result.etag
+        }
     
-    def get_file_url(self, project_id: str, file_name: str, expires: int = 3600) -> str:
-        bucket_name = self._get_bucket_name(project_id)
+    def get_file_url(self, project_id: str, file_name: str, expires: int = 3600, bucket_name: Optional[str] = None) -> str:
+        bucket_name = bucket_name or self._get_bucket_name(project_id)
         try:
             url = self.client.presigned_get_object(
                 bucket_name,
@@ -86,20 +122,44 @@ class MinIOService:
             logger.error(f"Error getting file URL: {e}")
             return ""
     
-    def download_file(self, project_id: str, file_name: str) -> Optional[bytes]:
-        bucket_name = self._get_bucket_name(project_id)
+    def download_to_file(self, project_id: str, file_name: str, file_path: str, bucket_name: Optional[str] = None) -> bool:
+        bucket_name = bucket_name or self._get_bucket_name(project_id)
         try:
-            response = self.client.get_object(bucket_name, file_name)
-            data = response.read()
-            response.close()
-            response.release_conn()
-            return data
+            self.client.fget_object(bucket_name, file_name, file_path)
+            return True
         except S3Error as e:
             logger.error(f"Error downloading file {file_name}: {e}")
+            return False
+    
+    def stat_file(self, project_id: str, file_name: str, bucket_name: Optional[str] = None) -> Optional[dict]:
+        bucket_name = bucket_name or self._get_bucket_name(project_id)
+        try:
+            stat = self.client.stat_object(bucket_name, file_name)
+            return {
+                "size": stat.size,
+                "etag": stat.etag,
+                "last_modified": stat.last_modified,
+                "content_type": stat.content_type
+            }
+        except S3Error as e:
+            logger.error(f"Error getting file info {file_name}: {e}")
             return None
     
-    def delete_file(self, project_id: str, file_name: str) -> bool:
-        bucket_name = self._get_bucket_name(project_id)
+    def open_file(self, project_id: str, file_name: str, offset: int = 0, length: int = 0, bucket_name: Optional[str] = None):
+        bucket_name = bucket_name or self._get_bucket_name(project_id)
+        return self.client.get_object(bucket_name, file_name, offset=offset, length=length)
+    
+    @staticmethod
+    def iter_response(response, chunk_size: int = 65536) -> Iterator[bytes]:
+        try:
+            for chunk in response.stream(chunk_size):
+                yield chunk
+        finally:
+            response.close()
+            response.release_conn()
+    
+    def delete_file(self, project_id: str, file_name: str, bucket_name: Optional[str] = None) -> bool:
+        bucket_name = bucket_name or self._get_bucket_name(project_id)
         try:
             self.client.remove_object(bucket_name, file_name)
             logger.info(f"Deleted file {file_name} from bucket {bucket_name}")
@@ -0,0 +1,13 @@
+import re
+
+CJK_RE = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff\u3000-\u303f\uff00-\uffef]")
+
+
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+    
+    cjk_count = len(CJK_RE.findall(text))
+    other_count = len(text) - cjk_count
+    
+    return cjk_count + (other_count + 3) // 4
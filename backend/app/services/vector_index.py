@@ -0,0 +1,110 @@
+import math
+from typing import Dict, Any, Optional
+
+from app.core.config import settings
+
+AUTO = "AUTO"
+FLAT = "FLAT"
+HNSW = "HNSW"
+IVF_FLAT = "IVF_FLAT"
+IVF_SQ8 = "IVF_SQ8"
+IVF_PQ = "IVF_PQ"
+DISKANN = "DISKANN"
+
+INDEX_PROFILES = (FLAT, HNSW, IVF_FLAT, IVF_SQ8, IVF_PQ, DISKANN)
+IVF_INDEXES = (IVF_FLAT, IVF_SQ8, IVF_PQ)
+PQ_SEGMENTS = (64, 48, 32, 24, 16, 12, 8, 4, 2, 1)
+
+RECALL_TIERS = [
+    (0.99, 0.10, 64, 256),
+    (0.95, 0.04, 16, 128),
+    (0.90, 0.02, 8, 64),
+    (0.0, 0.01, 4, 32)
+]
+
+METRIC_TYPE = "COSINE"
+
+
+class IndexProfileError(Exception):
+    pass
+
+
+class IndexPlanner:
+    def __init__(self):
+        self.default_profile = settings.MILVUS_INDEX_PROFILE
+        self.flat_max_rows = settings.MILVUS_FLAT_MAX_ROWS
+        self.hnsw_max_rows = settings.MILVUS_HNSW_MAX_ROWS
+        self.large_profile = settings.MILVUS_LARGE_INDEX_PROFILE
+        self.target_recall = settings.MILVUS_TARGET_RECALL
+        self.hnsw_m = settings.MILVUS_HNSW_M
+        self.hnsw_ef_construction = settings.MILVUS_HNSW_EF_CONSTRUCTION
+    
+    def normalize(self, profile: Optional[str]) -> str:
+        profile = (profile or self.default_profile or AUTO).strip().upper()
+        if profile != AUTO and profile not in INDEX_PROFILES:
+            raise IndexProfileError(
+                f"Unknown index profile '{profile}', expected one of: {', '.join((AUTO,) + INDEX_PROFILES)}"
+            )
+        return profile
+    
+    def resolve(self, profile: Optional[str], row_count: int) -> str:
+        profile = self.normalize(profile)
+        if profile != AUTO:
+            return profile
+        
+        if row_count < self.flat_max_rows:
+            return FLAT
+        if row_count < self.hnsw_max_rows:
+            return HNSW
+        return self.normalize(self.large_profile)
+    
+    def build_params(self, index_type: str, row_count: int, dim: int) -> Dict[str, Any]:
+        if index_type == HNSW:
+            params = {"M": self.hnsw_m, "efConstruction": self.hnsw_ef_construction}
+        elif index_type in IVF_INDEXES:
+            params = {"nlist": self._nlist(row_count)}
+            if index_type == IVF_PQ:
+                params["m"] = next(m for m in PQ_SEGMENTS if dim % m == 0)
+                params["nbits"] = 8
+        else:
+            params = {}
+        
+        return {
+            "metric_type": METRIC_TYPE,
+            "index_type": index_type,
+            "params": params
+        }
+    
+    def search_params(
+        self,
+        index_params: Optional[Dict[str, Any]],
+        top_k: int,
+        target_recall: Optional[float] = None
+    ) -> Dict[str, Any]:
+        recall = self.target_recall if target_recall is None else target_recall
+        _, nprobe_fraction, min_nprobe, ef = next(tier for tier in RECALL_TIERS if recall >= tier[0])
+        
+        index_type = (index_params or {}).get("index_type", IVF_FLAT)
+        build = (index_params or {}).get("params") or {}
+        
+        if index_type in IVF_INDEXES:
+            nlist = int(build.get("nlist", 128))
+            params = {"nprobe": min(nlist, max(min_nprobe, math.ceil(nlist * nprobe_fraction)))}
+        elif index_type == HNSW:
+            params = {"ef": min(32768, max(top_k, ef))}
+        elif index_type == DISKANN:
+            params = {"search_list": min(65535, max(top_k, ef))}
+        else:
+            params = {}
+        
+        return {
+            "metric_type": METRIC_TYPE,
+            "params": params
+        }
+    
+    @staticmethod
+    def _nlist(row_count: int) -> int:
+        return max(128, min(65536, int(4 * math.sqrt(max(row_count, 1)))))
+
+
+index_planner = IndexPlanner()
@@ -0,0 +1,24 @@
+from celery import Celery
+
+from app.core.config import settings
+
+celery_app = Celery(
+    "e2e_testgen",
+    broker=settings.CELERY_BROKER_URL,
+    backend=settings.CELERY_RESULT_BACKEND,
+    include=["app.workers.tasks"]
+)
+
+celery_app.conf.update(
+    task_serializer="json",
+    result_serializer="json",
+    accept_content=["json"],
+    task_default_queue=settings.PARSE_QUEUE_NAME,
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    task_track_started=True,
+    worker_prefetch_multiplier=1,
+    result_expires=86400,
+    broker_connection_retry_on_startup=True,
+    timezone="UTC"
+)
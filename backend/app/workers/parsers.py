@@ -0,0 +1,146 @@
+import io
+from typing import List, Any, Union
+
+
+def init_worker(memory_limit_mb: int = 0):
+    if memory_limit_mb > 0:
+        try:
+            import resource
+            limit = memory_limit_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ImportError, ValueError, OSError):
+            pass
+    
+    for module in ("pypdf", "docx", "openpyxl", "pptx"):
+        try:
+            __import__(module)
+        except ImportError:
+            pass
+
+
+def ping() -> bool:
+    return True
+
+
+def pdf_page_count(file_path: str) -> int:
+    from pypdf import PdfReader
+    
+    return len(PdfReader(file_path).pages)
+
+
+def parse_pdf_pages(file_path: str, start: int, end: int) -> List[str]:
+    from pypdf import PdfReader
+    
+    reader = PdfReader(file_path)
+    texts = []
+    
+    for i in range(start, min(end, len(reader.pages))):
+        try:
+            texts.append(reader.pages[i].extract_text() or "")
+        except Exception:
+            texts.append("")
+    
+    return texts
+
+
+def parse_docx(file_data: bytes) -> str:
+    from docx import Document
+    
+    doc = Document(io.BytesIO(file_data))
+    text_parts = []
+    
+    for para in doc.paragraphs:
+        if para.text.strip():
+            text_parts.append(para.text)
+    
+    for table in doc.tables:
+        table_text = []
+        for row in table.rows:
+            row_text = [cell.text for cell in row.cells]
+            table_text.append(" | ".join(row_text))
+        text_parts.append("\n".join(table_text))
+    
+    return "\n\n".join(text_parts)
+
+
+def parse_excel(
+    source: Union[bytes, str],
+    max_rows_per_sheet: int = 0,
+    rows_per_block: int = 20,
+    max_cell_chars: int = 0
+) -> str:
+    from openpyxl import load_workbook
+    
+    wb = load_workbook(
+        io.BytesIO(source) if isinstance(source, bytes) else source,
+        read_only=True,
+        data_only=True
+    )
+    text_parts = []
+    
+    try:
+        for sheet in wb.worksheets:
+            text_parts.append(f"## Sheet: {sheet.title}\n")
+            
+            header = None
+            block = []
+            row_count = 0
+            truncated = False
+            
+            for row in sheet.iter_rows(values_only=True):
+                row_text = [_format_cell(cell, max_cell_chars) for cell in row]
+                while row_text and not row_text[-1]:
+                    row_text.pop()
+                if not row_text:
+                    continue
+                
+                line = " | ".join(row_text)
+                if header is None:
+                    header = line
+                    continue
+                
+                if max_rows_per_sheet and row_count >= max_rows_per_sheet:
+                    truncated = True
+                    break
+                
+                block.append(line)
+                row_count += 1
+                
+                if len(block) >= rows_per_block:
+                    text_parts.append("\n".join([header] + block))
+                    block = []
+            
+            if block or (header is not None and row_count == 0):
+                text_parts.append("\n".join([header] + block))
+            if truncated:
+                text_parts.append(f"... truncated after {max_rows_per_sheet} rows")
+    finally:
+        wb.close()
+    
+    return "\n\n".join(text_parts)
+
+
+def _format_cell(cell: Any, max_chars: int) -> str:
+    if cell is None:
+        return ""
+    
+    text = str(cell).replace("\n", " ").strip()
+    if max_chars and len(text) > max_chars:
+        return text[:max_chars] + "..."
+    return text
+
+
+def parse_pptx(file_data: bytes) -> str:
+    from pptx import Presentation
+    
+    prs = Presentation(io.BytesIO(file_data))
+    text_parts = []
+    
+    for i, slide in enumerate(prs.slides):
+        text_parts.append(f"## Slide {i+1}\n")
+        
+        for shape in slide.shapes:
+            if hasattr(shape, "text") and shape.text.strip():
+                text_parts.append(shape.text)
+    
+    return "\n\n".join(text_parts)
@@ -0,0 +1,54 @@
+import asyncio
+import logging
+from typing import Optional
+
+from celery.signals import worker_process_shutdown
+
+from app.core.config import settings
+from app.core.redis import close_redis
+from app.services.llm_service import llm_service
+from app.services.milvus_service import milvus_service
+from app.services.parse_jobs import parse_job_service
+from app.workers.celery_app import celery_app
+
+logger = logging.getLogger(__name__)
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def run_async(coro):
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_loop)
+    return _loop.run_until_complete(coro)
+
+
+@worker_process_shutdown.connect
+def close_worker_clients(**kwargs):
+    if _loop is not None and not _loop.is_closed():
+        try:
+            _loop.run_until_complete(milvus_service.flush())
+        except Exception as e:
+            logger.error(f"Failed to flush buffered vectors: {e}")
+        _loop.run_until_complete(llm_service.close())
+        _loop.run_until_complete(close_redis())
+        _loop.close()
+
+
+@celery_app.task(
+    bind=True,
+    name="documents.parse",
+    max_retries=settings.PARSE_JOB_MAX_RETRIES
+)
+def parse_document(self, job_id: str):
+    final_attempt = self.request.retries >= self.max_retries
+    
+    try:
+        run_async(parse_job_service.run(job_id, final_attempt=final_attempt))
+    except Exception as e:
+        if final_attempt:
+            raise
+        countdown = settings.PARSE_JOB_RETRY_DELAY * (2 ** self.request.retries)
+        logger.warning(f"Parse job {job_id} attempt {self.request.retries + 1} failed ({e}), retrying in {countdown}s")
+        raise self.retry(exc=e, countdown=countdown)
@@ -0,0 +1,113 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from app.core.config import settings
+from app.services.chunker import TextChunker
+from app.services.tokens import estimate_tokens
+
+EN_WORDS = "the user shall be able to login with a valid password and view the order dashboard after verification".split()
+CN_SENTENCES = [
+    "用户可以通过手机号和验证码登录系统。",
+    "管理员可以在后台创建、编辑和停用账号。",
+    "订单列表支持按状态、时间和金额筛选。",
+    "支付失败时系统应提示用户并保留购物车内容。",
+]
+
+
+def legacy_split(content: str, chunk_size: int = 500, overlap: int = 50):
+    if not content:
+        return []
+    
+    chunks = []
+    paragraphs = content.split('\n\n')
+    current_chunk = ""
+    
+    for para in paragraphs:
+        para = para.strip()
+        if not para:
+            continue
+        
+        if len(current_chunk) + len(para) > chunk_size:
+            if current_chunk:
+                chunks.append({"content": current_chunk.strip()})
+            current_chunk = para
+        else:
+            if current_chunk:
+                current_chunk += "\n\n" + para
+            else:
+                current_chunk = para
+    
+    if current_chunk:
+        chunks.append({"content": current_chunk.strip()})
+    
+    return chunks
+
+
+def make_document(target_chars: int, seed: int = 42) -> str:
+    rng = random.Random(seed)
+    parts = []
+    size = 0
+    section = 0
+    
+    while size < target_chars:
+        roll = rng.random()
+        if roll < 0.03:
+            section += 1
+            block = f"## Section {section}"
+        elif roll < 0.10:
+            rows = [" | ".join(rng.choices(EN_WORDS, k=4)) for _ in range(rng.randint(3, 40))]
+            block = "\n".join(rows)
+        elif roll < 0.15:
+            block = "".join(rng.choice(CN_SENTENCES) for _ in range(rng.randint(40, 120)))
+        elif roll < 0.55:
+            block = "".join(rng.choice(CN_SENTENCES) for _ in range(rng.randint(1, 8)))
+        else:
+            sentences = [" ".join(rng.choices(EN_WORDS, k=rng.randint(6, 20))).capitalize() + "." for _ in range(rng.randint(1, 8))]
+            block = " ".join(sentences)
+        parts.append(block)
+        size += len(block) + 2
+    
+    return "\n\n".join(parts)
+
+
+def measure(name: str, split, content: str, max_tokens: int):
+    started = time.perf_counter()
+    chunks = split(content)
+    elapsed = time.perf_counter() - started
+    
+    token_counts = [estimate_tokens(chunk["content"]) for chunk in chunks] or [0]
+    oversized = sum(1 for tokens in token_counts if tokens > max_tokens * 1.05)
+    
+    print(
+        f"  {name:<8} {elapsed * 1000:>9.1f} ms  {len(chunks):>7} chunks  "
+        f"avg {sum(token_counts) / len(token_counts):>6.1f} tok  max {max(token_counts):>6} tok  "
+        f"oversized {oversized}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the token-aware chunker with the legacy character splitter")
+    parser.add_argument("--sizes", default="100000,1000000,4000000", help="comma separated document sizes in characters")
+    parser.add_argument("--max-tokens", type=int, default=settings.CHUNK_MAX_TOKENS)
+    parser.add_argument("--overlap", type=int, default=settings.CHUNK_OVERLAP_TOKENS)
+    args = parser.parse_args()
+    
+    chunker = TextChunker(args.max_tokens, args.overlap)
+    
+    for size in [int(value) for value in args.sizes.split(",")]:
+        content = make_document(size)
+        print(f"Document of {len(content):,} chars, {estimate_tokens(content):,} estimated tokens")
+        measure("legacy", legacy_split, content, args.max_tokens)
+        measure("chunker", chunker.split, content, args.max_tokens)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from sqlmodel import Session, select
+
+from app.core.database import engine
+from app.models import Project
+from app.services.milvus_service import MilvusService, LAYOUT_COLLECTION, LAYOUT_PARTITION_KEY, VECTOR_FIELDS
+
+
+def migrate_project(source: MilvusService, target: MilvusService, project_id: str, batch_size: int) -> int:
+    collection = source.get_collection(project_id, load=True)
+    if collection is None:
+        return 0
+    
+    embedding_field = next(field for field in collection.schema.fields if field.name == "embedding")
+    shared = target.get_collection(project_id, load=True)
+    if shared is None:
+        shared = target.create_collection(project_id, embedding_field.params["dim"])
+    else:
+        shared.delete(target.scope_expr(project_id))
+    
+    copied = 0
+    iterator = collection.query_iterator(batch_size=batch_size, expr="", output_fields=VECTOR_FIELDS)
+    try:
+        while True:
+            rows = iterator.next()
+            if not rows:
+                break
+            for row in rows:
+                row["project_id"] = project_id
+            shared.insert(rows)
+            copied += len(rows)
+    finally:
+        iterator.close()
+    
+    return copied
+
+
+def migrate(batch_size: int, drop_source: bool):
+    source = MilvusService(layout=LAYOUT_COLLECTION)
+    target = MilvusService(layout=LAYOUT_PARTITION_KEY)
+    
+    with Session(engine) as session:
+        project_ids = [str(project_id) for project_id in session.exec(select(Project.id)).all()]
+    
+    print(f"Migrating vectors of {len(project_ids)} projects into {target.get_collection_name('')}")
+    
+    migrated = 0
+    for project_id in project_ids:
+        collection_name = source.get_collection_name(project_id)
+        try:
+            copied = migrate_project(source, target, project_id, batch_size)
+        except Exception as e:
+            print(f"Failed to migrate {collection_name}: {e}")
+            continue
+        
+        if copied == 0:
+            continue
+        
+        expected = source.count_rows(source.get_collection(project_id))
+        print(f"{collection_name}: copied {copied}/{expected} vectors")
+        migrated += 1
+        
+        if drop_source and copied == expected:
+            source.delete_collection(project_id)
+            print(f"Dropped {collection_name}")
+    
+    shared = target.get_collection("")
+    if shared is not None:
+        shared.flush()
+    print(f"Migrated {migrated} project collections, set MILVUS_LAYOUT={LAYOUT_PARTITION_KEY} to use the shared collection")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Copy per-project Milvus collections into the shared partition-key collection")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--drop-source", action="store_true", help="drop each per-project collection once all its vectors are copied")
+    args = parser.parse_args()
+    
+    migrate(args.batch_size, args.drop_source)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from sqlmodel import SQLModel, Session, select
+
+from app.core.database import engine, add_missing_columns
+from app.models import Document
+from app.services.artifact_store import artifact_store
+
+
+def migrate(batch_size: int) -> int:
+    with engine.begin() as conn:
+        SQLModel.metadata.create_all(conn)
+        add_missing_columns(conn)
+    
+    migrated = 0
+    failed = set()
+    
+    with Session(engine) as session:
+        while True:
+            query = select(Document).where(Document.parsed_content.is_not(None))
+            if failed:
+                query = query.where(Document.id.not_in(failed))
+            documents = session.exec(query.limit(batch_size)).all()
+            if not documents:
+                break
+            
+            for document in documents:
+                try:
+                    artifact = artifact_store.save_text(str(document.project_id), document.parsed_content)
+                except Exception as e:
+                    print(f"Failed to migrate document {document.id}: {e}")
+                    failed.add(document.id)
+                    continue
+                
+                document.content_path = artifact["path"]
+                document.content_length = artifact["length"]
+                document.content_sha256 = artifact["sha256"]
+                document.parsed_content = None
+                session.add(document)
+                migrated += 1
+            
+            session.commit()
+            session.expunge_all()
+            print(f"Migrated {migrated} documents")
+    
+    if failed:
+        print(f"{len(failed)} documents could not be migrated and keep their inline content")
+    return migrated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move inline Document.parsed_content into compressed MinIO artifacts")
+    parser.add_argument("--batch-size", type=int, default=50)
+    args = parser.parse_args()
+    
+    migrate(args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+from app.services.chunker import TextChunker
+from app.services.tokens import estimate_tokens
+
+PAGES = [
+    "# 登录模块\n\n用户输入用户名和密码后点击登录。系统校验凭证并跳转到首页。\n\n"
+    "If the password is wrong three times the account is locked. The user sees an error message.",
+    "| 字段 | 类型 | 必填 |\n| 用户名 | string | 是 |\n| 密码 | string | 是 |",
+    "## 注册模块\n\n" + "注册时需要填写手机号并完成短信验证。" * 20,
+    "Plain trailing paragraph without a heading. " * 30
+]
+
+
+def make_chunker():
+    return TextChunker(max_tokens=64, overlap_tokens=16)
+
+
+def test_stream_matches_batch_split():
+    chunker = make_chunker()
+    expected = chunker.split("\n\n".join(PAGES))
+    
+    stream = chunker.stream()
+    streamed = []
+    for page in PAGES:
+        streamed.extend(stream.feed(page))
+    streamed.extend(stream.finish())
+    
+    assert streamed == expected
+
+
+def test_stream_emits_chunks_before_finish():
+    stream = make_chunker().stream()
+    
+    emitted = stream.feed("\n\n".join(PAGES))
+    
+    assert emitted
+    assert stream.finish()
+
+
+def test_chunks_respect_token_budget():
+    chunker = make_chunker()
+    
+    for chunk in chunker.split("\n\n".join(PAGES)):
+        assert chunk["token_count"] <= chunker.max_tokens
+        assert estimate_tokens(chunk["content"]) <= chunker.max_tokens + 1
+
+
+def test_chunk_numbers_are_sequential():
+    chunks = make_chunker().split("\n\n".join(PAGES))
+    
+    assert [chunk["chunk_num"] for chunk in chunks] == list(range(len(chunks)))
+
+
+def test_headings_are_attached_to_following_chunks():
+    chunks = make_chunker().split("\n\n".join(PAGES))
+    
+    assert chunks[0]["heading"] == "登录模块"
+    assert any(chunk["heading"] == "注册模块" for chunk in chunks)
+
+
+def test_small_table_stays_in_one_chunk():
+    table = PAGES[1]
+    
+    chunks = TextChunker(max_tokens=512, overlap_tokens=0).split(table)
+    
+    assert len(chunks) == 1
+    assert chunks[0]["content"] == table
+
+
+def test_consecutive_chunks_overlap():
+    text = " ".join(f"Sentence number {i} describes a step." for i in range(40))
+    
+    chunks = make_chunker().split(text)
+    
+    assert len(chunks) > 1
+    for previous, current in zip(chunks, chunks[1:]):
+        tail = previous["content"].split(". ")[-1]
+        assert tail.rstrip(".") in current["content"]
+
+
+def test_empty_content_yields_no_chunks():
+    chunker = make_chunker()
+    
+    assert chunker.split("") == []
+    stream = chunker.stream()
+    assert stream.feed("\n\n  \n\n") == []
+    assert stream.finish() == []
@@ -0,0 +1,53 @@
+import pytest
+
+from app.api.endpoints.documents import parse_range_header, etag_matches, UNSATISFIABLE_RANGE
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=900-5000", (900, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    (" bytes = 10-19", (10, 19)),
+    ("BYTES=0-0", (0, 0))
+])
+def test_satisfiable_ranges(header, expected):
+    assert parse_range_header(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", [
+    "bytes=1000-",
+    "bytes=500-100",
+    "bytes=-0"
+])
+def test_unsatisfiable_ranges(header):
+    assert parse_range_header(header, 1000) == UNSATISFIABLE_RANGE
+
+
+def test_suffix_range_on_empty_file_is_unsatisfiable():
+    assert parse_range_header("bytes=-10", 0) == UNSATISFIABLE_RANGE
+    assert parse_range_header("bytes=0-", 0) == UNSATISFIABLE_RANGE
+
+
+@pytest.mark.parametrize("header", [
+    "items=0-10",
+    "bytes=0-10,20-30",
+    "bytes=a-b",
+    "bytes=-x"
+])
+def test_unsupported_ranges_are_ignored(header):
+    assert parse_range_header(header, 1000) is None
+
+
+@pytest.mark.parametrize("header, expected", [
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"xyz", "abc"', True),
+    ("*", True),
+    ('"xyz"', False),
+    ("", False),
+    (None, False)
+])
+def test_etag_matches(header, expected):
+    assert etag_matches(header, '"abc"') is expected
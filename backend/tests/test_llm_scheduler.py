@@ -0,0 +1,143 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import httpx
+import pytest
+
+from app.services.llm_scheduler import LLMScheduler, TokenBucket, retry_after_seconds
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    return clock
+
+
+def make_scheduler(rpm=None, tpm=None):
+    scheduler = LLMScheduler()
+    scheduler.rpm_bucket = TokenBucket(rpm) if rpm else None
+    scheduler.tpm_bucket = TokenBucket(tpm) if tpm else None
+    return scheduler
+
+
+def test_bucket_starts_full_and_refills_over_time(clock):
+    bucket = TokenBucket(60)
+    
+    assert bucket.wait_time(60) == 0.0
+    bucket.consume(60)
+    assert bucket.wait_time(1) == pytest.approx(1.0)
+    
+    clock.now += 30
+    assert bucket.wait_time(30) == 0.0
+    assert bucket.wait_time(31) == pytest.approx(1.0)
+
+
+def test_bucket_never_exceeds_capacity(clock):
+    bucket = TokenBucket(60)
+    
+    clock.now += 3600
+    bucket.consume(0)
+    
+    assert bucket.tokens == 60
+
+
+def test_requests_larger_than_capacity_are_capped(clock):
+    bucket = TokenBucket(100)
+    
+    assert bucket.wait_time(1000) == 0.0
+    bucket.consume(1000)
+    assert bucket.tokens == 0
+
+
+def test_adjust_refunds_and_charges_the_difference(clock):
+    bucket = TokenBucket(1000)
+    bucket.consume(500)
+    
+    bucket.adjust(-200)
+    assert bucket.tokens == 700
+    
+    bucket.adjust(400)
+    assert bucket.tokens == 300
+
+
+def test_settle_reconciles_estimate_with_actual_usage(clock):
+    scheduler = make_scheduler(tpm=1000)
+    scheduler.tpm_bucket.consume(400)
+    
+    scheduler.settle(400, 100)
+    assert scheduler.tpm_bucket.tokens == 900
+    
+    scheduler.settle(400, None)
+    assert scheduler.tpm_bucket.tokens == 900
+
+
+def test_disabled_scheduler_admits_immediately():
+    scheduler = make_scheduler()
+    
+    asyncio.run(scheduler.acquire("p", 10 ** 9))
+    
+    assert not scheduler.enabled
+    assert scheduler.get_stats()["admitted"] == 0
+
+
+def test_projects_are_admitted_round_robin():
+    scheduler = make_scheduler(rpm=6000)
+    order = []
+    
+    async def request(project_id, index):
+        await scheduler.acquire(project_id, 1)
+        order.append((project_id, index))
+    
+    async def scenario():
+        await asyncio.gather(
+            *(request("a", i) for i in range(3)),
+            *(request("b", i) for i in range(3))
+        )
+    
+    asyncio.run(scenario())
+    
+    assert [project_id for project_id, _ in order] == ["a", "b", "a", "b", "a", "b"]
+    assert [index for project_id, index in order if project_id == "a"] == [0, 1, 2]
+
+
+def test_pause_delays_dispatch():
+    scheduler = make_scheduler(rpm=6000)
+    scheduler.pause(60)
+    
+    async def scenario():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(scheduler.acquire("p", 1), 0.05)
+    
+    asyncio.run(scenario())
+    
+    assert scheduler.get_stats()["rate_limited"] == 1
+
+
+def make_response(retry_after):
+    return httpx.Response(429, headers={"Retry-After": retry_after})
+
+
+def test_retry_after_seconds():
+    assert retry_after_seconds(make_response("7")) == 7.0
+    assert retry_after_seconds(make_response("-3")) == 0.0
+    assert retry_after_seconds(make_response("soon")) is None
+    assert retry_after_seconds(httpx.Response(429)) is None
+
+
+def test_retry_after_http_date():
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    
+    delay = retry_after_seconds(make_response(format_datetime(retry_at, usegmt=True)))
+    
+    assert 25 <= delay <= 30
@@ -0,0 +1,179 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.services.resilience import RetryPolicy, CircuitBreaker, CircuitOpenError, call_with_retry
+
+
+def make_policy(**overrides):
+    options = {
+        "max_attempts": 3,
+        "backoff_base": 0.0,
+        "backoff_max": 0.0,
+        "retryable_status_codes": [429, 500, 502, 503, 504],
+        "attempt_timeout": 5.0,
+        "total_deadline": 30.0
+    }
+    options.update(overrides)
+    return RetryPolicy(**options)
+
+
+def make_breaker(**overrides):
+    options = {
+        "name": "test",
+        "failure_threshold": 2,
+        "reset_timeout": 0.0,
+        "probe_timeout": 60.0
+    }
+    options.update(overrides)
+    return CircuitBreaker(**options)
+
+
+def trip(breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def status_error(status_code):
+    request = httpx.Request("POST", "http://provider/v1")
+    return httpx.HTTPStatusError("error", request=request, response=httpx.Response(status_code, request=request))
+
+
+def test_breaker_opens_after_threshold_and_rejects():
+    breaker = make_breaker(reset_timeout=60.0)
+    trip(breaker)
+    
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert breaker.get_stats()["rejected"] == 1
+
+
+def test_half_open_allows_single_probe():
+    breaker = make_breaker()
+    trip(breaker)
+    
+    probe = breaker.before_call()
+    assert probe is not None
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.before_call() is None
+
+
+def test_released_probe_lets_next_call_through():
+    breaker = make_breaker()
+    trip(breaker)
+    
+    probe = breaker.before_call()
+    breaker.release_probe(probe)
+    
+    assert breaker.before_call() is not None
+
+
+def test_stale_release_does_not_free_newer_probe():
+    breaker = make_breaker()
+    trip(breaker)
+    
+    stale = breaker.before_call()
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.release_probe(stale)
+    
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_probe_slot_expires():
+    breaker = make_breaker(probe_timeout=0.0)
+    trip(breaker)
+    
+    first = breaker.before_call()
+    second = breaker.before_call()
+    
+    assert second is not None and second != first
+
+
+def test_cancelled_probe_is_released():
+    breaker = make_breaker()
+    trip(breaker)
+    
+    async def scenario():
+        started = asyncio.Event()
+        
+        async def hang(timeout):
+            started.set()
+            await asyncio.sleep(3600)
+        
+        task = asyncio.ensure_future(call_with_retry(hang, make_policy(), breaker))
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    
+    asyncio.run(scenario())
+    
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.before_call() is not None
+
+
+def test_call_with_retry_retries_retryable_errors():
+    breaker = make_breaker(failure_threshold=5)
+    calls = []
+    
+    async def flaky(timeout):
+        calls.append(timeout)
+        if len(calls) < 3:
+            raise status_error(503)
+        return "ok"
+    
+    assert asyncio.run(call_with_retry(flaky, make_policy(), breaker)) == "ok"
+    assert len(calls) == 3
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_call_with_retry_does_not_retry_client_errors():
+    breaker = make_breaker()
+    calls = []
+    
+    async def bad_request(timeout):
+        calls.append(timeout)
+        raise status_error(400)
+    
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(call_with_retry(bad_request, make_policy(), breaker))
+    assert len(calls) == 1
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_attempt_is_bounded_by_timeout():
+    breaker = make_breaker(failure_threshold=1, reset_timeout=60.0)
+    policy = make_policy(max_attempts=1, attempt_timeout=0.05)
+    
+    async def hang(timeout):
+        await asyncio.sleep(3600)
+    
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(call_with_retry(hang, policy, breaker))
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_before_attempt_runs_outside_the_attempt_timeout():
+    breaker = make_breaker()
+    policy = make_policy(attempt_timeout=0.05)
+    admitted = []
+    
+    async def admit():
+        await asyncio.sleep(0.1)
+        admitted.append(True)
+    
+    async def succeed(timeout):
+        return "ok"
+    
+    assert asyncio.run(call_with_retry(succeed, policy, breaker, before_attempt=admit)) == "ok"
+    assert admitted == [True]
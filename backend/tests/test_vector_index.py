@@ -0,0 +1,90 @@
+import pytest
+
+from app.services.vector_index import (
+    IndexPlanner,
+    IndexProfileError,
+    AUTO,
+    FLAT,
+    HNSW,
+    IVF_FLAT,
+    IVF_PQ,
+    DISKANN
+)
+
+
+@pytest.fixture
+def planner():
+    planner = IndexPlanner()
+    planner.default_profile = AUTO
+    planner.flat_max_rows = 10000
+    planner.hnsw_max_rows = 1000000
+    planner.large_profile = IVF_PQ
+    planner.target_recall = 0.95
+    planner.hnsw_m = 16
+    planner.hnsw_ef_construction = 200
+    return planner
+
+
+def test_normalize_accepts_any_case(planner):
+    assert planner.normalize(" hnsw ") == HNSW
+    assert planner.normalize(None) == AUTO
+
+
+def test_normalize_rejects_unknown_profiles(planner):
+    with pytest.raises(IndexProfileError):
+        planner.normalize("BRUTE")
+
+
+@pytest.mark.parametrize("row_count, expected", [
+    (0, FLAT),
+    (9999, FLAT),
+    (10000, HNSW),
+    (999999, HNSW),
+    (1000000, IVF_PQ)
+])
+def test_auto_profile_follows_collection_size(planner, row_count, expected):
+    assert planner.resolve(AUTO, row_count) == expected
+
+
+def test_pinned_profile_ignores_collection_size(planner):
+    assert planner.resolve(IVF_FLAT, 0) == IVF_FLAT
+    assert planner.resolve(FLAT, 10 ** 7) == FLAT
+
+
+def test_build_params_for_hnsw(planner):
+    params = planner.build_params(HNSW, 50000, 1024)
+    
+    assert params["index_type"] == HNSW
+    assert params["params"] == {"M": 16, "efConstruction": 200}
+
+
+def test_build_params_for_ivf_pq_picks_a_dividing_segment_count(planner):
+    params = planner.build_params(IVF_PQ, 4000000, 1536)["params"]
+    
+    assert params["nlist"] == 8000
+    assert 1536 % params["m"] == 0
+    assert params["nbits"] == 8
+
+
+def test_nlist_is_clamped(planner):
+    assert planner.build_params(IVF_FLAT, 10, 8)["params"]["nlist"] == 128
+    assert planner.build_params(IVF_FLAT, 10 ** 12, 8)["params"]["nlist"] == 65536
+
+
+def test_search_params_scale_nprobe_with_recall(planner):
+    index_params = {"index_type": IVF_FLAT, "params": {"nlist": 1024}}
+    
+    low = planner.search_params(index_params, 10, target_recall=0.5)["params"]["nprobe"]
+    high = planner.search_params(index_params, 10, target_recall=0.99)["params"]["nprobe"]
+    
+    assert low < high <= 1024
+    assert planner.search_params({"index_type": IVF_FLAT, "params": {"nlist": 128}}, 10)["params"]["nprobe"] == 16
+
+
+def test_search_params_never_go_below_top_k(planner):
+    assert planner.search_params({"index_type": HNSW}, 500)["params"]["ef"] == 500
+    assert planner.search_params({"index_type": DISKANN}, 500)["params"]["search_list"] == 500
+
+
+def test_search_params_for_flat_are_empty(planner):
+    assert planner.search_params({"index_type": FLAT}, 10)["params"] == {}
@@ -0,0 +1,182 @@
+import asyncio
+
+import pytest
+
+from app.services.milvus_service import VectorWriteBuffer
+
+
+class FakeCollection:
+    def __init__(self):
+        self.rows = []
+        self.failures = 0
+    
+    def insert(self, batch):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("insert failed")
+        self.rows.extend(batch)
+
+
+class FakeService:
+    def __init__(self):
+        self.collection = FakeCollection()
+    
+    def create_collection(self, project_id, embedding_dim, profile=None):
+        return self.collection
+
+
+def make_rows(document_id, count, start=0):
+    return [
+        {"id": f"{document_id}-{i}", "document_id": document_id, "embedding": [0.0, 1.0]}
+        for i in range(start, start + count)
+    ]
+
+
+def make_buffer(max_rows=100, max_delay=0.01):
+    service = FakeService()
+    return VectorWriteBuffer(service, max_rows, max_delay), service.collection
+
+
+def test_wait_lets_the_timer_flush_all_documents_together():
+    buffer, collection = make_buffer()
+    
+    async def scenario():
+        await buffer.add("p", make_rows("a", 3))
+        await buffer.add("p", make_rows("b", 2))
+        await buffer.wait("p", "a")
+    
+    asyncio.run(scenario())
+    
+    assert len(collection.rows) == 5
+    assert buffer.get_stats()["batches"] == 1
+    assert buffer.pending_count() == 0
+
+
+def test_size_threshold_writes_in_batches():
+    buffer, collection = make_buffer(max_rows=4, max_delay=60.0)
+    
+    async def scenario():
+        await buffer.add("p", make_rows("a", 3))
+        assert collection.rows == []
+        await buffer.add("p", make_rows("b", 6))
+        await buffer.wait("p", "a")
+        await buffer.wait("p", "b")
+    
+    asyncio.run(scenario())
+    
+    assert len(collection.rows) == 9
+    assert buffer.get_stats()["batches"] == 3
+
+
+def test_wait_without_pending_rows_returns_immediately():
+    buffer, collection = make_buffer(max_delay=60.0)
+    
+    asyncio.run(buffer.wait("p", "a"))
+    
+    assert collection.rows == []
+
+
+def test_wait_drains_when_no_timer_is_scheduled():
+    buffer, collection = make_buffer(max_delay=0)
+    
+    async def scenario():
+        await buffer.add("p", make_rows("a", 2))
+        await buffer.wait("p", "a")
+    
+    asyncio.run(scenario())
+    
+    assert len(collection.rows) == 2
+
+
+def test_failed_write_drops_rows_and_fails_waiters():
+    buffer, collection = make_buffer(max_delay=0)
+    collection.failures = 1
+    
+    async def scenario():
+        await buffer.add("p", make_rows("a", 2))
+        with pytest.raises(RuntimeError):
+            await buffer.wait("p", "a")
+    
+    asyncio.run(scenario())
+    
+    assert buffer.pending_count() == 0
+    assert buffer.get_stats()["dropped"] == 2
+
+
+def test_retry_after_failure_does_not_duplicate_ids():
+    buffer, collection = make_buffer(max_delay=0)
+    collection.failures = 1
+    
+    async def scenario():
+        await buffer.add("p", make_rows("a", 2))
+        with pytest.raises(RuntimeError):
+            await buffer.drain("p")
+        
+        buffer.reset("p", "a")
+        await buffer.add("p", make_rows("a", 2))
+        await buffer.wait("p", "a")
+    
+    asyncio.run(scenario())
+    
+    assert sorted(row["id"] for row in collection.rows) == ["a-0", "a-1"]
+
+
+def test_failure_is_reported_to_a_later_waiter_until_reset():
+    buffer, collection = make_buffer(max_delay=0)
+    collection.failures = 1
+    
+    async def scenario():
+        await buffer.add("p", make_rows("a", 1))
+        with pytest.raises(RuntimeError):
+            await buffer.drain("p")
+        with pytest.raises(RuntimeError):
+            await buffer.wait("p", "a")
+        await buffer.wait("p", "a")
+    
+    asyncio.run(scenario())
+
+
+def test_failed_write_keeps_other_projects_buffered():
+    buffer, collection = make_buffer(max_delay=60.0)
+    
+    async def scenario():
+        await buffer.add("p", make_rows("a", 1))
+        await buffer.add("q", make_rows("b", 1))
+        collection.failures = 1
+        with pytest.raises(RuntimeError):
+            await buffer.drain("p")
+    
+    asyncio.run(scenario())
+    
+    assert buffer.pending_count("p") == 0
+    assert buffer.pending_count("q") == 1
+
+
+def test_enqueue_replaces_pending_rows_with_the_same_id():
+    buffer, collection = make_buffer(max_delay=60.0)
+    
+    async def scenario():
+        await buffer.add("p", make_rows("a", 2))
+        await buffer.add("p", make_rows("a", 2, start=1))
+        assert buffer.pending_count("p") == 3
+        await buffer.drain("p")
+        await buffer.wait("p", "a")
+    
+    asyncio.run(scenario())
+    
+    assert sorted(row["id"] for row in collection.rows) == ["a-0", "a-1", "a-2"]
+
+
+def test_discard_releases_waiters():
+    buffer, collection = make_buffer(max_delay=60.0)
+    
+    async def scenario():
+        await buffer.add("p", make_rows("a", 2))
+        waiter = asyncio.ensure_future(buffer.wait("p", "a"))
+        await asyncio.sleep(0)
+        assert buffer.discard("p", lambda row: row["document_id"] == "a") == 2
+        await asyncio.wait_for(waiter, 1.0)
+    
+    asyncio.run(scenario())
+    
+    assert collection.rows == []